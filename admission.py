@@ -0,0 +1,281 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+# Request priority classes, lower runs first; clients pick one with the X-Priority header.
+# Interactive traffic is "normal"; bulk and batch jobs should send "low" (or "batch").
+PRIORITIES = {"high": 0, "interactive": 1, "normal": 1, "batch": 2, "low": 2}
+DEFAULT_PRIORITY = PRIORITIES["normal"]
+BATCH_PRIORITY = PRIORITIES["batch"]
+DEFAULT_TENANT = "default"
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of queued; surfaced as 503 with Retry-After."""
+
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TenantPolicy:
+    """Share of upstream capacity for one tenant."""
+    __slots__ = ("weight", "max_concurrent")
+
+    def __init__(self, weight: float = 1.0, max_concurrent: Optional[int] = None):
+        self.weight = weight
+        self.max_concurrent = max_concurrent
+
+
+class _Tenant:
+    __slots__ = ("name", "policy", "active", "waiting", "last_tag")
+
+    def __init__(self, name: str, policy: TenantPolicy):
+        self.name = name
+        self.policy = policy
+        self.active = 0
+        self.waiting = 0
+        self.last_tag: Dict[int, float] = {}  # priority class -> tag of its latest request
+
+
+class _Waiter:
+    __slots__ = ("priority", "tenant", "tag", "future")
+
+    def __init__(self, priority: int, tenant: _Tenant, tag: float, future: asyncio.Future):
+        self.priority = priority
+        self.tenant = tenant
+        self.tag = tag
+        self.future = future
+
+
+class AdmissionController:
+    """
+    Bounded concurrency for upstream calls, shared fairly between tenants.
+
+    At most ``max_concurrent`` calls run at once. Waiting requests are served
+    by priority class first, so interactive requests never queue behind
+    batch work, and the batch class may hold at most ``batch_max_concurrent``
+    slots so interactive arrivals usually find one free. Within a class,
+    tenants get slots in proportion to their weight (start-time fair
+    queueing), and a tenant with ``max_concurrent`` set never holds more.
+
+    Requests wait for at most their queue deadline. Once ``max_queue``
+    requests are waiting, a new request either displaces a waiter from a
+    lower class (from the tenant furthest ahead of its fair share) or is
+    rejected straight away.
+
+    Used from one event loop per worker; no locking is needed.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float,
+                 batch_max_concurrent: Optional[int] = None, tenants: Optional[Dict[str, TenantPolicy]] = None,
+                 default_policy: Optional[TenantPolicy] = None, alpha: float = 0.2):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.batch_max_concurrent = max_concurrent if batch_max_concurrent is None else batch_max_concurrent
+        self.policies = tenants or {}
+        self.default_policy = default_policy or TenantPolicy()
+        self.alpha = alpha
+        self.active = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._tenants: Dict[str, _Tenant] = {}
+        self._queues: Dict[int, Dict[str, Deque[_Waiter]]] = {}  # class -> tenant -> waiters
+        self._class_active: Dict[int, int] = {}
+        self._virtual_time: Dict[int, float] = {}
+        self._waiting = 0
+        self._service_time = 1.0  # EWMA of how long an admitted call holds its slot
+        # Requests taking several slots take them one at a time, one request at a time, so two of them
+        # never each hold part of what they need
+        self._multi_slot_lock = asyncio.Lock()
+
+    def retry_after(self) -> int:
+        """Seconds until a newly queued request would likely be admitted."""
+        wait = (self._waiting + 1) / self.max_concurrent * self._service_time
+        return max(1, math.ceil(wait))
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "waiting": self._waiting,
+            "max_concurrent": self.max_concurrent,
+            "batch_max_concurrent": self.batch_max_concurrent,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "service_time": round(self._service_time, 3),
+            "tenants": {
+                name: {"active": tenant.active, "waiting": tenant.waiting, "weight": tenant.policy.weight}
+                for name, tenant in self._tenants.items()
+            },
+        }
+
+    def _tenant(self, name: str) -> _Tenant:
+        tenant = self._tenants.get(name)
+        if tenant is None:
+            tenant = self._tenants[name] = _Tenant(name, self.policies.get(name, self.default_policy))
+        return tenant
+
+    @asynccontextmanager
+    async def slot(self, priority: int = DEFAULT_PRIORITY, tenant: str = DEFAULT_TENANT,
+                   timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold one upstream slot for the duration of the block."""
+        state = self._tenant(tenant)
+        await self._acquire(priority, state, self.queue_timeout if timeout is None else min(timeout, self.queue_timeout))
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - start
+            self._service_time += self.alpha * (elapsed - self._service_time)
+            self._release(priority, state)
+
+    def slot_limit(self, priority: int = DEFAULT_PRIORITY, tenant: str = DEFAULT_TENANT) -> int:
+        """Most slots one request of this class and tenant can ever hold at once."""
+        limit = self.max_concurrent if priority < BATCH_PRIORITY else min(self.max_concurrent, self.batch_max_concurrent)
+        cap = self.policies.get(tenant, self.default_policy).max_concurrent
+        return max(1, min(limit, cap) if cap is not None else limit)
+
+    @asynccontextmanager
+    async def slots(self, count: int, priority: int = DEFAULT_PRIORITY, tenant: str = DEFAULT_TENANT,
+                    timeout: Optional[float] = None) -> AsyncIterator[int]:
+        """
+        Hold one slot per concurrent upstream call of a request that makes
+        ``count`` of them, capped at ``slot_limit``, and yield how many are held.
+        """
+        count = min(count, self.slot_limit(priority, tenant))
+        if count <= 1:
+            async with self.slot(priority, tenant, timeout):
+                yield 1
+            return
+
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else min(timeout, self.queue_timeout))
+        async with AsyncExitStack() as stack:
+            try:
+                await asyncio.wait_for(self._multi_slot_lock.acquire(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise Overloaded("Timed out waiting for upstream capacity", self.retry_after())
+            try:
+                for _ in range(count):
+                    await stack.enter_async_context(self.slot(priority, tenant, max(0.0, deadline - time.monotonic())))
+            finally:
+                self._multi_slot_lock.release()
+            yield count
+
+    async def _acquire(self, priority: int, tenant: _Tenant, timeout: float) -> None:
+        if self._waiting >= self.max_queue:
+            victim = self._displaceable(priority)
+            if victim is None:
+                self.rejected += 1
+                raise Overloaded("Server is at capacity, please retry later", self.retry_after())
+            self.rejected += 1
+            self._forget(victim)
+            victim.future.set_exception(Overloaded("Displaced by higher-priority requests", self.retry_after()))
+            # The victim may have been this tenant's only other request
+            self._tenants.setdefault(tenant.name, tenant)
+
+        # Start-time fair queueing: a tenant's tags advance by 1 / weight per request,
+        # never from behind the class's virtual time, so idle tenants cannot bank credit
+        virtual_time = self._virtual_time.get(priority, 0.0)
+        tag = max(virtual_time, tenant.last_tag.get(priority, 0.0)) + 1.0 / tenant.policy.weight
+        tenant.last_tag[priority] = tag
+        waiter = _Waiter(priority, tenant, tag, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(priority, {}).setdefault(tenant.name, deque()).append(waiter)
+        self._waiting += 1
+        tenant.waiting += 1
+        self._dispatch()
+        if waiter.future.done():
+            return
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except asyncio.TimeoutError:
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._forget(waiter)
+                self.timed_out += 1
+                raise Overloaded("Timed out waiting for upstream capacity", self.retry_after())
+            # Settled just as the deadline passed: keep a handed-over slot, or raise the displacement
+            waiter.future.result()
+        except asyncio.CancelledError:
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._forget(waiter)
+            elif waiter.future.exception() is None:
+                # The client went away after the slot was handed over; give it back
+                self._release(priority, tenant)
+            raise
+
+    def _displaceable(self, priority: int) -> Optional[_Waiter]:
+        # The lowest-class waiter from the tenant furthest ahead of its share, if below ``priority``
+        victim = None
+        for waiter_priority in sorted(self._queues, reverse=True):
+            if waiter_priority <= priority:
+                break
+            for waiters in self._queues[waiter_priority].values():
+                for waiter in waiters:
+                    if not waiter.future.done() and (victim is None or waiter.tag > victim.tag):
+                        victim = waiter
+            if victim is not None:
+                return victim
+        return None
+
+    def _eligible(self, priority: int, tenant: _Tenant) -> bool:
+        cap = tenant.policy.max_concurrent
+        if cap is not None and tenant.active >= cap:
+            return False
+        return priority < BATCH_PRIORITY or self._class_active.get(priority, 0) < self.batch_max_concurrent
+
+    def _forget(self, waiter: _Waiter) -> None:
+        # Bookkeeping for a waiter that leaves the queue without a slot; it is dropped from its deque lazily
+        self._waiting -= 1
+        waiter.tenant.waiting -= 1
+        self._prune(waiter.tenant)
+
+    def _prune(self, tenant: _Tenant) -> None:
+        # Idle tenants are forgotten so state stays bounded however many API keys are seen
+        if not tenant.active and not tenant.waiting and self._tenants.get(tenant.name) is tenant:
+            del self._tenants[tenant.name]
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for priority in sorted(self._queues):
+            queues = self._queues[priority]
+            best = None
+            for name in list(queues):
+                waiters = queues[name]
+                while waiters and waiters[0].future.done():
+                    waiters.popleft()  # timed out, cancelled or displaced
+                if not waiters:
+                    del queues[name]
+                elif self._eligible(priority, waiters[0].tenant) and (best is None or waiters[0].tag < best.tag):
+                    best = waiters[0]
+            if best is not None:
+                return best
+        return None
+
+    def _dispatch(self) -> None:
+        while self.active < self.max_concurrent:
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            self._queues[waiter.priority][waiter.tenant.name].popleft()
+            self._virtual_time[waiter.priority] = waiter.tag
+            self._waiting -= 1
+            waiter.tenant.waiting -= 1
+            self.active += 1
+            waiter.tenant.active += 1
+            self._class_active[waiter.priority] = self._class_active.get(waiter.priority, 0) + 1
+            waiter.future.set_result(None)
+
+    def _release(self, priority: int, tenant: _Tenant) -> None:
+        self.active -= 1
+        tenant.active -= 1
+        self._class_active[priority] -= 1
+        self._prune(tenant)
+        self._dispatch()
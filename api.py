@@ -1,165 +1,292 @@
 import os
 import json
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+import hashlib
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+import anyio
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError
+from typing import Callable, List, Optional, Dict, Any, Set, Tuple, Union
 from dotenv import load_dotenv
-from openai import OpenAI
-import httpx
+
+# openai and httpx are imported inside get_grok_client so that importing this module stays cheap
+from admission import DEFAULT_PRIORITY, DEFAULT_TENANT, PRIORITIES, AdmissionController, Overloaded, TenantPolicy
+from compose import MAX_PAIR_WORKERS, PairCache, analyze_pairs, chain_pairs, synthesize_research
+from fanout import FanoutError, research_from_outline, research_outline
+from grok_backend import GROK_BASE_URL, MOCK_MODE, REPLAY_MODE, backend_mode, get_backend
+from llm_router import configured_endpoints, live_backend, router_stats
+from partial_research import ResearchStream, partial_research
+from prompts import get_prompt, prompt_usage
+from routing import MODES, STANDARD_MODE, Route, model_router
+from research_store import RESEARCH_ID_PATTERN, StoredResearch, open_research_store, research_key
+from responses import (
+    DefaultJSONResponse,
+    model_response,
+    requested_delta_base,
+    stored_research_delta_response,
+    stored_research_response,
+)
+from schemas import (
+    MAX_TOPIC_LENGTH,
+    AutocompleteResponse,
+    ContinueResearchRequest,
+    GeneratedResearch,
+    JourneyBranch,
+    JourneyResponse,
+    Mode,
+    PartialResearchResponse,
+    RelatedTopic,
+    RelatedTopicsRequest,
+    RelatedTopicsResponse,
+    ResearchRequest,
+    ResearchResponse,
+    TopicSuggestion,
+)
+from recommender import TopicRecommender
+from topic_index import SUGGESTION_WEIGHT, TOP_K, TopicIndex, stored_research
+from topic_trie import TopicTrie
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Open upstream keep-alive connections at startup unless GROK_PREWARM is disabled
+PREWARM_ENABLED = os.getenv("GROK_PREWARM", "true").lower() in ("1", "true", "yes")
+PREWARM_CONNECTIONS = int(os.getenv("GROK_PREWARM_CONNECTIONS", "2"))
+KEEPALIVE_SECONDS = float(os.getenv("GROK_KEEPALIVE_SECONDS", "60"))
+
+# Warm the Grok client in the background; /ready/ reports when it is done
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.warmup_error = None
+    warmup_task = asyncio.create_task(warm_upstream(app))
+    seed_task = asyncio.create_task(seed_topics())
+    yield
+    warmup_task.cancel()
+    seed_task.cancel()
+    close_grok_client()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Multidisciplinary Research Explorer API",
     description="API for generating multidisciplinary research outputs connecting diverse academic topics",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=DefaultJSONResponse,
+    lifespan=lifespan,
 )
 
-# Pydantic models for request and response
-class ResearchRequest(BaseModel):
-    primary_topic: str
-    intent_topic: str
-    previous_topics: Optional[List[str]] = None
+# Content-addressed store of generated research, served by GET /research/{research_id}.
+# Set RESEARCH_STORE_PATH to share it, the research cache and in-flight markers across workers.
+research_store = open_research_store()
+
+# Research ids of the topic chains this worker served most recently, by mode and topic prefix, for GET /journeys/.
+# Each mode keeps at most as many chains as the research store keeps documents.
+JOURNEY_MAX_CHAINS = int(os.getenv("JOURNEY_MAX_CHAINS", os.getenv("RESEARCH_STORE_MAX_ENTRIES", "1000")))
+journeys: Dict[str, TopicTrie] = {mode: TopicTrie(max_chains=JOURNEY_MAX_CHAINS) for mode in MODES}
 
-class ContinueResearchRequest(BaseModel):
-    topics: List[str]  # All existing topics
-    next_topic: str    # New topic to connect
+# Every topic requested, generated or suggested by this worker, for GET /autocomplete/.
+# TOPIC_INDEX_SEED lists research archives and bulk output files (comma-separated) to load at startup.
+topic_index = TopicIndex()
+TOPIC_INDEX_SEED = [path.strip() for path in os.getenv("TOPIC_INDEX_SEED", "").split(",") if path.strip()]
 
-class RelatedTopicsRequest(BaseModel):
-    topics: List[str]
+# Related topics learned from the research this worker generated and the TOPIC_INDEX_SEED documents.
+# POST /related-topics/ answers from it and only asks Grok for chains it knows nothing about.
+topic_recommender = TopicRecommender()
+LOCAL_RELATED_TOPICS = os.getenv("LOCAL_RELATED_TOPICS", "true").lower() in ("1", "true", "yes")
+RELATED_TOPICS_COUNT = 3
 
-class ResearchResponse(BaseModel):
-    research_output: Dict[str, Any]
-    related_topics: List[Dict[str, str]]
-    connection_path: str
+# How long generated research is reused for the same topic chain (0 disables the cache)
+RESEARCH_CACHE_TTL_SECONDS = float(os.getenv("RESEARCH_CACHE_TTL_SECONDS", "86400"))
+# Pairwise analyses reused by composed research live as long as research does
+pair_cache = PairCache(open_research_store("pairs"), RESEARCH_CACHE_TTL_SECONDS)
+# How long research generated by the latency fallback model is reused
+FALLBACK_CACHE_TTL_SECONDS = 300.0
+# How long other requests wait for an identical in-flight generation before generating themselves
+INFLIGHT_TIMEOUT_SECONDS = 120.0
+INFLIGHT_POLL_SECONDS = 0.1
 
-class RelatedTopicsResponse(BaseModel):
-    related_topics: List[Dict[str, str]]
+# Research generated for requests with a deadline streams into here, by cache key, until it is stored
+pending_research: Dict[str, Tuple[List[str], ResearchStream]] = {}
+# Generations still running after their request returned partial research
+background_generations: Set[asyncio.Task] = set()
+# How long a continuation token finds the finished research when the research cache is disabled
+CONTINUATION_TTL_SECONDS = 600.0
+
+# Upstream calls allowed at once per worker, how many more may wait, and for how long.
+# Beyond that requests are shed with 503 + Retry-After instead of piling up.
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "16"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "15"))
+# Batch requests (X-Priority: low) leave the remaining slots free for interactive ones
+ADMISSION_BATCH_MAX_CONCURRENT = int(os.getenv("ADMISSION_BATCH_MAX_CONCURRENT", str(max(1, ADMISSION_MAX_CONCURRENT * 3 // 4))))
+
+# Function to read per-tenant weights and concurrency caps, e.g. {"streamlit": {"weight": 4}, "etl": {"max_concurrent": 4}}
+def load_tenant_policies() -> Dict[str, TenantPolicy]:
+    config = json.loads(os.getenv("ADMISSION_TENANTS", "") or "{}")
+    return {name: TenantPolicy(float(policy.get("weight", 1.0)), policy.get("max_concurrent")) for name, policy in config.items()}
+
+default_tenant_cap = os.getenv("ADMISSION_TENANT_MAX_CONCURRENT")
+admission = AdmissionController(
+    ADMISSION_MAX_CONCURRENT,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    batch_max_concurrent=ADMISSION_BATCH_MAX_CONCURRENT,
+    tenants=load_tenant_policies(),
+    default_policy=TenantPolicy(max_concurrent=int(default_tenant_cap) if default_tenant_cap else None),
+)
+
+# Grok client shared by all requests so upstream connections are reused
+_grok_client = None
+_grok_client_lock = threading.Lock()
 
 # Function to get Grok client
 def get_grok_client():
+    global _grok_client
     api_key = os.getenv("XAI_API_KEY")
     if not api_key:
         raise HTTPException(status_code=500, detail="Grok API key not found in environment variables")
     
-    return OpenAI(
-        api_key=api_key,
-        base_url="https://api.x.ai/v1",
-    )
+    with _grok_client_lock:
+        if _grok_client is None:
+            import httpx
+            from openai import OpenAI
+            
+            # httpx's default pool caps, raised if needed so every prewarmed connection is kept alive
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=max(100, PREWARM_CONNECTIONS),
+                    max_keepalive_connections=max(20, PREWARM_CONNECTIONS),
+                    keepalive_expiry=KEEPALIVE_SECONDS,
+                ),
+            )
+            _grok_client = OpenAI(
+                api_key=api_key,
+                base_url=GROK_BASE_URL,
+                http_client=http_client,
+            )
+        return _grok_client
+
+# Function to close the shared Grok client on shutdown
+def close_grok_client():
+    global _grok_client
+    with _grok_client_lock:
+        if _grok_client is not None:
+            _grok_client.close()
+            _grok_client = None
+
+# Function to open one keep-alive connection to the Grok API
+def warm_connection():
+    get_grok_client().models.list()
+
+# Function to list the upstream endpoints to warm by name: Grok alone, or every endpoint of the LLM router
+def upstream_endpoints() -> List[Tuple[str, Callable[[], None]]]:
+    if not configured_endpoints():
+        return [("grok", warm_connection)]
+    return [(endpoint.name, endpoint.warm) for endpoint in live_backend(get_grok_client).endpoints]
+
+# Function to open keep-alive connections to one upstream endpoint, retrying until it succeeds
+async def warm_endpoint(app: FastAPI, name: str, warm: Callable[[], None]):
+    delay = 1.0
+    while True:
+        try:
+            # Concurrent requests make the pool open several connections instead of reusing one
+            await asyncio.gather(*(run_in_threadpool(warm) for _ in range(PREWARM_CONNECTIONS)))
+            # Requests fail over between endpoints, so one answering is enough to serve
+            app.state.ready = True
+            app.state.warmup_error = None
+            return
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            if not app.state.ready:
+                app.state.warmup_error = f"{name}: {detail}"
+            logger.warning("Warm-up of %s failed, retrying in %.0fs: %s", name, delay, detail)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+
+# Function to warm every upstream endpoint at once, so a slow or unreachable one does not hold up the others
+async def warm_upstream(app: FastAPI):
+    if not PREWARM_ENABLED or backend_mode() in (REPLAY_MODE, MOCK_MODE):
+        app.state.ready = True
+        return
+    
+    await asyncio.gather(*(warm_endpoint(app, name, warm) for name, warm in upstream_endpoints()))
+
+# Function to load topics and related-topic statistics from stored research in the background so startup stays fast
+async def seed_topics():
+    if not TOPIC_INDEX_SEED:
+        return
+    
+    def seed() -> int:
+        count = 0
+        for document in stored_research(TOPIC_INDEX_SEED):
+            topic_index.record_research(document)
+            topic_recommender.record_research(document)
+            count += 1
+        return count
+    
+    try:
+        count = await run_in_threadpool(seed)
+        logger.info("Loaded topics from %d stored research documents", count)
+    except Exception as e:
+        logger.warning("Could not seed the topic index: %s", e)
 
 # Function to generate multidisciplinary research
-def generate_research(primary_topic: str, intent_topic: str, previous_topics: Optional[List[str]] = None):
-    client = get_grok_client()
-    
-    # Construct the prompt based on the examples
-    system_prompt = """
-    You are a multidisciplinary research assistant specializing in connecting diverse academic topics.
-    Your task is to create a comprehensive research output that connects the provided topics
-    through various academic lenses such as sociology, economics, history, anthropology, environmental studies, cultural studies, and political science.
-    
-    IMPORTANT: Follow this exact structure for your analysis:
-    1. Start with connecting the primary topic and intent topic
-    2. Then connect those to the third topic (if provided)
-    3. Maintain all previous connections when adding new topics
-    
-    For example, if analyzing multiple topics:
-    - First analyze the connections between the first two topics in detail
-    - Then show how additional topics connect to the previous ones
-    - Always maintain the previous connections while adding new topics
-    - Create rich, nuanced connections between all topics with specific subtopics
-    - Identify cross-cutting themes that span all topics
-    
-    Your analysis should include:
-    - Specific subtopics under each disciplinary lens
-    - Detailed explanations of how topics intersect
-    - Historical contexts and contemporary relevance
-    - Power dynamics and structural relationships
-    - Practical implications and applications
-    
-    Format your response as a JSON object with the following structure:
-    {
-        "research_output": {
-            "title": "Connecting [Topics]: A Multidisciplinary Exploration",
-            "introduction": "Brief introduction to the connection between the topics",
-            "connections": [
-                {
-                    "discipline": "[Relevant Discipline]",
-                    "explanation": "Detailed explanation of connections through this discipline",
-                    "subtopics": [
-                        {
-                            "name": "[Specific Subtopic]",
-                            "details": "Detailed explanation of this subtopic"
-                        },
-                        {
-                            "name": "[Specific Subtopic]",
-                            "details": "Detailed explanation of this subtopic"
-                        }
-                    ],
-                    "themes": ["Theme 1", "Theme 2", "Theme 3"]
-                }
-            ],
-            "research_questions": [
-                "Research question 1",
-                "Research question 2",
-                "Research question 3"
-            ],
-            "cross_cutting_themes": [
-                "Theme connecting all topics 1",
-                "Theme connecting all topics 2",
-                "Theme connecting all topics 3"
-            ],
-            "mind_map": {
-                "central_themes": "[List of all connected topics]",
-                "key_connections": [
-                    {
-                        "node": "[Connection Point]",
-                        "connects_to": "[Related Topic]",
-                        "research_angles": "[Specific research approaches]"
-                    }
-                ]
-            }
-        },
-        "related_topics": [
-            {
-                "topic": "Related Topic 1",
-                "relevance": "Explanation of how this topic connects to the current research"
-            },
-            {
-                "topic": "Related Topic 2",
-                "relevance": "Explanation of how this topic connects to the current research"
-            },
-            {
-                "topic": "Related Topic 3",
-                "relevance": "Explanation of how this topic connects to the current research"
-            }
-        ]
-    }
-    """
+def generate_research(primary_topic: str, intent_topic: str, previous_topics: Optional[List[str]] = None, route: Optional[Route] = None,
+                      stream: Optional[ResearchStream] = None):
+    backend = get_backend(get_grok_client)
+    if route is None:
+        route = model_router.route("research", STANDARD_MODE, topic_count=2 + len(previous_topics or []))
     
-    # Construct the user prompt based on provided topics
+    # Pick the registered prompt; its system message is an identical prefix for every research call
     if previous_topics and len(previous_topics) > 0:
         # Format all previous topics as a comma-separated string
-        previous_topics_str = ", ".join(previous_topics)
-        user_prompt = f"Create a multidisciplinary research output connecting {primary_topic}, {intent_topic}, and the following previous topics: {previous_topics_str}. Pay special attention to the interconnections between all topics."
+        prompt = get_prompt("research_chain")
+        messages = prompt.messages(
+            primary_topic=primary_topic,
+            intent_topic=intent_topic,
+            previous_topics=", ".join(previous_topics),
+        )
     else:
-        user_prompt = f"Create a multidisciplinary research output connecting {primary_topic} and {intent_topic}. Focus on meaningful connections between these topics across different academic disciplines."
+        prompt = get_prompt("research_pair")
+        messages = prompt.messages(primary_topic=primary_topic, intent_topic=intent_topic)
     
     try:
         # Call Grok API
-        completion = client.chat.completions.create(
-            model="grok-3",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.7,
-            max_tokens=4000,  # Increased token limit for more detailed outputs
-        )
+        start = time.perf_counter()
+        try:
+            if stream is None:
+                completion = backend.create(
+                    model=route.model,
+                    messages=messages,
+                    temperature=route.temperature,
+                    max_tokens=route.max_tokens,
+                )
+            else:
+                # Streamed so a request whose deadline passes can return the sections completed so far.
+                # The pinned SDK cannot ask for usage on streams, so these are missing from prompt usage.
+                completion = None
+                for chunk in backend.create(
+                    model=route.model,
+                    messages=messages,
+                    temperature=route.temperature,
+                    max_tokens=route.max_tokens,
+                    stream=True,
+                ):
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        stream.append(chunk.choices[0].delta.content)
+        finally:
+            model_router.observe(route, time.perf_counter() - start)
+        prompt_usage.record(prompt, completion)
         
         # Extract the response
-        response_text = completion.choices[0].message.content
+        response_text = completion.choices[0].message.content if stream is None else stream.text()
         
         # Extract JSON from the response
         try:
@@ -171,62 +298,74 @@ def generate_research(primary_topic: str, intent_topic: str, previous_topics: Op
             else:
                 json_str = response_text
                 
-            research_data = json.loads(json_str)
+            # Parse and validate in one pass against the typed research schema
+            research_data = GeneratedResearch.model_validate_json(json_str)
             return research_data
-        except json.JSONDecodeError:
+        except ValidationError:
             raise HTTPException(status_code=500, detail="Failed to parse the response from Grok API")
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calling Grok API: {str(e)}")
 
+# Function to run one round of fan-out or composed research against the backend
+def run_research_round(research_round: Callable[..., Any], *args: Any):
+    backend = get_backend(get_grok_client)
+    
+    try:
+        return research_round(backend, *args)
+    except (FanoutError, ValueError):
+        # ValueError covers both malformed JSON and schema validation errors
+        raise HTTPException(status_code=500, detail="Failed to parse the response from Grok API")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error calling Grok API: {str(e)}")
+
+# Function to generate research as an outline plus concurrent per-discipline sections
+async def generate_fanout_research(topics: List[str], mode: str, priority: int, tenant: str) -> GeneratedResearch:
+    # Each round holds one upstream slot per concurrent call it makes, and only while it runs
+    async with admission.slot(priority, tenant):
+        outline, disciplines = await run_in_threadpool(run_research_round, research_outline, topics, mode)
+    async with admission.slots(len(disciplines), priority, tenant) as held:
+        return await run_in_threadpool(run_research_round, research_from_outline, topics, outline, disciplines, mode, held)
+
+# Function to compose research from cached pairwise analyses and one synthesis call
+async def generate_composed_research(topics: List[str], mode: str, priority: int, tenant: str,
+                                     deadline: Optional[float] = None) -> GeneratedResearch:
+    pairs = chain_pairs(topics)
+    if not pairs:
+        raise HTTPException(status_code=400, detail="Composed research needs at least two distinct topics")
+    # Cached pairs cost no upstream call, so slots are only held for the missing ones and then for the synthesis
+    analyses = await run_in_threadpool(pair_cache.cached, pairs, mode)
+    missing = [pair for pair in pairs if pair not in analyses]
+    if missing:
+        async with admission.slots(min(len(missing), MAX_PAIR_WORKERS), priority, tenant) as held:
+            analyses.update(await run_in_threadpool(run_research_round, analyze_pairs, missing, pair_cache, mode, held, deadline))
+    async with admission.slot(priority, tenant):
+        return await run_in_threadpool(run_research_round, synthesize_research, topics,
+                                       [(pair, analyses[pair]) for pair in pairs if pair in analyses], mode)
+
 # Function to generate related topics based on provided topics
-def generate_related_topics(topics: List[str]):
-    client = get_grok_client()
-    
-    # Construct the prompt for related topics
-    system_prompt = """
-    You are a multidisciplinary research assistant specializing in connecting diverse academic topics.
-    Your task is to suggest related topics that would expand the research on the provided topics.
-    
-    For each suggested topic, provide:
-    1. The topic name
-    2. A brief explanation of how it connects to the provided topics
-    3. Why exploring this connection would be valuable
-    
-    Format your response as a JSON object with the following structure:
-    {
-        "related_topics": [
-            {
-                "topic": "Related Topic 1",
-                "relevance": "Explanation of how this topic connects to the current research"
-            },
-            {
-                "topic": "Related Topic 2",
-                "relevance": "Explanation of how this topic connects to the current research"
-            },
-            {
-                "topic": "Related Topic 3",
-                "relevance": "Explanation of how this topic connects to the current research"
-            }
-        ]
-    }
-    """
+def generate_related_topics(topics: List[str], mode: str = STANDARD_MODE):
+    backend = get_backend(get_grok_client)
+    route = model_router.route("related_topics", mode, topic_count=len(topics))
     
     # Construct the user prompt based on provided topics
     topics_str = ", ".join(topics[:-1]) + f", and {topics[-1]}" if len(topics) > 1 else topics[0]
-    user_prompt = f"Suggest related topics that would expand research on {topics_str}. Focus on topics that create interesting interdisciplinary connections."
+    prompt = get_prompt("related_topics")
+    messages = prompt.messages(topics=topics_str)
     
     try:
         # Call Grok API
-        completion = client.chat.completions.create(
-            model="grok-3",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.8,
-            max_tokens=1000,
-        )
+        start = time.perf_counter()
+        try:
+            completion = backend.create(
+                model=route.model,
+                messages=messages,
+                temperature=route.temperature,
+                max_tokens=route.max_tokens,
+            )
+        finally:
+            model_router.observe(route, time.perf_counter() - start)
+        prompt_usage.record(prompt, completion)
         
         # Extract the response
         response_text = completion.choices[0].message.content
@@ -241,53 +380,247 @@ def generate_related_topics(topics: List[str]):
             else:
                 json_str = response_text
                 
-            related_topics_data = json.loads(json_str)
+            related_topics_data = RelatedTopicsResponse.model_validate_json(json_str)
             return related_topics_data
-        except json.JSONDecodeError:
+        except ValidationError:
             raise HTTPException(status_code=500, detail="Failed to parse the response from Grok API")
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calling Grok API: {str(e)}")
 
+# Function to read a request's admission priority from its X-Priority header
+def request_priority(http_request: Request) -> int:
+    return PRIORITIES.get(http_request.headers.get("x-priority", "").lower(), DEFAULT_PRIORITY)
+
+# Function to identify the tenant a request is scheduled for: X-Tenant, else its API key, else the default tenant
+def request_tenant(http_request: Request) -> str:
+    tenant = http_request.headers.get("x-tenant")
+    if tenant:
+        return tenant[:64]
+    api_key = http_request.headers.get("x-api-key") or http_request.headers.get("authorization", "").removeprefix("Bearer ")
+    if api_key:
+        # Keys are only used as an identity, so only a digest is kept
+        return "key-" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+    return DEFAULT_TENANT
+
+# Function to note a served topic chain for GET /journeys/ and topic autocomplete
+def record_chain(all_topics: List[str], mode: str, research_id: str):
+    journeys[mode].insert(all_topics, research_id)
+    topic_index.record_many(all_topics)
+
+# Function to keep the research ids the store still holds
+def stored_research_ids(research_ids: List[Optional[str]]) -> Set[str]:
+    return {research_id for research_id in research_ids if research_id is not None and research_store.contains(research_id)}
+
+# Function to store generated research, compressed, and map its cache key to it for ``ttl`` seconds
+def store_research(key: str, response: ResearchResponse, ttl: Optional[float]) -> StoredResearch:
+    entry = research_store.put(response.model_dump_json().encode("utf-8"))
+    if ttl:
+        research_store.remember(key, entry.research_id, ttl=ttl)
+    return entry
+
+# Function to release an in-flight claim off the event loop, even while the request is being cancelled
+async def release_claim(key: str):
+    with anyio.CancelScope(shield=True):
+        await run_in_threadpool(research_store.release, key)
+
+# Function to answer a request whose deadline passed with the research sections generated so far
+def partial_research_response(key: str, all_topics: List[str]) -> PartialResearchResponse:
+    pending = pending_research.get(key)
+    research_data = partial_research(pending[1].text() if pending else "", all_topics)
+    return PartialResearchResponse(
+        research_output=research_data.research_output,
+        related_topics=research_data.related_topics,
+        connection_path=" → ".join(all_topics),
+        continuation_token=key,
+    )
+
+# Function to log generations that failed after their request already returned partial research
+def finish_background_generation(task: asyncio.Task):
+    background_generations.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Research generation failed: %s", task.exception())
+
+# Function to serve research from the cache, generating each topic chain at most once across workers
+async def get_or_generate_research(
+    primary_topic: str,
+    intent_topic: str,
+    previous_topics: Optional[List[str]] = None,
+    mode: str = STANDARD_MODE,
+    task: str = "research",
+    strategy: str = "single",
+    priority: int = DEFAULT_PRIORITY,
+    tenant: str = DEFAULT_TENANT,
+    deadline_ms: Optional[int] = None,
+) -> Union[StoredResearch, PartialResearchResponse]:
+    """
+    With ``deadline_ms``, research not ready in time is returned partially:
+    generation streams from Grok and carries on in the background, and the
+    partial response's continuation token is the cache key the finished
+    research is stored under.
+    """
+    if deadline_ms is not None and strategy != "single":
+        raise HTTPException(status_code=400, detail="deadline_ms is only supported with the single strategy")
+    all_topics = [primary_topic, intent_topic]
+    if previous_topics and len(previous_topics) > 0:
+        all_topics.extend(previous_topics)
+    key = research_key(all_topics, mode)
+    expires = None if deadline_ms is None else time.monotonic() + deadline_ms / 1000
+    
+    claimed = False
+    if RESEARCH_CACHE_TTL_SECONDS > 0:
+        deadline = time.monotonic() + INFLIGHT_TIMEOUT_SECONDS
+        while True:
+            # Store calls can block on disk and locks with the SQLite store, so they run off the event loop
+            entry = await run_in_threadpool(research_store.lookup, key)
+            if entry is not None:
+                record_chain(all_topics, mode, entry.research_id)
+                return entry
+            claimed = await run_in_threadpool(research_store.claim, key, INFLIGHT_TIMEOUT_SECONDS)
+            if claimed:
+                # The previous owner may have finished between the lookup and the claim
+                try:
+                    entry = await run_in_threadpool(research_store.lookup, key)
+                except BaseException:
+                    await release_claim(key)
+                    raise
+                if entry is not None:
+                    await release_claim(key)
+                    record_chain(all_topics, mode, entry.research_id)
+                    return entry
+                break
+            if time.monotonic() >= deadline:
+                break
+            if expires is not None and time.monotonic() >= expires:
+                return await run_in_threadpool(partial_research_response, key, all_topics)
+            # Another request is generating this chain; wait for its result instead of calling Grok again
+            await asyncio.sleep(INFLIGHT_POLL_SECONDS)
+    
+    # Other requests wait for this generation until then, so this request's claim is its budget
+    claim_expires = time.monotonic() + INFLIGHT_TIMEOUT_SECONDS
+    stream = None
+    if expires is not None:
+        stream = ResearchStream()
+        pending_research[key] = (all_topics, stream)
+    
+    async def generate() -> StoredResearch:
+        try:
+            # Cache hits and requests waiting on an identical generation never take an upstream slot
+            if strategy == "fanout":
+                # Fan-out output follows the same schema, so it shares the cache with single-call research
+                research_data = await generate_fanout_research(all_topics, mode, priority, tenant)
+            elif strategy == "compose":
+                # Pairs other requests are generating are only waited for while this request's claim on the chain lasts
+                research_data = await generate_composed_research(all_topics, mode, priority, tenant, claim_expires)
+            else:
+                async with admission.slot(priority, tenant):
+                    route = model_router.route(task, mode, topic_count=len(all_topics))
+                    research_data = await run_in_threadpool(generate_research, primary_topic, intent_topic, previous_topics, route, stream)
+            
+            # The generated document is already validated, so it is serialized without another validation pass
+            response = ResearchResponse.model_construct(
+                research_output=research_data.research_output,
+                related_topics=research_data.related_topics,
+                connection_path=" → ".join(all_topics),
+            )
+            ttl = None
+            if RESEARCH_CACHE_TTL_SECONDS > 0:
+                # Output from a latency fallback model is only reused briefly so the configured model takes over again
+                degraded = strategy == "single" and route.fallback
+                ttl = min(RESEARCH_CACHE_TTL_SECONDS, FALLBACK_CACHE_TTL_SECONDS) if degraded else RESEARCH_CACHE_TTL_SECONDS
+            elif stream is not None:
+                # Continuation tokens find the finished research even with the cache disabled
+                ttl = CONTINUATION_TTL_SECONDS
+            entry = await run_in_threadpool(store_research, key, response, ttl)
+            record_chain(all_topics, mode, entry.research_id)
+            topic_index.record_many((topic.topic for topic in research_data.related_topics), SUGGESTION_WEIGHT)
+            # The recommender's lock is shared with its queries, so learning runs off the event loop too
+            await run_in_threadpool(topic_recommender.record_research, research_data.model_dump(), all_topics)
+            return entry
+        finally:
+            if claimed:
+                await release_claim(key)
+            if stream is not None and pending_research.get(key, (None, None))[1] is stream:
+                del pending_research[key]
+    
+    if expires is None:
+        return await generate()
+    
+    # The generation outlives the request if the deadline passes, so its result is still cached for the continuation
+    generation = asyncio.create_task(generate())
+    background_generations.add(generation)
+    generation.add_done_callback(finish_background_generation)
+    try:
+        return await asyncio.wait_for(asyncio.shield(generation), timeout=max(0.0, expires - time.monotonic()))
+    except asyncio.TimeoutError:
+        return await run_in_threadpool(partial_research_response, key, all_topics)
+
+# Function to serve the result of get_or_generate_research, which is partial if its deadline passed
+def research_result_response(http_request: Request, result: Union[StoredResearch, PartialResearchResponse]):
+    if isinstance(result, PartialResearchResponse):
+        return model_response(result, headers={"Cache-Control": "no-store"})
+    return stored_research_response(http_request, result, cache_control=None)
+
+# Shed requests get a 503 with a hint for when to retry
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
 # API endpoints
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Multidisciplinary Research Explorer API"}
 
 @app.post("/research/", response_model=ResearchResponse)
-async def create_research(request: ResearchRequest):
+async def create_research(request: ResearchRequest, http_request: Request):
     """
     Generate multidisciplinary research connecting the provided topics.
     
     - **primary_topic**: The first topic to explore
     - **intent_topic**: The second topic to connect with the primary topic
     - **previous_topics**: Optional array of previously explored topics to connect with the first two
+    - **mode**: `fast` (cheaper, faster model), `standard` or `deep` (longer output)
+    - **strategy**: `single` (one completion), `fanout` (outline, then disciplines generated concurrently)
+      or `compose` (cached pairwise analyses of the topics plus one synthesis call)
+    - **deadline_ms**: Optional time budget; see below
+    
+    Research not ready within `deadline_ms` is returned with the sections
+    completed so far, `"partial": true` and a `continuation_token` for
+    `GET /research/continuations/{token}`, while generation carries on.
+    Only the `single` strategy supports deadlines.
     """
-    research_data = generate_research(
+    result = await get_or_generate_research(
         primary_topic=request.primary_topic,
         intent_topic=request.intent_topic,
-        previous_topics=request.previous_topics
+        previous_topics=request.previous_topics,
+        mode=request.mode,
+        strategy=request.strategy,
+        priority=request_priority(http_request),
+        tenant=request_tenant(http_request),
+        deadline_ms=request.deadline_ms,
     )
     
-    # Create connection path string
-    all_topics = [request.primary_topic, request.intent_topic]
-    if request.previous_topics and len(request.previous_topics) > 0:
-        all_topics.extend(request.previous_topics)
-    connection_path = " → ".join(all_topics)
-    
-    return {
-        "research_output": research_data["research_output"],
-        "related_topics": research_data["related_topics"],
-        "connection_path": connection_path
-    }
+    return research_result_response(http_request, result)
 
 @app.post("/continue-research/", response_model=ResearchResponse)
-async def continue_research(request: ContinueResearchRequest):
+async def continue_research(request: ContinueResearchRequest, http_request: Request):
     """
     Continue research by adding a new topic while maintaining all previous connections.
     
     - **topics**: List of all existing connected topics
     - **next_topic**: New topic to connect with the existing topics
+    - **mode**: `fast` (cheaper, faster model), `standard` or `deep` (longer output)
+    - **strategy**: `single` (one completion), `fanout` (outline, then disciplines generated concurrently)
+      or `compose` (cached pairwise analyses of the topics plus one synthesis call)
+    - **deadline_ms**: Optional time budget, as for `POST /research/`
+    
+    Clients holding the previous step's document can send `A-IM: json-patch`
+    and `Delta-Base` set to its ETag to receive `226 IM Used` with an RFC 6902
+    JSON Patch against it instead, whenever the patch is the smaller response.
     """
     # Get the current topics and the new topic to connect
     current_topics = request.topics
@@ -310,39 +643,201 @@ async def continue_research(request: ContinueResearchRequest):
     previous_topics.append(next_topic)
     
     # Generate research with the new structure
-    research_data = generate_research(
+    result = await get_or_generate_research(
         primary_topic=current_topics[0],
         intent_topic=current_topics[1],
-        previous_topics=previous_topics
+        previous_topics=previous_topics,
+        mode=request.mode,
+        task="continuation",
+        strategy=request.strategy,
+        priority=request_priority(http_request),
+        tenant=request_tenant(http_request),
+        deadline_ms=request.deadline_ms,
     )
     
-    # Create updated topics list and connection path
-    updated_topics = current_topics + [next_topic]
-    connection_path = " → ".join(updated_topics)
+    base_id = requested_delta_base(http_request)
+    if base_id is None or isinstance(result, PartialResearchResponse):
+        return research_result_response(http_request, result)
+    entry = result
     
-    return {
-        "research_output": research_data["research_output"],
-        "related_topics": research_data["related_topics"],
-        "connection_path": connection_path
-    }
+    # Diffing parses both documents, so it stays off the event loop along with the store read
+    base = await run_in_threadpool(research_store.get, base_id)
+    return await run_in_threadpool(stored_research_delta_response, http_request, entry, base)
+
+@app.get("/research/{research_id}", response_model=ResearchResponse)
+async def get_stored_research(research_id: str, http_request: Request):
+    """
+    Fetch previously generated research by its content address.
+    
+    - **research_id**: The id from the `Content-Location` header of a research response
+    
+    Responses carry a strong `ETag`, answer `If-None-Match` with 304 and are
+    compressed with brotli or gzip when the client accepts it.
+    """
+    entry = await run_in_threadpool(research_store.get, research_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Research not found")
+    
+    return stored_research_response(http_request, entry)
+
+@app.get("/research/continuations/{token}", response_model=ResearchResponse)
+async def get_research_continuation(token: str, http_request: Request):
+    """
+    Fetch the rest of research that was returned partially because its deadline passed.
+    
+    - **token**: The `continuation_token` of the partial response
+    
+    Once generation has finished this serves the full research like
+    `GET /research/{research_id}`. Until then it answers `202 Accepted` with
+    a `Retry-After` header and, on the worker generating it, the sections
+    completed so far.
+    """
+    entry = await run_in_threadpool(research_store.lookup, token) if RESEARCH_ID_PATTERN.match(token) else None
+    if entry is not None:
+        return stored_research_response(http_request, entry)
+    
+    headers = {"Retry-After": "1", "Cache-Control": "no-store"}
+    pending = pending_research.get(token)
+    if pending is not None:
+        partial = await run_in_threadpool(partial_research_response, token, pending[0])
+        return model_response(partial, status_code=202, headers=headers)
+    if await run_in_threadpool(research_store.is_claimed, token):
+        return JSONResponse(status_code=202, content={"detail": "Research is still being generated"}, headers=headers)
+    raise HTTPException(status_code=404, detail="Research not found; its generation may have failed or expired")
+
+@app.get("/journeys/", response_model=JourneyResponse)
+async def get_journey(topics: List[str] = Query(...), mode: Mode = STANDARD_MODE):
+    """
+    Look up a topic chain and the branches explored from it.
+    
+    - **topics**: The chain, in order, as repeated query parameters
+    - **mode**: The mode the research was generated in
+    
+    Returns the research id for the chain if it has been generated, the length
+    of the longest generated prefix, and every topic added after this chain
+    with its research id. Fetch any of them with `GET /research/{research_id}`.
+    Only chains served recently by this worker whose research is still
+    stored are listed.
+    """
+    trie = journeys[mode]
+    # Research the store has evicted since it was served is forgotten rather than listed with an id that answers 404
+    while True:
+        prefix_length, prefix_id = trie.longest_prefix(topics)
+        if prefix_id is None or await run_in_threadpool(research_store.contains, prefix_id):
+            break
+        trie.remove(topics[:prefix_length])
+    research_id = prefix_id if prefix_length == len(topics) else None
+    branches = trie.branches(topics)
+    stored = await run_in_threadpool(stored_research_ids, [branch_id for _, branch_id in branches])
+    for topic, branch_id in branches:
+        if branch_id is not None and branch_id not in stored:
+            trie.remove(topics + [topic])
+    # Evicted branches that led nowhere else are gone now; the rest keep only ids still stored
+    branches = trie.branches(topics)
+    
+    return model_response(JourneyResponse(
+        topics=topics,
+        research_id=research_id,
+        longest_prefix=prefix_length,
+        branches=[
+            JourneyBranch(topic=topic, research_id=branch_id if branch_id in stored else None)
+            for topic, branch_id in branches
+        ],
+    ))
+
+@app.get("/autocomplete/", response_model=AutocompleteResponse)
+async def autocomplete_topics(q: str = Query(..., max_length=MAX_TOPIC_LENGTH), limit: int = Query(10, ge=1, le=TOP_K)):
+    """
+    Suggest known topics for a partially typed one.
+    
+    - **q**: What has been typed so far
+    - **limit**: How many suggestions to return
+    
+    Topics come from research requests, generated research and related-topic
+    suggestions seen by this worker, most popular first. When too few topics
+    start with `q`, topics matching it with one typo corrected follow, marked
+    `fuzzy`. Picking a suggested spelling lets the request reuse cached research.
+    """
+    suggestions = [TopicSuggestion(**suggestion._asdict()) for suggestion in topic_index.suggest(q, limit)]
+    
+    return model_response(AutocompleteResponse(query=q, suggestions=suggestions))
 
 @app.post("/related-topics/", response_model=RelatedTopicsResponse)
-async def get_related_topics(request: RelatedTopicsRequest):
+async def get_related_topics(request: RelatedTopicsRequest, http_request: Request):
     """
     Generate related topics based on the provided topics.
     
     - **topics**: List of topics to find related topics for
+    - **mode**: `fast`, `standard` or `deep`
+    
+    Topics are ranked from the research this worker has already seen (topics,
+    themes and disciplines that occurred together) without calling Grok.
+    Grok is only asked when the topics have not been seen often enough to
+    suggest three, and its answer is learned for next time.
     """
-    related_topics_data = generate_related_topics(request.topics)
+    topic_index.record_many(request.topics)
+    if LOCAL_RELATED_TOPICS:
+        recommendations = await run_in_threadpool(topic_recommender.recommend, request.topics, RELATED_TOPICS_COUNT)
+        if len(recommendations) >= RELATED_TOPICS_COUNT:
+            related_topics = [RelatedTopic(topic=r.topic, relevance=r.relevance) for r in recommendations]
+            return model_response(RelatedTopicsResponse(related_topics=related_topics))
     
-    return related_topics_data
+    async with admission.slot(request_priority(http_request), request_tenant(http_request)):
+        related_topics_data = await run_in_threadpool(generate_related_topics, request.topics, request.mode)
+    topic_index.record_many((topic.topic for topic in related_topics_data.related_topics), SUGGESTION_WEIGHT)
+    await run_in_threadpool(topic_recommender.record, request.topics, [topic.topic for topic in related_topics_data.related_topics])
+    
+    return model_response(related_topics_data)
 
 @app.get("/health/")
 async def health_check():
     """Check if the API is running properly"""
     return {"status": "healthy", "api_version": "1.0.0"}
 
+@app.get("/prompt-usage/")
+async def get_prompt_usage():
+    """Report cached vs uncached prompt tokens per prompt template since startup"""
+    return prompt_usage.summary()
+
+@app.get("/admission/")
+async def get_admission_stats():
+    """Report upstream slots in use and queued requests per tenant, and how many were shed since startup"""
+    return admission.stats()
+
+@app.get("/pair-cache/")
+async def get_pair_cache_stats():
+    """Report how often composed research found its pairwise analyses already cached since startup"""
+    return pair_cache.stats()
+
+@app.get("/recommender/")
+async def get_recommender_stats():
+    """Report what the related-topic recommender has learned and how often it answered without Grok"""
+    return topic_recommender.stats()
+
+@app.get("/backends/")
+async def get_backend_stats():
+    """Report latency, error rate and availability per LLM endpoint when LLM_ENDPOINTS is configured"""
+    return {"endpoints": router_stats()}
+
+@app.get("/ready/")
+async def readiness_check():
+    """
+    Check if upstream connections are warm: Grok's, or with LLM_ENDPOINTS any one endpoint's,
+    since requests fail over to the endpoints that answer
+    """
+    if getattr(app.state, "ready", False):
+        return {"status": "ready"}
+    
+    return JSONResponse(
+        status_code=503,
+        content={"status": "warming", "error": getattr(app.state, "warmup_error", None)},
+    )
+
 # Run the application with uvicorn
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
+    workers = int(os.getenv("API_WORKERS", "1"))
+    if workers > 1:
+        # Workers are separate processes, so the research cache must live in a shared store
+        os.environ.setdefault("RESEARCH_STORE_PATH", "research_store.sqlite3")
+    uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=workers == 1, workers=workers)
@@ -0,0 +1,91 @@
+"""
+Overload benchmark for upstream admission control.
+
+Simulates an upstream that slows down as more calls share it (each call
+takes ``BASE_LATENCY`` times the number of concurrent calls over
+``CAPACITY``) and offers it twice the load it can serve. Without admission
+control every request is sent upstream and latency grows for everyone;
+with it, excess requests are shed with 503 and admitted requests keep a
+bounded latency.
+
+    python benchmarks/admission_bench.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, Overloaded
+
+CAPACITY = 8            # concurrent calls the upstream serves at full speed
+BASE_LATENCY = 0.05     # seconds per call at or below capacity
+OVERLOAD = 2.0          # offered load relative to capacity
+DURATION = 5.0          # seconds of arrivals
+
+
+class MockUpstream:
+    def __init__(self):
+        self.inflight = 0
+
+    async def call(self) -> None:
+        self.inflight += 1
+        try:
+            # Processor sharing: beyond capacity every call slows down proportionally
+            await asyncio.sleep(BASE_LATENCY * max(1.0, self.inflight / CAPACITY))
+        finally:
+            self.inflight -= 1
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else float("nan")
+
+
+async def run(controller=None, seed=3):
+    upstream = MockUpstream()
+    rng = random.Random(seed)
+    rate = OVERLOAD * CAPACITY / BASE_LATENCY
+    latencies, shed = [], 0
+
+    async def request():
+        nonlocal shed
+        start = time.perf_counter()
+        try:
+            if controller is None:
+                await upstream.call()
+            else:
+                async with controller.slot():
+                    await upstream.call()
+        except Overloaded:
+            shed += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    tasks = []
+    deadline = time.perf_counter() + DURATION
+    while time.perf_counter() < deadline:
+        tasks.append(asyncio.create_task(request()))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    return len(tasks), latencies, shed
+
+
+async def main():
+    print("=== ADMISSION CONTROL BENCHMARK ===")
+    print(f"upstream capacity {CAPACITY} calls at {BASE_LATENCY * 1000:.0f} ms, offered load {OVERLOAD:.1f}x")
+    print(f"{'policy':<14}{'requests':>10}{'shed':>8}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    policies = [
+        ("unbounded", None),
+        ("admission", AdmissionController(CAPACITY, max_queue=2 * CAPACITY, queue_timeout=1.0)),
+    ]
+    for name, controller in policies:
+        total, latencies, shed = await run(controller)
+        print(f"{name:<14}{total:>10}{shed:>8}{percentile(latencies, 0.5) * 1000:>9.0f}"
+              f"{percentile(latencies, 0.99) * 1000:>9.0f}{max(latencies) * 1000:>9.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
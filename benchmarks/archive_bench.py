@@ -0,0 +1,96 @@
+"""
+Storage benchmark for research archives.
+
+Builds a corpus of research documents from the sample outputs in example1.md
+and example2.md, varied per topic chain, and compares the bytes needed to
+keep them as plain JSON, as per-document gzip (the encoding the research
+store keeps for HTTP), and in a dictionary-compressed archive. It then times
+random single-document reads from the memory-mapped archive.
+
+    python benchmarks/archive_bench.py [documents]
+
+Documents derived from two samples share more text than real Grok output
+does, so treat the ratios as an upper bound and rerun on bulk_research.py
+output (``python research_archive.py build``) for production figures.
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.samples import load_sample_documents
+from research_archive import CODEC_ZLIB, CODEC_ZSTD, ResearchArchive, build_archive, zstandard
+from research_store import GZIP_LEVEL, research_cache_key
+
+VOCABULARY = [
+    "Coffee", "Politics", "Gender", "Colonialism", "Music", "Mathematics", "Biology", "Architecture",
+    "Poetry", "Climate", "Migration", "Religion", "Cinema", "Economics", "Language", "Memory",
+    "Medicine", "Sport", "Cooking", "Astronomy", "Law", "Textiles", "Ocean", "Labor",
+]
+
+
+# Function to build a varied corpus of serialized research documents
+def make_corpus(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    samples = load_sample_documents()
+    corpus = []
+    for i in range(count):
+        topics = rng.sample(VOCABULARY, rng.randint(2, 5))
+        document = json.loads(json.dumps(samples[i % len(samples)]))
+        output = document["research_output"]
+        output["title"] = f"Connecting {', '.join(topics)}: A Multidisciplinary Exploration"
+        rng.shuffle(output["connections"])
+        for connection in output["connections"]:
+            connection["subtopics"] = rng.sample(connection["subtopics"], len(connection["subtopics"]) * 2 // 3)
+        output["research_questions"] = rng.sample(output["research_questions"], len(output["research_questions"]) // 2)
+        output["mind_map"]["central_themes"] = topics
+        for key_connection in output["mind_map"]["key_connections"]:
+            key_connection["connects_to"] = rng.choice(topics)
+        body = json.dumps({**document, "connection_path": " → ".join(topics)}, ensure_ascii=False)
+        corpus.append((research_cache_key(topics + [str(i)]), body.encode("utf-8")))
+    return corpus
+
+
+def bench_archive(path, corpus, codec, reads=2000):
+    start = time.perf_counter()
+    build_archive(path, corpus, codec=codec)
+    build_seconds = time.perf_counter() - start
+    size = os.path.getsize(path)
+
+    keys = [key for key, _ in random.Random(1).sample(corpus, min(reads, len(corpus)))]
+    with ResearchArchive(path) as archive:
+        start = time.perf_counter()
+        for key in keys:
+            archive.get(key)
+        read_us = (time.perf_counter() - start) / len(keys) * 1e6
+        assert archive.get(corpus[0][0]) == corpus[0][1]
+    return size, build_seconds, read_us
+
+
+def main(count: int = 2000):
+    corpus = make_corpus(count)
+    raw_size = sum(len(body) for _, body in corpus)
+    gzip_size = sum(len(gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)) for _, body in corpus)
+
+    print("=== RESEARCH ARCHIVE BENCHMARK ===")
+    print(f"{count} documents, {raw_size / count / 1024:.1f} KiB average")
+    print(f"{'format':<22}{'bytes':>14}{'ratio':>8}{'build s':>9}{'read µs':>9}")
+    print(f"{'json':<22}{raw_size:>14}{1.0:>8.1f}")
+    print(f"{'gzip per document':<22}{gzip_size:>14}{raw_size / gzip_size:>8.1f}")
+
+    codecs = [("archive (zlib + zdict)", CODEC_ZLIB)]
+    if zstandard is not None:
+        codecs.append(("archive (zstd + dict)", CODEC_ZSTD))
+    with tempfile.TemporaryDirectory() as directory:
+        for name, codec in codecs:
+            size, build_seconds, read_us = bench_archive(os.path.join(directory, f"{codec}.rarc"), corpus, codec)
+            print(f"{name:<22}{size:>14}{raw_size / size:>8.1f}{build_seconds:>9.1f}{read_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
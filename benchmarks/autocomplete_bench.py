@@ -0,0 +1,95 @@
+"""
+Autocomplete benchmark for the topic index.
+
+Builds an index of ``TOPICS`` synthetic topics with Zipf-distributed
+popularity, then measures prefix lookups of every length, typo-tolerant
+lookups and incremental inserts into the full index.
+
+    python benchmarks/autocomplete_bench.py
+    python benchmarks/autocomplete_bench.py 200000
+"""
+import os
+import random
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from topic_index import TopicIndex
+
+TOPICS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+QUERIES = 2000
+SYLLABLES = ["ka", "lo", "mi", "ne", "su", "ra", "to", "vi", "pe", "do", "an", "el", "or", "ist", "ism", "ics",
+             "bar", "chu", "fen", "gal", "hor", "jo", "qua", "wen", "yu", "zo", "ter", "pol", "geo", "bio"]
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_topic(rng: random.Random) -> str:
+    return " ".join(make_word(rng) for _ in range(rng.randint(1, 3))).title()
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return [ordered[min(len(ordered) - 1, int(f * len(ordered)))] * 1e6 for f in (0.5, 0.99)]
+
+
+def time_queries(index: TopicIndex, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.suggest(query)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def typo(rng: random.Random, text: str) -> str:
+    i = rng.randrange(len(text))
+    return text[:i] + text[i + 1:]
+
+
+def main():
+    rng = random.Random(7)
+    topics = list({make_topic(rng) for _ in range(int(TOPICS * 1.35))})[:TOPICS]
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    index = TopicIndex()
+    start = time.perf_counter()
+    for rank, topic in enumerate(topics, 1):
+        index.record(topic, weight=1000.0 / rank)  # Zipf popularity
+    build = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print("=== AUTOCOMPLETE BENCHMARK ===")
+    print(f"{len(index):,} topics indexed in {build:.1f}s, ~{(rss_after - rss_before) / 1024:.0f} MB peak RSS growth")
+    print(f"{'queries':<28}{'p50 us':>9}{'p99 us':>9}{'cold p99 us':>13}")
+
+    popular = topics[:QUERIES]
+    for length in (1, 2, 3, 5, 8):
+        queries = [rng.choice(popular)[:length] for _ in range(QUERIES)]
+        cold = time_queries(index, queries)
+        warm = time_queries(index, queries)
+        p50, p99 = percentiles(warm)
+        print(f"{f'prefix, {length} chars':<28}{p50:>9.0f}{p99:>9.0f}{percentiles(cold)[1]:>13.0f}")
+
+    queries = [typo(rng, topic.lower()[:8]) for topic in rng.sample(topics, QUERIES)]
+    queries = [q for q in queries if not index.suggest(q, 1) or index.suggest(q, 1)[0].fuzzy]
+    corrected = sum(1 for q in queries if index.suggest(q))
+    p50, p99 = percentiles(time_queries(index, queries))
+    print(f"{'one typo, 7 chars':<28}{p50:>9.0f}{p99:>9.0f}   ({corrected}/{len(queries)} corrected)")
+
+    new_topics = [make_topic(rng) + " Studies" for _ in range(20000)]
+    start = time.perf_counter()
+    for topic in new_topics:
+        index.record(topic)
+    inserts = time.perf_counter() - start
+    print(f"\n{len(new_topics):,} incremental inserts: {inserts / len(new_topics) * 1e6:.1f} us each (merges included)")
+    hits = sum(1 for topic in new_topics[:1000] if index.suggest(topic[:-3], 1)[0].topic == topic)
+    print(f"new topics found by their prefix right away: {hits}/1000")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Deadline benchmark for research requests.
+
+Sends ``REQUESTS`` research requests for distinct topic chains through the
+API against a mock backend whose completion time is log-normally
+distributed (median ``MEDIAN_SECONDS``, long tail), once without a deadline
+and once with ``deadline_ms``. Reports client latency percentiles, how many
+responses were partial and how much of the document they carried, and how
+long after the deadline their continuation tokens resolved to the full
+research.
+
+    python benchmarks/deadline_bench.py
+    python benchmarks/deadline_bench.py 1500
+"""
+import asyncio
+import hashlib
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("GROK_BACKEND_MODE", "mock")
+os.environ.setdefault("GROK_PREWARM", "false")
+
+import httpx
+
+import api
+from grok_backend import MockBackend
+from research_store import ResearchStore
+
+DEADLINE_MS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+REQUESTS = 200
+CONCURRENCY = 8
+MEDIAN_SECONDS = 0.5
+SIGMA = 0.8  # log-normal shape; p99 is about 6x the median
+
+
+class SlowTailBackend(MockBackend):
+    """Mock backend whose latency depends on the prompt, so both runs see the same slow chains."""
+
+    def create(self, **params):
+        seed = hashlib.sha256(params["messages"][-1]["content"].encode("utf-8")).digest()
+        latency = MEDIAN_SECONDS * math.exp(SIGMA * random.Random(seed).gauss(0, 1))
+        return MockBackend(latency=latency, model=self.model).create(**params)
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(client, deadline_ms):
+    # Each run starts from an empty store so nothing is served from the first run's cache
+    api.research_store = ResearchStore()
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies, partials, continuations = [], [], []
+
+    async def one(i):
+        body = {"primary_topic": f"Topic {i}", "intent_topic": f"Intent {i}"}
+        if deadline_ms is not None:
+            body["deadline_ms"] = deadline_ms
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/research/", json=body)
+            latencies.append(time.perf_counter() - start)
+        document = response.json()
+        if not document.get("partial"):
+            return
+        carried = len(response.content)
+        partials.append(carried)
+        returned = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.05)
+            continuation = await client.get(f"/research/continuations/{document['continuation_token']}")
+            if continuation.status_code == 200:
+                continuations.append((time.perf_counter() - returned, carried / len(continuation.content)))
+                return
+
+    await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    return latencies, partials, continuations
+
+
+async def main():
+    api.get_backend = lambda client_factory: SlowTailBackend()
+    print("=== DEADLINE BENCHMARK ===")
+    print(f"{REQUESTS} requests, {CONCURRENCY} concurrent, upstream median {MEDIAN_SECONDS}s (log-normal, sigma {SIGMA})")
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        for deadline_ms in (None, DEADLINE_MS):
+            latencies, partials, continuations = await run(client, deadline_ms)
+            label = "no deadline" if deadline_ms is None else f"deadline_ms={deadline_ms}"
+            print(f"\n{label}")
+            print("  latency: " + ", ".join(f"p{int(f * 100)} {percentile(latencies, f):.2f}s" for f in (0.5, 0.9, 0.99))
+                  + f", max {max(latencies):.2f}s")
+            if partials:
+                waits = [wait for wait, _ in continuations]
+                shares = [share for _, share in continuations]
+                print(f"  partial responses: {len(partials) / REQUESTS:.0%}, "
+                      f"carrying {sum(shares) / len(shares):.0%} of the full document's bytes on average")
+                print(f"  continuation resolved after: p50 {percentile(waits, 0.5):.2f}s, max {max(waits):.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
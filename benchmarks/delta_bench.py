@@ -0,0 +1,113 @@
+"""
+Delta response benchmark for /continue-research/.
+
+Runs one eight-topic journey through the API against a local backend whose
+text depends on each prompt, once per strategy, and compares every
+continuation step served in full with the same step served as a JSON Patch
+against the previous one: bytes on the wire (identity and gzip) and the
+client's time to parse (and patch) the response.
+
+With ``single``, every step is regenerated from scratch, so little carries
+over and the server falls back to full documents. With ``compose``, the
+pairwise analyses of earlier steps carry over verbatim and patches are small.
+
+    python benchmarks/delta_bench.py
+"""
+import gzip
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("GROK_BACKEND_MODE", "mock")
+os.environ.setdefault("GROK_PREWARM", "false")
+
+from fastapi.testclient import TestClient
+
+import api
+from compose import PairCache
+from grok_backend import MockBackend, mock_document
+from json_patch import apply_patch
+from research_store import ResearchStore
+
+JOURNEY = ["Coffee", "Politics", "Gender", "Colonialism", "Trade", "Labor", "Climate", "Migration"]
+SYLLABLES = ["ka", "lo", "mi", "ne", "su", "ra", "to", "vi", "pe", "do", "an", "el", "or", "is", "um", "ter"]
+WORDS = ["".join(random.Random(i).choices(SYLLABLES, k=random.Random(-i).randint(1, 4))) for i in range(3000)]
+
+
+class TextBackend(MockBackend):
+    """Mock backend whose prose is derived from the prompt, so different prompts get different text."""
+
+    def completion_payload(self, params):
+        payload = super().completion_payload(params)
+        seed = hashlib.sha256(params["messages"][-1]["content"].encode("utf-8")).digest()
+        rng = random.Random(seed)
+
+        def prose(value):
+            if isinstance(value, dict):
+                return {k: prose(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [prose(v) for v in value]
+            if isinstance(value, str) and len(value) > 12:
+                return " ".join(rng.choice(WORDS) for _ in range(rng.randint(25, 60))).capitalize() + "."
+            return value
+
+        document = prose(mock_document(params["messages"]))
+        payload["choices"][0]["message"]["content"] = json.dumps(document)
+        return payload
+
+
+def timed(function, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat * 1e6
+
+
+def run(client, strategy):
+    # Research is cached per topic chain whatever the strategy, so each strategy starts from an empty store
+    api.research_store = ResearchStore()
+    api.pair_cache = PairCache(ResearchStore(), api.RESEARCH_CACHE_TTL_SECONDS)
+    research = client.post("/research/", json={"primary_topic": JOURNEY[0], "intent_topic": JOURNEY[1], "strategy": strategy})
+    base_etag, base = research.headers["etag"], research.json()
+    rows = []
+    for step in range(2, len(JOURNEY)):
+        body = {"topics": JOURNEY[:step], "next_topic": JOURNEY[step], "strategy": strategy}
+        full = client.post("/continue-research/", json=body, headers={"Accept-Encoding": "identity"})
+        delta = client.post("/continue-research/", json=body,
+                            headers={"Accept-Encoding": "identity", "A-IM": "json-patch", "Delta-Base": base_etag})
+
+        document, parse_full = timed(lambda: json.loads(full.content))
+        if delta.status_code == 226:
+            patched, parse_delta = timed(lambda: apply_patch(base, json.loads(delta.content)))
+            assert patched == document
+        else:
+            parse_delta = parse_full
+        rows.append((len(full.content), len(gzip.compress(full.content, 9)), delta.status_code,
+                     len(delta.content), len(gzip.compress(delta.content, 9)), parse_full, parse_delta))
+        base_etag, base = full.headers["etag"], document
+    return rows
+
+
+def main():
+    backend = TextBackend()
+    api.get_backend = lambda client_factory: backend
+    print("=== DELTA RESPONSE BENCHMARK ===")
+    with TestClient(api.app) as client:
+        for strategy in ("single", "compose"):
+            rows = run(client, strategy)
+            print(f"\nstrategy={strategy}")
+            print(f"{'step':<6}{'full B':>9}{'full gz':>9}{'status':>8}{'delta B':>9}{'delta gz':>9}{'parse us':>10}{'patch us':>10}")
+            for step, (full, full_gz, status, delta, delta_gz, parse_full, parse_delta) in enumerate(rows, 3):
+                print(f"{step:<6}{full:>9}{full_gz:>9}{status:>8}{delta:>9}{delta_gz:>9}{parse_full:>10.0f}{parse_delta:>10.0f}")
+            totals = [sum(column) for column in zip(*rows)]
+            print(f"{'total':<6}{totals[0]:>9}{totals[1]:>9}{'':>8}{totals[3]:>9}{totals[4]:>9}{totals[5]:>10.0f}{totals[6]:>10.0f}"
+                  f"   ({totals[4] / totals[1]:.0%} of gzipped bytes)")
+
+
+if __name__ == "__main__":
+    main()
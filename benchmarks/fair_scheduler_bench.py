@@ -0,0 +1,118 @@
+"""
+Fairness benchmark for the upstream scheduler.
+
+A mock upstream serves ``CAPACITY`` concurrent calls of ``BASE_LATENCY``
+seconds (with jitter). A batch tenant keeps ``BATCH_WORKERS`` requests
+outstanding at all times, saturating it, while interactive tenants arrive
+at random at a fraction of capacity. The benchmark compares interactive
+latency with no batch load, with arrival-order (FIFO) admission, with fair
+queueing between tenants and with the batch class capped as well, then checks that two saturating tenants
+weighted 3:1 get upstream slots in that ratio.
+
+    python benchmarks/fair_scheduler_bench.py
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import BATCH_PRIORITY, DEFAULT_PRIORITY, AdmissionController, TenantPolicy
+
+CAPACITY = 8              # concurrent upstream calls
+BASE_LATENCY = 0.05       # seconds per call
+JITTER = 0.2              # +/- fraction of BASE_LATENCY
+BATCH_WORKERS = 64        # outstanding batch requests
+INTERACTIVE_LOAD = 0.3    # interactive arrivals as a fraction of capacity
+INTERACTIVE_TENANTS = ["alice", "bob", "carol"]
+DURATION = 4.0
+
+
+async def upstream_call(rng: random.Random) -> None:
+    await asyncio.sleep(BASE_LATENCY * (1 + rng.uniform(-JITTER, JITTER)))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else float("nan")
+
+
+async def scenario(controller, batch: bool, batch_priority: int, batch_tenant: str, fifo: bool = False, seed: int = 11):
+    rng = random.Random(seed)
+    stop = time.perf_counter() + DURATION
+    interactive, batch_done = [], 0
+
+    async def batch_worker():
+        nonlocal batch_done
+        while time.perf_counter() < stop:
+            async with controller.slot(batch_priority, batch_tenant):
+                await upstream_call(rng)
+            if time.perf_counter() < stop:
+                batch_done += 1
+
+    async def interactive_request(tenant):
+        start = time.perf_counter()
+        async with controller.slot(DEFAULT_PRIORITY, tenant):
+            await upstream_call(rng)
+        interactive.append(time.perf_counter() - start)
+
+    workers = [asyncio.create_task(batch_worker()) for _ in range(BATCH_WORKERS if batch else 0)]
+    requests = []
+    rate = INTERACTIVE_LOAD * CAPACITY / BASE_LATENCY
+    while time.perf_counter() < stop:
+        # Arrival order is one tenant and one class for everybody
+        tenant = batch_tenant if fifo else rng.choice(INTERACTIVE_TENANTS)
+        requests.append(asyncio.create_task(interactive_request(tenant)))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*requests, *workers)
+    return interactive, batch_done
+
+
+def controller(**kwargs):
+    return AdmissionController(CAPACITY, max_queue=10000, queue_timeout=60.0, **kwargs)
+
+
+async def weighted_shares():
+    scheduler = controller(tenants={"heavy": TenantPolicy(weight=3.0), "light": TenantPolicy(weight=1.0)})
+    rng = random.Random(5)
+    done = {"heavy": 0, "light": 0}
+    stop = time.perf_counter() + DURATION / 2
+
+    async def worker(tenant):
+        while time.perf_counter() < stop:
+            async with scheduler.slot(BATCH_PRIORITY, tenant):
+                await upstream_call(rng)
+            # Requests still queued at the deadline drain afterwards and would skew the shares
+            if time.perf_counter() < stop:
+                done[tenant] += 1
+
+    await asyncio.gather(*(worker(tenant) for tenant in ("heavy", "light") for _ in range(BATCH_WORKERS // 2)))
+    return done
+
+
+async def main():
+    print("=== FAIR SCHEDULER BENCHMARK ===")
+    print(f"upstream {CAPACITY} x {BASE_LATENCY * 1000:.0f} ms, {BATCH_WORKERS} batch requests outstanding, "
+          f"interactive load {INTERACTIVE_LOAD:.0%} of capacity")
+    print(f"{'policy':<26}{'interactive':>12}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'batch/s':>9}")
+    scenarios = [
+        ("no batch load", controller(), False, DEFAULT_PRIORITY, False),
+        ("arrival order (FIFO)", controller(), True, DEFAULT_PRIORITY, True),
+        ("fair queueing by tenant", controller(), True, DEFAULT_PRIORITY, False),
+        ("fair + batch class", controller(batch_max_concurrent=CAPACITY * 3 // 4), True, BATCH_PRIORITY, False),
+    ]
+    for name, scheduler, batch, batch_priority, fifo in scenarios:
+        latencies, batch_done = await scenario(scheduler, batch, batch_priority, "etl", fifo)
+        print(f"{name:<26}{len(latencies):>12}{percentile(latencies, 0.5) * 1000:>9.0f}"
+              f"{percentile(latencies, 0.95) * 1000:>9.0f}{percentile(latencies, 0.99) * 1000:>9.0f}"
+              f"{batch_done / DURATION:>9.0f}")
+
+    done = await weighted_shares()
+    print(f"\nTwo saturating tenants weighted 3:1 completed {done['heavy']} and {done['light']} calls "
+          f"({done['heavy'] / max(done['light'], 1):.2f}:1)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+Related-topic recommender benchmark.
+
+Trains the recommender on ``DOCUMENTS`` synthetic research documents whose
+topics, themes and disciplines come from latent clusters, then asks it for
+three related topics for the chains of held-out documents. Reports how many
+queries it answers without Grok, how often a recommendation is one of the
+topics the held-out document actually suggested, and query latency with
+SciPy sparse scoring and with the pure Python fallback. Suggestions are
+drawn at random from the cluster of each chain, so three random topics of
+the right cluster (the oracle) are as good as any recommender can do, and
+the three most popular topics are the floor.
+
+    python benchmarks/recommender_bench.py
+    python benchmarks/recommender_bench.py 200000
+"""
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recommender
+from recommender import TopicRecommender
+
+DOCUMENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+HELD_OUT = 1000
+CLUSTERS = 200
+TOPICS_PER_CLUSTER = 25
+THEMES_PER_CLUSTER = 12
+DISCIPLINES = [f"Discipline {i}" for i in range(40)]
+
+
+def make_corpus(count, seed=11):
+    rng = random.Random(seed)
+    cluster_weights = [1.0 / rank for rank in range(1, CLUSTERS + 1)]
+    documents = []
+    for _ in range(count):
+        cluster = rng.choices(range(CLUSTERS), weights=cluster_weights)[0]
+        members = [f"Topic {cluster}-{i}" for i in range(TOPICS_PER_CLUSTER)]
+        chain = rng.sample(members, rng.randint(2, 4))
+        if rng.random() < 0.3:
+            # Journeys often wander into another area
+            other = rng.randrange(CLUSTERS)
+            chain.append(f"Topic {other}-{rng.randrange(TOPICS_PER_CLUSTER)}")
+        related = rng.sample([topic for topic in members if topic not in chain], 3)
+        themes = [f"Theme {cluster}-{rng.randrange(THEMES_PER_CLUSTER)}" for _ in range(8)]
+        disciplines = [DISCIPLINES[(cluster + rng.randrange(3)) % len(DISCIPLINES)] for _ in range(4)]
+        documents.append((chain, related, themes, disciplines))
+    return documents
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    return [ordered[min(len(ordered) - 1, int(f * len(ordered)))] * 1e6 for f in (0.5, 0.99)]
+
+
+def main():
+    print("=== RELATED-TOPIC RECOMMENDER BENCHMARK ===")
+    corpus = make_corpus(DOCUMENTS + HELD_OUT)
+    training, held_out = corpus[:DOCUMENTS], corpus[DOCUMENTS:]
+    popular = [topic for topic, _ in Counter(t for _, related, _, _ in training for t in related).most_common(3)]
+
+    for vectorized in (True, False):
+        if vectorized and not recommender.vectorization_available():
+            print("\nNumPy/SciPy not installed; skipping vectorized scoring")
+            continue
+        model = TopicRecommender(vectorized=vectorized)
+        start = time.perf_counter()
+        for chain, related, themes, disciplines in training:
+            model.record(chain, related, themes, disciplines)
+        learn = time.perf_counter() - start
+        if vectorized:
+            start = time.perf_counter()
+            model.recommend(held_out[0][0])  # builds the matrix
+            print(f"\n{len(model):,} documents learned in {learn:.1f}s, sparse matrix built in {time.perf_counter() - start:.2f}s")
+        else:
+            print(f"\n{len(model):,} documents learned in {learn:.1f}s")
+
+        rng = random.Random(5)
+        samples, answered, hits, baseline_hits, oracle_hits = [], 0, 0, 0, 0
+        for chain, related, _, _ in held_out:
+            start = time.perf_counter()
+            recommendations = model.recommend(chain, 3)
+            samples.append(time.perf_counter() - start)
+            if len(recommendations) == 3:
+                answered += 1
+            hits += any(r.topic in related for r in recommendations)
+            baseline_hits += any(topic in related for topic in popular)
+            cluster = chain[0].split()[1].split("-")[0]
+            members = [f"Topic {cluster}-{i}" for i in range(TOPICS_PER_CLUSTER)]
+            oracle_hits += any(topic in related for topic in rng.sample([t for t in members if t not in chain], 3))
+        p50, p99 = percentiles(samples)
+        print(f"scoring: {'scipy sparse' if vectorized else 'pure python'}")
+        print(f"  answered without Grok: {answered / len(held_out):.1%}")
+        print(f"  hit@3 (a held-out suggestion recommended): {hits / len(held_out):.1%}"
+              f"   most popular: {baseline_hits / len(held_out):.1%}   cluster oracle: {oracle_hits / len(held_out):.1%}")
+        print(f"  latency: p50 {p50 / 1000:.2f} ms, p99 {p99 / 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
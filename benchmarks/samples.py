@@ -0,0 +1,87 @@
+import os
+import re
+from typing import Any, Dict, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXAMPLE_FILES = ["example1.md", "example2.md"]
+
+DISCIPLINES = [
+    "Sociology",
+    "Economics",
+    "History",
+    "Anthropology",
+    "Political Science",
+    "Environmental Studies",
+    "Cultural Studies",
+]
+
+
+# Function to split a markdown example into blocks of non-empty lines
+def _blocks(text: str) -> List[List[str]]:
+    blocks, current = [], []
+    for line in text.splitlines():
+        line = line.strip(" \t-")
+        if line:
+            current.append(line)
+        elif current:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+# Function to turn an example conversation into a document shaped like a Grok research output
+def document_from_markdown(text: str, topics: List[str]) -> Dict[str, Any]:
+    blocks = _blocks(text)
+    paragraphs = [line for block in blocks for line in block if len(line) > 200]
+    questions = [line.split(":", 1)[-1].strip() for block in blocks for line in block if line.endswith("?")]
+
+    connections = [
+        {"discipline": discipline, "explanation": "", "subtopics": [], "themes": []}
+        for discipline in DISCIPLINES
+    ]
+    key_connections = []
+    subtopic_blocks = [block for block in blocks if len(block) >= 2]
+    for i, block in enumerate(subtopic_blocks):
+        connection = connections[i % len(connections)]
+        details = [line for line in block[1:] if not line.endswith("?")]
+        connection["subtopics"].append({"name": block[0], "details": " ".join(details)})
+        connection["themes"].extend(details[:1])
+        key_connections.append({
+            "node": block[0],
+            "connects_to": topics[i % len(topics)],
+            "research_angles": "; ".join(details[:2]),
+        })
+    for i, connection in enumerate(connections):
+        connection["explanation"] = paragraphs[i % len(paragraphs)] if paragraphs else ""
+
+    title_topics = ", ".join(topics[:-1]) + f", and {topics[-1]}"
+    return {
+        "research_output": {
+            "title": f"Connecting {title_topics}: A Multidisciplinary Exploration",
+            "introduction": paragraphs[0] if paragraphs else "",
+            "connections": connections,
+            "research_questions": questions,
+            "cross_cutting_themes": [re.sub(r"\s+", " ", block[0]) for block in blocks[:5]],
+            "mind_map": {
+                "central_themes": topics,
+                "key_connections": key_connections,
+            },
+        },
+        "related_topics": [
+            {"topic": "Fair Trade", "relevance": "Ethical trade schemes shape coffee politics and gendered labor."},
+            {"topic": "Migration", "relevance": "Labor migration links coffee production to colonial legacies."},
+            {"topic": "Climate Change", "relevance": "Shifting growing regions alter coffee economies and politics."},
+        ],
+    }
+
+
+# Function to load research documents built from the sample outputs shipped with the repo
+def load_sample_documents() -> List[Dict[str, Any]]:
+    topics = ["Coffee", "Politics", "Gender", "Colonialism"]
+    documents = []
+    for filename in EXAMPLE_FILES:
+        with open(os.path.join(REPO_ROOT, filename), "r", encoding="utf-8") as f:
+            documents.append(document_from_markdown(f.read(), topics))
+    return documents
@@ -0,0 +1,78 @@
+"""
+Microbenchmark for research response serialization.
+
+Compares the original path (stdlib decode into dicts, generic Pydantic
+validation, jsonable_encoder + stdlib encode) against the typed single-pass
+path and the cached pass-through path, using documents built from the
+sample outputs in example1.md and example2.md.
+
+    python benchmarks/serialization_bench.py
+"""
+import json
+import os
+import sys
+import timeit
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from benchmarks.samples import load_sample_documents
+from schemas import GeneratedResearch, ResearchResponse
+
+CONNECTION_PATH = "Coffee → Politics → Gender → Colonialism"
+
+
+# Response model as it was before the typed schema
+class UntypedResearchResponse(BaseModel):
+    research_output: Dict[str, Any]
+    related_topics: List[Dict[str, str]]
+    connection_path: str
+
+
+def untyped_path(raw: str) -> bytes:
+    data = json.loads(raw)
+    response = UntypedResearchResponse(
+        research_output=data["research_output"],
+        related_topics=data["related_topics"],
+        connection_path=CONNECTION_PATH,
+    )
+    content = jsonable_encoder(response)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def typed_path(raw: str) -> bytes:
+    research = GeneratedResearch.model_validate_json(raw)
+    response = ResearchResponse.model_construct(
+        research_output=research.research_output,
+        related_topics=research.related_topics,
+        connection_path=CONNECTION_PATH,
+    )
+    return response.model_dump_json().encode("utf-8")
+
+
+def main(number: int = 200):
+    print("=== RESEARCH RESPONSE SERIALIZATION BENCHMARK ===")
+    for i, document in enumerate(load_sample_documents(), 1):
+        raw = json.dumps(document)
+        cached = typed_path(raw)
+
+        timings = {
+            "untyped (json + Dict[str, Any] + jsonable_encoder)": lambda: untyped_path(raw),
+            "typed (model_validate_json + model_dump_json)": lambda: typed_path(raw),
+            # Cached bytes are already validated and are written to the socket as-is
+            "pass-through (cached bytes)": lambda: bytes(cached),
+        }
+
+        print(f"\nDocument {i}: {len(raw)} bytes")
+        baseline = None
+        for name, func in timings.items():
+            per_call = min(timeit.repeat(func, number=number, repeat=5)) / number
+            baseline = baseline or per_call
+            print(f"  {name:<55} {per_call * 1e6:9.1f} us  ({baseline / per_call:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
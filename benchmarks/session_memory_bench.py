@@ -0,0 +1,127 @@
+"""
+Session memory benchmark for the Streamlit app.
+
+Simulates ``SESSIONS`` browser sessions, each following one journey of a
+given length over a Zipf-popular pool of topics, and measures with
+tracemalloc the memory held by session state in two layouts:
+
+- documents: every session keeps the parsed research for each chain it
+  explored and for the chain on screen (the app before session state held
+  references)
+- references: sessions keep topic chains and research ids, and the documents
+  live once in a research store shared by all sessions and bounded to
+  ``STORE_MAX_ENTRIES`` documents
+
+    python benchmarks/session_memory_bench.py
+    python benchmarks/session_memory_bench.py 2000
+"""
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from research_store import ResearchStore, research_cache_key
+from topic_trie import TopicTrie
+
+SESSIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+JOURNEY_LENGTHS = (2, 4, 6, 8, 10)
+STORE_MAX_ENTRIES = 1000
+TOPICS = ["Coffee", "Politics", "Gender", "Colonialism", "Trade", "Labor", "Climate", "Migration", "Music",
+          "Religion", "Cities", "Food", "Language", "Medicine", "Water", "Borders", "Memory", "Sport",
+          "Fashion", "Energy", "Surveillance", "Childhood", "Maps", "Money", "Sleep", "Ritual", "Ports",
+          "Salt", "Printing", "Disease"]
+WORDS = ["market", "power", "ritual", "empire", "identity", "labour", "exchange", "network", "colonial",
+         "gendered", "urban", "moral", "economy", "history", "culture", "policy", "social", "global"]
+
+
+# Function to build a research document of realistic size for a topic chain, the same for every session
+def make_document(chain):
+    rng = random.Random("\x1f".join(chain))
+
+    def prose(words):
+        return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+    return {
+        "research_output": {
+            "title": f"Connecting {', '.join(chain)}",
+            "introduction": prose(120),
+            "connections": [
+                {"discipline": prose(2), "explanation": prose(90), "themes": [prose(4) for _ in range(4)]}
+                for _ in range(6)
+            ],
+            "research_questions": [prose(18) for _ in range(6)],
+            "cross_cutting_themes": [prose(5) for _ in range(4)],
+        },
+        "related_topics": [{"topic": rng.choice(TOPICS), "relevance": prose(25)} for _ in range(3)],
+    }
+
+
+def journeys(length, seed=7):
+    rng = random.Random(seed)
+    weights = [1.0 / rank for rank in range(1, len(TOPICS) + 1)]
+    for _ in range(SESSIONS):
+        chain = []
+        while len(chain) < length:
+            topic = rng.choices(TOPICS, weights=weights)[0]
+            if topic not in chain:
+                chain.append(topic)
+        yield chain
+
+
+def documents_layout(length):
+    sessions = []
+    for chain in journeys(length):
+        trie = TopicTrie()
+        for step in range(2, length + 1):
+            # Each session parses its own copy of every document it is shown
+            trie.insert(chain[:step], json.loads(json.dumps(make_document(chain[:step]))))
+        state = {"topics": list(chain), "journeys": trie, "research_data": trie.get(chain)}
+        sessions.append(state)
+    return sessions
+
+
+def references_layout(length, store):
+    sessions = []
+    for chain in journeys(length):
+        trie = TopicTrie()
+        for step in range(2, length + 1):
+            key = research_cache_key(chain[:step], prompt_version="app:bench")
+            entry = store.lookup(key)
+            if entry is None:
+                entry = store.put(json.dumps(make_document(chain[:step])).encode("utf-8"))
+                store.remember(key, entry.research_id, ttl=3600)
+            trie.insert(chain[:step], entry.research_id)
+        state = {"topics": list(chain), "journeys": trie, "research_id": trie.get(chain)}
+        sessions.append(state)
+    return sessions
+
+
+def main():
+    print("=== SESSION MEMORY BENCHMARK ===")
+    print(f"{SESSIONS} sessions, shared store bounded to {STORE_MAX_ENTRIES} documents")
+    print(f"{'journey':<9}{'documents KB/session':>22}{'references KB/session':>23}{'shared store MB':>17}{'total MB':>18}")
+    for length in JOURNEY_LENGTHS:
+        tracemalloc.start()
+        sessions = documents_layout(length)
+        before = tracemalloc.get_traced_memory()[0]
+        del sessions
+
+        tracemalloc.clear_traces()
+        store = ResearchStore(max_entries=STORE_MAX_ENTRIES)
+        sessions = references_layout(length, store)
+        total = tracemalloc.get_traced_memory()[0]
+        # Whatever is still allocated once the store is gone belongs to session state
+        del store
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del sessions
+
+        print(f"{length:<9}{before / SESSIONS / 1024:>22.1f}{after / SESSIONS / 1024:>23.1f}"
+              f"{(total - after) / 2**20:>17.1f}{before / 2**20:>9.1f} → {total / 2**20:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Research cache scaling benchmark across worker processes.
+
+Replays the same Zipf-distributed stream of topic chains against 1, 4 and
+16 worker processes, once with a per-process ResearchStore and once with the
+SQLite-WAL SQLiteResearchStore shared by all workers. Cache misses simulate
+an upstream generation and use the in-flight markers for deduplication.
+
+    python benchmarks/shared_cache_bench.py
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from research_store import ResearchStore, research_cache_key
+from shared_store import SQLiteResearchStore
+
+BODY = b'{"research_output": {"title": "benchmark"}, "related_topics": [], "connection_path": ""}'
+
+
+# Function to draw a Zipf-like stream of topic chains so a few chains are very popular
+def request_stream(total: int, distinct: int, seed: int = 7):
+    rng = random.Random(seed)
+    weights = [1.0 / rank for rank in range(1, distinct + 1)]
+    return rng.choices(range(distinct), weights=weights, k=total)
+
+
+def run_worker(args):
+    store_path, chains, generate_ms = args
+    store = SQLiteResearchStore(store_path, max_entries=100000) if store_path else ResearchStore(max_entries=100000)
+    hits = upstream = 0
+
+    start = time.perf_counter()
+    for chain in chains:
+        key = research_cache_key(["Coffee", f"Topic {chain}"])
+        while True:
+            if store.lookup(key) is not None:
+                hits += 1
+                break
+            if store.claim(key, ttl=30.0):
+                # The previous owner may have finished between our lookup and claim
+                if store.lookup(key) is not None:
+                    store.release(key)
+                    hits += 1
+                    break
+                time.sleep(generate_ms / 1000)
+                upstream += 1
+                entry = store.put(BODY + str(chain).encode())
+                store.remember(key, entry.research_id, ttl=3600.0)
+                store.release(key)
+                break
+            time.sleep(0.001)
+    return hits, upstream, time.perf_counter() - start
+
+
+def run(workers: int, shared: bool, stream, generate_ms: float):
+    store_path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3") if shared else None
+    if store_path:
+        SQLiteResearchStore(store_path)  # create the schema once before workers start
+    # Interleave the stream so every worker sees the same popularity distribution
+    shards = [(store_path, stream[i::workers], generate_ms) for i in range(workers)]
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers) as pool:
+        results = pool.map(run_worker, shards)
+    elapsed = time.perf_counter() - start
+
+    hits = sum(result[0] for result in results)
+    upstream = sum(result[1] for result in results)
+    return hits / len(stream), upstream, len(stream) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=8000)
+    parser.add_argument("--distinct", type=int, default=2000, help="Number of distinct topic chains")
+    parser.add_argument("--generate-ms", type=float, default=2.0, help="Simulated upstream time per miss")
+    args = parser.parse_args()
+
+    stream = request_stream(args.requests, args.distinct)
+    print("=== RESEARCH CACHE WORKER SCALING BENCHMARK ===")
+    print(f"{args.requests} requests over {args.distinct} topic chains (Zipf)\n")
+    print(f"{'store':<12}{'workers':>8}{'hit ratio':>12}{'upstream':>10}{'req/s':>10}")
+    for shared in (False, True):
+        for workers in (1, 4, 16):
+            hit_ratio, upstream, throughput = run(workers, shared, stream, args.generate_ms)
+            name = "sqlite-wal" if shared else "per-process"
+            print(f"{name:<12}{workers:>8}{hit_ratio:>12.1%}{upstream:>10}{throughput:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cold start benchmark for the API.
+
+Measures the import time of ``api`` in a fresh interpreter (and of the
+modules it now defers), then starts uvicorn and reports the time until
+``/health/`` answers, until ``/ready/`` turns green, and until the first
+successful research request.
+
+    python benchmarks/startup_bench.py
+    GROK_BACKEND_MODE=replay python benchmarks/startup_bench.py --skip-research
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Function to time an import statement in a fresh interpreter
+def import_time(statement: str, repeat: int = 5) -> float:
+    code = f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", code], cwd=REPO_ROOT, text=True)
+        timings.append(float(output.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Function to poll an endpoint until it returns 200 and report the elapsed time since start
+def wait_for(client: httpx.Client, path: str, start: float, timeout: float) -> float:
+    while time.perf_counter() - start < timeout:
+        try:
+            if client.get(path).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{path} did not return 200 within {timeout:.0f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--skip-research", action="store_true", help="Do not send a research request")
+    args = parser.parse_args()
+
+    print("=== API COLD START BENCHMARK ===")
+    print("\nIMPORT TIME (fresh interpreter, best of 5):")
+    for statement in ("import api", "import openai", "import httpx"):
+        print(f"  {statement:<15} {import_time(statement) * 1000:8.1f} ms")
+
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout) as client:
+            print("\nSTARTUP (from process spawn):")
+            print(f"  /health/ healthy        {wait_for(client, '/health/', start, args.timeout) * 1000:8.1f} ms")
+            print(f"  /ready/ warm            {wait_for(client, '/ready/', start, args.timeout) * 1000:8.1f} ms")
+
+            if not args.skip_research:
+                response = client.post("/research/", json={"primary_topic": "Coffee", "intent_topic": "Politics"})
+                response.raise_for_status()
+                print(f"  first research request  {(time.perf_counter() - start) * 1000:8.1f} ms")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
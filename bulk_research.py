@@ -0,0 +1,280 @@
+"""
+Bulk research generation from a manifest of topic chains.
+
+    python bulk_research.py manifest.jsonl -o research.jsonl --concurrency 8
+    python bulk_research.py manifest.csv -o research.jsonl --backend api --url http://localhost:8000
+    python bulk_research.py manifest.csv -o research.jsonl --format parquet
+
+Manifests are JSONL (one object per line with a "topics" list and an optional
+"id", or a bare list of topics) or CSV (a header row; an optional "id" column
+plus either one "topics" column separated by "|" or "→", or several columns
+whose names start with "topic").
+
+Results are appended to the output JSONL as they finish, one line per chain
+with per-item timing and token counts. Finished ids are also appended to
+"<output>.checkpoint", so rerunning the same command after a crash skips
+everything already done. With the direct backend, chains already in the
+research cache are written out without calling Grok.
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from prompts import RESEARCH_PROMPT_VERSION
+
+TOPIC_SEPARATOR = re.compile(r"\s*(?:\||→)\s*")
+# Items shed by admission control are retried this many times, waiting at least Retry-After and at most MAX_RETRY_DELAY
+MAX_RETRIES = 8
+MAX_RETRY_DELAY = 60.0
+
+
+class ManifestItem:
+    __slots__ = ("item_id", "topics")
+
+    def __init__(self, item_id: str, topics: List[str]):
+        self.item_id = item_id
+        self.topics = topics
+
+
+# Function to give manifest rows without an id a stable one
+def default_item_id(topics: List[str]) -> str:
+    return hashlib.sha256("\x1f".join(topics).encode("utf-8")).hexdigest()[:16]
+
+
+# Function to read topic chains from a CSV or JSONL manifest
+def read_manifest(path: str) -> Iterator[ManifestItem]:
+    if path.endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("topics"):
+                    topics = TOPIC_SEPARATOR.split(row["topics"].strip())
+                else:
+                    topics = [value for name, value in row.items() if name and name.startswith("topic") and value]
+                topics = [topic.strip() for topic in topics if topic and topic.strip()]
+                yield ManifestItem(row.get("id") or default_item_id(topics), topics)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                topics = data if isinstance(data, list) else data["topics"]
+                item_id = None if isinstance(data, list) else data.get("id")
+                yield ManifestItem(str(item_id or default_item_id(topics)), topics)
+
+
+# Function to load the ids finished by earlier runs
+def read_checkpoint(path: str) -> Set[str]:
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+class BulkRunner:
+    """
+    Runs manifest items with bounded concurrency and appends results.
+
+    Only ``concurrency`` items are in flight at once, the manifest is read
+    lazily, and each result is written as soon as it finishes, so memory use
+    and throughput do not depend on manifest size.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.counts = {"generated": 0, "cached": 0, "failed": 0, "skipped": 0}
+        self.started = time.perf_counter()
+        self.api = None
+        self.client = None
+
+    async def run(self) -> Dict[str, int]:
+        args = self.args
+        checkpoint_path = f"{args.output}.checkpoint"
+        done = read_checkpoint(checkpoint_path)
+
+        if args.backend == "api":
+            from research_client import AsyncResearchClient
+            # Bulk work yields upstream capacity to interactive requests
+            self.client = AsyncResearchClient(args.url, headers={"X-Priority": "batch", "X-Tenant": args.tenant})
+        else:
+            import api
+            self.api = api
+
+        pending: Set[asyncio.Task] = set()
+        try:
+            if args.concurrency is None:
+                args.concurrency = await self._batch_slots()
+            semaphore = asyncio.Semaphore(args.concurrency)
+            with open(args.output, "a", encoding="utf-8") as output, \
+                    open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+                for item in read_manifest(args.manifest):
+                    if item.item_id in done:
+                        self.counts["skipped"] += 1
+                        continue
+                    if len(item.topics) < 2:
+                        self._write(output, {"id": item.item_id, "topics": item.topics, "status": "error",
+                                             "error": "At least two topics are required"})
+                        self.counts["failed"] += 1
+                        continue
+                    # Acquire before creating the task so the manifest is only read as fast as items finish
+                    await semaphore.acquire()
+                    task = asyncio.create_task(self._run_item(item, output, checkpoint))
+                    task.add_done_callback(lambda _: semaphore.release())
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                if pending:
+                    await asyncio.gather(*pending)
+        finally:
+            if self.client is not None:
+                await self.client.close()
+        return self.counts
+
+    async def _run_item(self, item: ManifestItem, output: Any, checkpoint: Any) -> None:
+        # Mode and prompt version make up the API's cache key, so archives built from the output can be looked up by it
+        record: Dict[str, Any] = {"id": item.item_id, "topics": item.topics, "mode": self.args.mode,
+                                  "prompt_version": RESEARCH_PROMPT_VERSION}
+        start = time.perf_counter()
+        body: Optional[str] = None
+        try:
+            if self.api is not None:
+                body = await self._generate_direct_with_retries(item, record)
+            else:
+                response = await self.client.research(item.topics, mode=self.args.mode, strategy=self.args.strategy)
+                body = json.dumps(response, ensure_ascii=False)
+                record["status"] = "generated"
+        except Exception as e:
+            record["status"] = "error"
+            record["error"] = str(getattr(e, "detail", e))
+        record["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        self._write(output, record, body)
+        if record["status"] == "error":
+            self.counts["failed"] += 1
+            return
+        self.counts[record["status"]] += 1
+        checkpoint.write(item.item_id + "\n")
+        checkpoint.flush()
+        self._report_progress()
+
+    async def _batch_slots(self) -> int:
+        # More items in flight than batch slots would only wait in the admission queue until they time out
+        if self.api is None:
+            return (await self.client.admission_stats())["batch_max_concurrent"]
+        admission = self.api.admission
+        policy = admission.policies.get(self.args.tenant, admission.default_policy)
+        slots = admission.batch_max_concurrent
+        return min(slots, policy.max_concurrent) if policy.max_concurrent else slots
+
+    async def _generate_direct_with_retries(self, item: ManifestItem, record: Dict[str, Any]) -> str:
+        from admission import Overloaded
+
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                return await self._generate_direct(item, record)
+            except Overloaded as e:
+                # Shed items are retried rather than lost, since they are not checkpointed
+                if attempt == MAX_RETRIES:
+                    raise
+                record["retries"] = attempt + 1
+                await asyncio.sleep(min(MAX_RETRY_DELAY, max(e.retry_after, 2 ** attempt)))
+
+    async def _generate_direct(self, item: ManifestItem, record: Dict[str, Any]) -> str:
+        from admission import PRIORITIES
+        from prompts import collect_usage
+
+        api = self.api
+        previous_topics = item.topics[2:]
+        entry = None
+        if self.args.skip_cached:
+            entry = api.research_store.lookup(api.research_key(item.topics, self.args.mode))
+        if entry is not None:
+            record["status"] = "cached"
+        else:
+            with collect_usage() as usage:
+                entry = await api.get_or_generate_research(
+                    item.topics[0],
+                    item.topics[1],
+                    previous_topics,
+                    mode=self.args.mode,
+                    strategy=self.args.strategy,
+                    priority=PRIORITIES["batch"],
+                    tenant=self.args.tenant,
+                )
+            record["status"] = "generated"
+            record.update({key: value for key, value in usage.items() if key != "requests"})
+            record["upstream_calls"] = usage["requests"]
+        record["research_id"] = entry.research_id
+        return entry.body.decode("utf-8")
+
+    def _write(self, output: Any, record: Dict[str, Any], body: Optional[str] = None) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        if body is not None:
+            # The stored response is already serialized JSON, so it is spliced in rather than re-encoded
+            line = f'{line[:-1]},"response":{body}}}'
+        output.write(line + "\n")
+        output.flush()
+
+    def _report_progress(self) -> None:
+        finished = self.counts["generated"] + self.counts["cached"]
+        if finished % self.args.progress_every == 0:
+            rate = finished / (time.perf_counter() - self.started)
+            print(f"{finished} done ({self.counts['cached']} cached, {self.counts['failed']} failed), "
+                  f"{rate:.1f} items/s", file=sys.stderr)
+
+
+# Function to convert the JSONL results into a Parquet file (requires pyarrow)
+def write_parquet(jsonl_path: str, parquet_path: str) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = []
+    with open(jsonl_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            response = record.pop("response", None)
+            record["response"] = json.dumps(response, ensure_ascii=False) if response is not None else None
+            rows.append(record)
+    pq.write_table(pa.Table.from_pylist(rows), parquet_path, compression="zstd")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="CSV or JSONL manifest of topic chains")
+    parser.add_argument("-o", "--output", required=True, help="JSONL file results are appended to")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl",
+                        help="parquet also writes <output>.parquet when the run finishes (requires pyarrow)")
+    parser.add_argument("--backend", choices=["direct", "api"], default="direct",
+                        help="direct runs the generation core in-process; api calls a running server")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL for --backend api")
+    parser.add_argument("--store", help="SQLite research store to read and fill (defaults to RESEARCH_STORE_PATH)")
+    parser.add_argument("--concurrency", type=int,
+                        help="Items in flight at once (default: the batch slots this tenant may hold with --backend direct, "
+                             "the server's batch slots from GET /admission/ with --backend api)")
+    parser.add_argument("--tenant", default="bulk", help="Tenant the upstream scheduler accounts this run to")
+    parser.add_argument("--mode", choices=["fast", "standard", "deep"], default="standard")
+    parser.add_argument("--strategy", choices=["single", "fanout", "compose"], default="single")
+    parser.add_argument("--no-skip-cached", dest="skip_cached", action="store_false",
+                        help="Regenerate chains even if they are already in the research cache")
+    parser.add_argument("--progress-every", type=int, default=100)
+    args = parser.parse_args(argv)
+    if args.store:
+        # api opens its research store at import time
+        os.environ["RESEARCH_STORE_PATH"] = args.store
+
+    counts = asyncio.run(BulkRunner(args).run())
+    print(json.dumps(counts))
+
+    if args.format == "parquet":
+        write_parquet(args.output, f"{os.path.splitext(args.output)[0]}.parquet")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
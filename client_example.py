@@ -1,31 +1,30 @@
-import requests
 import json
+import time
+
+from research_client import ResearchAPIError, ResearchClient
+
+# One pooled client for the whole demo so every request reuses the same connection
+client = ResearchClient(base_url="http://localhost:8001")
+
+# Suffix for output files so separate runs do not overwrite each other
+RUN_ID = time.strftime("%Y%m%d-%H%M%S")
 
 def get_research(primary_topic, intent_topic, previous_topics=None):
     """
     Function to get initial research output from the API
     """
-    # API endpoint for research
-    api_url = "http://localhost:8001/research/"
-    
-    # Prepare request data
-    request_data = {
-        "primary_topic": primary_topic,
-        "intent_topic": intent_topic
-    }
-    
-    # Add previous topics if provided
-    if previous_topics and len(previous_topics) > 0:
-        request_data["previous_topics"] = previous_topics
+    topics = [primary_topic, intent_topic] + list(previous_topics or [])
     
     # Make the API request
-    print(f"Sending research request to {api_url}...")
-    response = requests.post(api_url, json=request_data)
+    print("Sending research request...")
+    try:
+        research_data = client.research(topics)
+    except ResearchAPIError as e:
+        print(f"Error: {e.status_code}")
+        print(e.detail)
+        return None, None
     
-    # Check if the request was successful
-    if response.status_code == 200:
-        # Parse the JSON response
-        research_data = response.json()
+    if research_data:
         
         # Print the connection path
         print(f"\nConnection Path: {research_data['connection_path']}")
@@ -54,41 +53,31 @@ def get_research(primary_topic, intent_topic, previous_topics=None):
             print(f"  {i}. {question}")
         
         # Save the full response to a file
-        with open('research_output.json', 'w') as f:
+        filename = f"research_output_{RUN_ID}.json"
+        with open(filename, 'w') as f:
             json.dump(research_data, f, indent=2)
             
-        print("\nFull research output saved to 'research_output.json'")
+        print(f"\nFull research output saved to '{filename}'")
         
         # Extract topics from connection path
         topics = research_data['connection_path'].split(' → ')
         return research_data, topics
-    else:
-        print(f"Error: {response.status_code}")
-        print(response.text)
-        return None, None
 
 def continue_research(topics, next_topic):
     """
     Function to continue research by adding a new topic
     """
-    # API endpoint for continuing research
-    api_url = "http://localhost:8001/continue-research/"
-    
-    # Prepare request data
-    request_data = {
-        "topics": topics,
-        "next_topic": next_topic
-    }
-    
     # Make the API request
     print(f"\nContinuing research with new topic: {next_topic}")
-    print(f"Sending continue-research request to {api_url}...")
-    response = requests.post(api_url, json=request_data)
+    print("Sending continue-research request...")
+    try:
+        research_data = client.continue_research(topics, next_topic)
+    except ResearchAPIError as e:
+        print(f"Error: {e.status_code}")
+        print(e.detail)
+        return None, None
     
-    # Check if the request was successful
-    if response.status_code == 200:
-        # Parse the JSON response
-        research_data = response.json()
+    if research_data:
         
         # Print the updated connection path
         print(f"\nUpdated Connection Path: {research_data['connection_path']}")
@@ -105,40 +94,31 @@ def continue_research(topics, next_topic):
             print(f"\n{connection['discipline']}:")
             print(f"  {connection['explanation'][:150]}...")
         
-        # Save the full response to a file
-        with open('continued_research_output.json', 'w') as f:
+        # Save the full response to a file, one per step of the journey
+        filename = f"continued_research_output_{RUN_ID}_{len(topics) + 1}.json"
+        with open(filename, 'w') as f:
             json.dump(research_data, f, indent=2)
             
-        print("\nFull continued research output saved to 'continued_research_output.json'")
+        print(f"\nFull continued research output saved to '{filename}'")
         
         # Extract updated topics from connection path
         updated_topics = research_data['connection_path'].split(' → ')
         return research_data, updated_topics
-    else:
-        print(f"Error: {response.status_code}")
-        print(response.text)
-        return None, None
 
 def get_related_topics(topics):
     """
     Function to get related topics from the API
     """
-    # API endpoint for related topics
-    api_url = "http://localhost:8001/related-topics/"
-    
-    # Prepare request data
-    request_data = {
-        "topics": topics
-    }
-    
     # Make the API request
-    print(f"\nSending related topics request to {api_url}...")
-    response = requests.post(api_url, json=request_data)
+    print("\nSending related topics request...")
+    try:
+        related_topics_data = {"related_topics": client.related_topics(topics)}
+    except ResearchAPIError as e:
+        print(f"Error: {e.status_code}")
+        print(e.detail)
+        return None
     
-    # Check if the request was successful
-    if response.status_code == 200:
-        # Parse the JSON response
-        related_topics_data = response.json()
+    if related_topics_data:
         
         # Print related topics
         print("\n" + "="*80)
@@ -149,16 +129,13 @@ def get_related_topics(topics):
             print(f"\n- {topic['topic']}")
             print(f"  {topic['relevance']}")
         
-        # Save the full response to a file
-        with open('related_topics.json', 'w') as f:
+        # Save the full response to a file, one per step of the journey
+        filename = f"related_topics_{RUN_ID}_{len(topics)}.json"
+        with open(filename, 'w') as f:
             json.dump(related_topics_data, f, indent=2)
             
-        print("\nFull related topics saved to 'related_topics.json'")
+        print(f"\nFull related topics saved to '{filename}'")
         return related_topics_data['related_topics']
-    else:
-        print(f"Error: {response.status_code}")
-        print(response.text)
-        return None
 
 def main():
     """
@@ -227,4 +204,7 @@ def main():
     print("="*80)
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        client.close()
@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fanout import FanoutError, complete_json, join_topics
+from prompts import get_prompt
+from research_store import research_cache_key
+from routing import STANDARD_MODE
+from schemas import GeneratedResearch, PairAnalysis
+from topic_trie import normalize_topic
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on pairs analysed per request; longer chains keep the pairs of the closest topics
+MAX_PAIRS = 15
+# Upper bound on concurrent pair calls per research request
+MAX_PAIR_WORKERS = 6
+# How long a request waits for a pair another request is already generating, at most
+PAIR_INFLIGHT_TIMEOUT_SECONDS = 60.0
+PAIR_INFLIGHT_POLL_SECONDS = 0.1
+
+
+# Function to list the topic pairs to analyse for a chain, closest topics first
+def chain_pairs(topics: List[str]) -> List[Tuple[str, str]]:
+    """
+    Return each unordered pair of distinct topics once, in a canonical order
+    so that Coffee–Politics and Politics–Coffee share one analysis. Pairs of
+    adjacent topics come first; beyond ``MAX_PAIRS`` the most distant pairs
+    are left out.
+    """
+    distinct: Dict[str, str] = {}
+    for topic in topics:
+        distinct.setdefault(normalize_topic(topic), topic)
+    names = list(distinct)
+    spans = sorted(((j - i, i, j) for i in range(len(names)) for j in range(i + 1, len(names))))
+    pairs = []
+    for _, i, j in spans[:MAX_PAIRS]:
+        first, second = sorted((names[i], names[j]))
+        pairs.append((distinct[first], distinct[second]))
+    return pairs
+
+
+class PairWaitTimeout(TimeoutError):
+    """Raised when a pair another request is generating is not ready before the caller's deadline."""
+
+
+class PairCache:
+    """
+    Pairwise connection analyses kept in a research store of their own.
+
+    Analyses are mapped from a key on the normalized pair, the ``topic_pair``
+    prompt version and the mode, so with a shared store every worker reuses
+    every other worker's pairs. The store is separate from the one research
+    is served from, so analyses cannot be fetched as research. Concurrent
+    requests needing the same missing pair generate it once.
+    """
+
+    def __init__(self, store: Any, ttl: float):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, pair: Tuple[str, str], mode: str) -> str:
+        return research_cache_key(list(pair), prompt_version=f"pair:{get_prompt('topic_pair').version}:{mode}")
+
+    def _lookup(self, key: str) -> Optional[PairAnalysis]:
+        entry = self.store.lookup(key)
+        return None if entry is None else PairAnalysis.model_validate_json(entry.body)
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def cached(self, pairs: List[Tuple[str, str]], mode: str) -> Dict[Tuple[str, str], PairAnalysis]:
+        """Return the analyses already cached for ``pairs``, counting each as a hit."""
+        if self.ttl <= 0:
+            return {}
+        found = {}
+        for pair in pairs:
+            analysis = self._lookup(self.key(pair, mode))
+            if analysis is not None:
+                found[pair] = analysis
+                self._count(hit=True)
+        return found
+
+    def get_or_generate(self, pair: Tuple[str, str], mode: str, generate: Callable[[], PairAnalysis],
+                        deadline: Optional[float] = None) -> PairAnalysis:
+        """
+        ``deadline`` (a ``time.monotonic()`` value) bounds how long to wait
+        for another request's generation of the pair; past it the pair is
+        given up with ``PairWaitTimeout`` instead of being waited for.
+        """
+        if self.ttl <= 0:
+            self._count(hit=False)
+            return generate()
+
+        key = self.key(pair, mode)
+        claimed = False
+        give_up = time.monotonic() + PAIR_INFLIGHT_TIMEOUT_SECONDS
+        while True:
+            analysis = self._lookup(key)
+            if analysis is not None:
+                self._count(hit=True)
+                return analysis
+            claimed = self.store.claim(key, ttl=PAIR_INFLIGHT_TIMEOUT_SECONDS)
+            if claimed or time.monotonic() >= give_up:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise PairWaitTimeout(f"{pair[0]} and {pair[1]} are still being analysed by another request")
+            time.sleep(PAIR_INFLIGHT_POLL_SECONDS)
+
+        try:
+            analysis = self._lookup(key) if claimed else None
+            if analysis is not None:
+                self._count(hit=True)
+                return analysis
+            analysis = generate()
+            self._count(hit=False)
+            entry = self.store.put(analysis.model_dump_json().encode("utf-8"))
+            self.store.remember(key, entry.research_id, ttl=self.ttl)
+            return analysis
+        finally:
+            if claimed:
+                self.store.release(key)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hits / total if total else 0.0}
+
+
+# Function to summarize pairwise analyses for the synthesis prompt
+def pair_findings(analyses: List[Tuple[Tuple[str, str], PairAnalysis]]) -> str:
+    lines = []
+    for (first, second), analysis in analyses:
+        disciplines = ", ".join(c.discipline for c in analysis.connections) or "none"
+        themes = ", ".join(dict.fromkeys(theme for c in analysis.connections for theme in c.themes)) or "none"
+        lines.append(f"- {first} and {second}: disciplines {disciplines}; themes {themes}")
+    return "\n".join(lines)
+
+
+# Function to analyse topic pairs concurrently through the pair cache, keeping the analyses that succeed
+def analyze_pairs(backend: Any, pairs: List[Tuple[str, str]], pair_cache: PairCache, mode: str = STANDARD_MODE,
+                  concurrency: int = MAX_PAIR_WORKERS,
+                  deadline: Optional[float] = None) -> Dict[Tuple[str, str], PairAnalysis]:
+    """
+    Pairs are generated at most ``concurrency`` at a time. Pairs that fail,
+    or that another request is still generating at ``deadline``, are logged
+    and left out.
+    """
+    def analyze(pair: Tuple[str, str]) -> PairAnalysis:
+        return pair_cache.get_or_generate(pair, mode, lambda: PairAnalysis.model_validate(complete_json(
+            backend,
+            "topic_pair",
+            "topic_pair",
+            mode,
+            2,
+            first_topic=pair[0],
+            second_topic=pair[1],
+        )), deadline)
+
+    if not pairs:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(len(pairs), concurrency))) as pool:
+        # Each pair runs in a copy of the caller's context so per-request usage collection still applies
+        futures = [pool.submit(copy_context().run, analyze, pair) for pair in pairs]
+
+    analyses = {}
+    for pair, future in zip(pairs, futures):
+        try:
+            analyses[pair] = future.result()
+        except Exception as e:
+            logger.warning("Pair analysis for %s and %s failed: %s", pair[0], pair[1], e)
+    return analyses
+
+
+# Function to write the research for a topic chain from its pairwise analyses with one synthesis call
+def synthesize_research(backend: Any, topics: List[str], analyses: List[Tuple[Tuple[str, str], PairAnalysis]],
+                        mode: str = STANDARD_MODE) -> GeneratedResearch:
+    if not analyses:
+        raise FanoutError("Every pairwise analysis failed")
+
+    topics_str = join_topics(topics)
+    synthesis = complete_json(
+        backend,
+        "research_synthesis",
+        "research_synthesis",
+        mode,
+        len(topics),
+        topics=topics_str,
+        pair_findings=pair_findings(analyses),
+    )
+
+    connections, questions, key_connections = [], list(synthesis.get("research_questions", [])), []
+    for pair, analysis in analyses:
+        for connection in analysis.connections:
+            # Connections keep unknown keys, so each one records the pair it links
+            connections.append(dict(connection.model_dump(), topics=list(pair)))
+        questions.extend(q for q in analysis.research_questions if q not in questions)
+        key_connections.extend(k.model_dump() for k in analysis.key_connections)
+
+    return GeneratedResearch.model_validate({
+        "research_output": {
+            "title": synthesis.get("title") or f"Connecting {topics_str}: A Multidisciplinary Exploration",
+            "introduction": synthesis.get("introduction", ""),
+            "connections": connections,
+            "research_questions": questions,
+            "cross_cutting_themes": synthesis.get("cross_cutting_themes", []),
+            "mind_map": {
+                "central_themes": topics,
+                "key_connections": key_connections,
+            },
+        },
+        "related_topics": synthesis.get("related_topics", []),
+    })
+
+
+# Function to compose research for a topic chain from cached pairwise analyses and one synthesis call
+def generate_research_composed(backend: Any, topics: List[str], pair_cache: PairCache, mode: str = STANDARD_MODE,
+                               concurrency: int = MAX_PAIR_WORKERS, deadline: Optional[float] = None) -> GeneratedResearch:
+    """
+    Generate research for a chain as the sum of its pairwise connections.
+
+    Each pair of topics is analysed on its own and cached, and pairs missing
+    from the cache are generated concurrently by ``analyze_pairs``. One short
+    synthesis call then adds the title, introduction, cross-cutting themes
+    and related topics. Across journeys most pairs are already cached, so a
+    request often costs only the synthesis. The request fails only if every
+    pair does. Callers that budget upstream calls can run the three steps
+    themselves.
+    """
+    pairs = chain_pairs(topics)
+    if not pairs:
+        raise FanoutError("Composed research needs at least two distinct topics")
+    analyses = pair_cache.cached(pairs, mode)
+    analyses.update(analyze_pairs(backend, [pair for pair in pairs if pair not in analyses], pair_cache, mode,
+                                  concurrency, deadline))
+    return synthesize_research(backend, topics, [(pair, analyses[pair]) for pair in pairs if pair in analyses], mode)
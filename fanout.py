@@ -0,0 +1,141 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Dict, List, Tuple
+
+from pydantic import ValidationError
+
+from grok_backend import extract_json_text
+from prompts import get_prompt, prompt_usage
+from routing import STANDARD_MODE, model_router
+from schemas import Connection, GeneratedResearch, KeyConnection
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on concurrent section calls per research request
+MAX_SECTIONS = 6
+
+
+class FanoutError(RuntimeError):
+    """Raised when fan-out research cannot produce a usable document."""
+
+
+# Function to format topics as "A, B, and C"
+def join_topics(topics: List[str]) -> str:
+    if len(topics) == 1:
+        return topics[0]
+    return ", ".join(topics[:-1]) + f", and {topics[-1]}"
+
+
+# Function to run one registered prompt and parse its JSON answer
+def complete_json(backend: Any, prompt_name: str, task: str, mode: str, topic_count: int, **values: Any) -> Dict[str, Any]:
+    prompt = get_prompt(prompt_name)
+    route = model_router.route(task, mode, topic_count=topic_count)
+    start = time.perf_counter()
+    try:
+        completion = backend.create(
+            model=route.model,
+            messages=prompt.messages(**values),
+            temperature=route.temperature,
+            max_tokens=route.max_tokens,
+        )
+    finally:
+        model_router.observe(route, time.perf_counter() - start)
+    prompt_usage.record(prompt, completion)
+
+    return json.loads(extract_json_text(completion.choices[0].message.content))
+
+
+# Function to outline fan-out research: title, introduction and the disciplines to write sections for
+def research_outline(backend: Any, topics: List[str], mode: str = STANDARD_MODE) -> Tuple[Dict[str, Any], List[str]]:
+    outline = complete_json(backend, "research_outline", "research_outline", mode, len(topics), topics=join_topics(topics))
+    disciplines = [d for d in outline.get("disciplines", []) if isinstance(d, str) and d.strip()][:MAX_SECTIONS]
+    if not disciplines:
+        raise FanoutError("Research outline did not name any disciplines")
+    return outline, disciplines
+
+
+# Function to generate an outline's per-discipline sections concurrently and merge them into research
+def research_from_outline(backend: Any, topics: List[str], outline: Dict[str, Any], disciplines: List[str],
+                          mode: str = STANDARD_MODE, concurrency: int = MAX_SECTIONS) -> GeneratedResearch:
+    topics_str = join_topics(topics)
+
+    def section(discipline: str) -> Dict[str, Any]:
+        return complete_json(
+            backend,
+            "research_section",
+            "research_section",
+            mode,
+            len(topics),
+            discipline=discipline,
+            title=outline.get("title", ""),
+            topics=topics_str,
+            other_disciplines=", ".join(d for d in disciplines if d != discipline),
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(len(disciplines), concurrency))) as pool:
+        # Each section runs in a copy of the caller's context so per-request usage collection still applies
+        futures = [pool.submit(copy_context().run, section, discipline) for discipline in disciplines]
+
+    connections, questions, key_connections = [], [], []
+    for discipline, future in zip(disciplines, futures):
+        try:
+            result = future.result()
+            if not isinstance(result, dict):
+                raise ValueError(f"expected a JSON object, got {type(result).__name__}")
+            connection = result.get("connection") or {}
+            if not isinstance(connection, dict):
+                raise ValueError("connection is not a JSON object")
+            connection = Connection.model_validate({"discipline": discipline, **connection})
+        except Exception as e:
+            logger.warning("Research section for %s failed: %s", discipline, e)
+            continue
+        connections.append(connection.model_dump())
+        section_questions = result.get("research_questions")
+        if isinstance(section_questions, list):
+            questions.extend(q for q in section_questions if isinstance(q, str) and q not in questions)
+        section_links = result.get("key_connections")
+        for link in section_links if isinstance(section_links, list) else []:
+            # A malformed mind-map link is dropped on its own rather than losing the section
+            try:
+                key_connections.append(KeyConnection.model_validate(link).model_dump())
+            except ValidationError:
+                continue
+
+    if not connections:
+        raise FanoutError("Every research section failed")
+
+    return GeneratedResearch.model_validate({
+        "research_output": {
+            "title": outline.get("title") or f"Connecting {topics_str}: A Multidisciplinary Exploration",
+            "introduction": outline.get("introduction", ""),
+            "connections": connections,
+            "research_questions": questions,
+            "cross_cutting_themes": outline.get("cross_cutting_themes", []),
+            "mind_map": {
+                "central_themes": topics,
+                "key_connections": key_connections,
+            },
+        },
+        "related_topics": outline.get("related_topics", []),
+    })
+
+
+# Function to generate research as an outline followed by concurrent per-discipline sections
+def generate_research_fanout(backend: Any, topics: List[str], mode: str = STANDARD_MODE,
+                             concurrency: int = MAX_SECTIONS) -> GeneratedResearch:
+    """
+    Generate research in two rounds instead of one long completion.
+
+    A short outline call picks the title, introduction and disciplines; each
+    discipline's connection, research questions and mind-map links are then
+    generated concurrently (at most ``concurrency`` at a time) and merged
+    into the usual research schema, so wall-clock time is roughly the outline
+    plus the slowest section. Sections that fail or do not match the schema
+    are left out; the request fails only if all of them do. Callers that
+    budget upstream calls can run the two rounds themselves.
+    """
+    outline, disciplines = research_outline(backend, topics, mode)
+    return research_from_outline(backend, topics, outline, disciplines, mode, concurrency)
@@ -1,8 +1,12 @@
 import os
+import time
 import streamlit as st
 import json
 from openai import OpenAI
 import httpx
+from grok_backend import GROK_BASE_URL, get_backend
+from prompts import get_prompt
+from routing import model_router
 
 # Initialize OpenAI client with Grok API
 def get_grok_client():
@@ -16,63 +20,34 @@ def get_grok_client():
     
     return OpenAI(
         api_key=api_key,
-        base_url="https://api.x.ai/v1",
+        base_url=GROK_BASE_URL,
         http_client=http_client
     )
 
 # Function to generate mind map data using Grok API
 def generate_mind_map(primary_topic, secondary_topics=None):
-    client = get_grok_client()
+    backend = get_backend(get_grok_client)
     
-    # Construct the prompt
-    system_prompt = """
-    You are a multidisciplinary research assistant specialized in creating comprehensive mind maps.
-    Your task is to analyze the provided topics and generate a detailed mind map showing connections
-    across various academic disciplines including sociology, economics, history, anthropology, and political science.
-    
-    For each connection, provide:
-    1. A brief explanation of how the topics relate
-    2. The academic discipline(s) relevant to this connection
-    3. Key themes or concepts that bridge these topics
-    
-    Format your response as a JSON object with the following structure:
-    {
-        "nodes": [
-            {"id": "unique_id", "label": "Node Label", "group": "discipline", "description": "detailed description"}
-        ],
-        "edges": [
-            {"from": "source_node_id", "to": "target_node_id", "label": "relationship", "description": "explanation"}
-        ],
-        "related_topics": [
-            {"topic": "Related Topic 1", "relevance": "Brief explanation of relevance"},
-            {"topic": "Related Topic 2", "relevance": "Brief explanation of relevance"},
-            {"topic": "Related Topic 3", "relevance": "Brief explanation of relevance"}
-        ]
-    }
-    
-    The 'related_topics' should contain 3 topics that are not already in the mind map but are highly relevant to the existing topics.
-    These should be topics that would be interesting to explore next and would add valuable connections to the mind map.
-    
-    Be comprehensive but concise. Focus on academic connections and ensure all relationships are substantiated.
-    """
-    
-    # Construct the user prompt based on provided topics
+    # Construct the prompt based on provided topics
     if secondary_topics and len(secondary_topics) > 0:
         topics_list = ", ".join(secondary_topics)
-        user_prompt = f"Create a multidisciplinary research mind map for the primary topic '{primary_topic}' and how it connects with {topics_list}. Include connections across sociology, economics, history, anthropology, and political science."
+        messages = get_prompt("mind_map_connected").messages(primary_topic=primary_topic, secondary_topics=topics_list)
     else:
-        user_prompt = f"Create a multidisciplinary research mind map for the topic '{primary_topic}'. Include connections across sociology, economics, history, anthropology, and political science."
+        messages = get_prompt("mind_map").messages(primary_topic=primary_topic)
     
     try:
         # Call Grok API
-        completion = client.chat.completions.create(
-            model="grok-3",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.7,
-        )
+        route = model_router.route("mind_map")
+        start = time.perf_counter()
+        try:
+            completion = backend.create(
+                model=route.model,
+                messages=messages,
+                temperature=route.temperature,
+                max_tokens=route.max_tokens,
+            )
+        finally:
+            model_router.observe(route, time.perf_counter() - start)
         
         # Extract the response
         response_text = completion.choices[0].message.content
@@ -0,0 +1,320 @@
+import os
+import json
+import time
+import hashlib
+import uuid
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Backend modes selectable through the GROK_BACKEND_MODE environment variable
+LIVE_MODE = "live"
+RECORD_MODE = "record"
+REPLAY_MODE = "replay"
+MOCK_MODE = "mock"
+BACKEND_MODES = (LIVE_MODE, RECORD_MODE, REPLAY_MODE, MOCK_MODE)
+
+# Official Grok API; override to point the Grok client at a proxy or a compatible stand-in
+GROK_BASE_URL = os.getenv("GROK_BASE_URL", "https://api.x.ai/v1")
+
+DEFAULT_CASSETTE_DIR = "cassettes"
+
+
+class CassetteMissError(KeyError):
+    """Raised in replay mode when no recording exists for a request."""
+
+
+# Function to compute a stable fingerprint for a chat completion request
+def request_fingerprint(params: Dict[str, Any]) -> str:
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# Function to pull the JSON document out of a completion that may wrap it in a markdown code block
+def extract_json_text(response_text: str) -> str:
+    if "```json" in response_text:
+        return response_text.split("```json")[1].split("```")[0].strip()
+    if "```" in response_text:
+        return response_text.split("```")[1].split("```")[0].strip()
+    return response_text
+
+
+class Cassette:
+    """
+    Directory of recorded completions, one JSON file per request fingerprint.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path_for(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f"{fingerprint}.json")
+
+    def load(self, fingerprint: str) -> Dict[str, Any]:
+        try:
+            with open(self.path_for(fingerprint), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise CassetteMissError(fingerprint)
+
+    def save(self, fingerprint: str, entry: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(fingerprint)
+        # Write to a temporary file first so concurrent readers never see a partial recording;
+        # threads recording the same request each get their own, and the last one to finish wins
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+class LiveBackend:
+    """
+    Sends chat completion requests straight to an OpenAI-compatible client.
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def create(self, **params: Any) -> Any:
+        return self.client.chat.completions.create(**params)
+
+    def warm(self) -> None:
+        # Any cheap request opens a keep-alive connection the next completion can reuse
+        self.client.models.list()
+
+
+class RecordingBackend:
+    """
+    Forwards requests to another backend and persists every response,
+    including streamed chunks and their arrival offsets, to a cassette.
+    """
+
+    def __init__(self, inner: Any, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def create(self, **params: Any) -> Any:
+        fingerprint = request_fingerprint(params)
+        start = time.perf_counter()
+        result = self.inner.create(**params)
+
+        if params.get("stream"):
+            return self._record_stream(fingerprint, params, result, start)
+
+        self.cassette.save(fingerprint, {
+            "request": params,
+            "elapsed": time.perf_counter() - start,
+            "response": result.model_dump(),
+        })
+        return result
+
+    def _record_stream(self, fingerprint: str, params: Dict[str, Any], stream: Any, start: float) -> Iterator[Any]:
+        chunks: List[Dict[str, Any]] = []
+        for chunk in stream:
+            chunks.append({"offset": time.perf_counter() - start, "chunk": chunk.model_dump()})
+            yield chunk
+
+        # Only complete streams are persisted; an abandoned stream would replay truncated output
+        self.cassette.save(fingerprint, {
+            "request": params,
+            "elapsed": time.perf_counter() - start,
+            "chunks": chunks,
+        })
+
+
+class ReplayBackend:
+    """
+    Serves recorded responses from a cassette without contacting the upstream API.
+
+    With ``realtime`` enabled the original latency is reproduced: non-streamed
+    responses wait for the recorded duration and streamed chunks are emitted at
+    their recorded offsets.
+    """
+
+    def __init__(self, cassette: Cassette, realtime: bool = False):
+        self.cassette = cassette
+        self.realtime = realtime
+
+    def create(self, **params: Any) -> Any:
+        from openai.types.chat import ChatCompletion
+
+        entry = self.cassette.load(request_fingerprint(params))
+
+        if params.get("stream"):
+            return self._replay_stream(entry)
+
+        if self.realtime:
+            time.sleep(entry.get("elapsed", 0.0))
+        return ChatCompletion.model_validate(entry["response"])
+
+    def _replay_stream(self, entry: Dict[str, Any]) -> Iterator[Any]:
+        from openai.types.chat import ChatCompletionChunk
+
+        start = time.perf_counter()
+        for recorded in entry["chunks"]:
+            if self.realtime:
+                delay = recorded["offset"] - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            yield ChatCompletionChunk.model_validate(recorded["chunk"])
+
+
+# Function to build a schema-valid answer for whichever registered prompt a request uses
+def mock_document(messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    from prompts import PROMPTS
+
+    system = messages[0]["content"] if messages else ""
+    names = {prompt.name for prompt in PROMPTS.values() if prompt.system == system}
+    subject = " ".join(messages[-1]["content"].split()[:12]) if messages else ""
+    related_topics = [
+        {"topic": f"Related Topic {i}", "relevance": f"Mock suggestion {i} for {subject}"} for i in range(1, 4)
+    ]
+    disciplines = ["Sociology", "Economics", "History", "Political Science"]
+
+    if names & {"related_topics"}:
+        return {"related_topics": related_topics}
+    if names & {"mind_map", "mind_map_connected"}:
+        return {
+            "nodes": [{"id": "n1", "label": subject, "group": "topic", "description": "Mock node"}],
+            "edges": [],
+            "related_topics": related_topics,
+        }
+    if names & {"research_synthesis"}:
+        return {
+            "title": f"Mock research: {subject}",
+            "introduction": "Mock introduction.",
+            "cross_cutting_themes": ["Mock theme"],
+            "research_questions": ["Mock cross-cutting question?"],
+            "related_topics": related_topics,
+        }
+    if names & {"research_outline"}:
+        return {
+            "title": f"Mock research: {subject}",
+            "introduction": "Mock introduction.",
+            "disciplines": disciplines,
+            "cross_cutting_themes": ["Mock theme"],
+            "related_topics": related_topics,
+        }
+    connections = [
+        {
+            "discipline": discipline,
+            "explanation": f"Mock explanation through {discipline}.",
+            "subtopics": [{"name": f"{discipline} subtopic", "details": "Mock details."}],
+            "themes": ["Mock theme"],
+        }
+        for discipline in disciplines
+    ]
+    if names & {"topic_pair"}:
+        return {
+            "connections": connections[:2],
+            "research_questions": ["Mock research question?"],
+            "key_connections": [{"node": "Mock node", "connects_to": subject, "research_angles": "Mock angle"}],
+        }
+    if names & {"research_section"}:
+        return {
+            "connection": connections[0],
+            "research_questions": ["Mock research question?"],
+            "key_connections": [{"node": "Mock node", "connects_to": subject, "research_angles": "Mock angle"}],
+        }
+    return {
+        "research_output": {
+            "title": f"Mock research: {subject}",
+            "introduction": "Mock introduction.",
+            "connections": connections,
+            "research_questions": ["Mock research question?"],
+            "cross_cutting_themes": ["Mock theme"],
+            "mind_map": {"central_themes": subject, "key_connections": []},
+        },
+        "related_topics": related_topics,
+    }
+
+
+class MockBackend:
+    """
+    Answers every request locally with a canned document in the shape its
+    prompt asks for, after ``latency`` seconds. Streamed requests are split
+    into chunks. Needs no API key or network, for development and load tests.
+    """
+
+    def __init__(self, latency: float = 0.0, model: str = "mock"):
+        self.latency = latency
+        self.model = model
+
+    def completion_payload(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        content = json.dumps(mock_document(params.get("messages", [])), ensure_ascii=False)
+        prompt_tokens = sum(len(m.get("content", "")) for m in params.get("messages", [])) // 4
+        return {
+            "id": f"mock-{request_fingerprint(params)[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": params.get("model", self.model),
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        }
+
+    def chunk_payloads(self, params: Dict[str, Any], chunk_chars: int = 64) -> Iterator[Dict[str, Any]]:
+        completion = self.completion_payload(params)
+        content = completion["choices"][0]["message"]["content"]
+        base = {key: completion[key] for key in ("id", "created", "model")}
+        for i in range(0, len(content), chunk_chars):
+            delta = {"content": content[i:i + chunk_chars]}
+            if i == 0:
+                delta["role"] = "assistant"
+            yield {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+        yield {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+
+    def create(self, **params: Any) -> Any:
+        from openai.types.chat import ChatCompletion
+
+        if params.get("stream"):
+            return self._stream(params)
+        time.sleep(self.latency)
+        return ChatCompletion.model_validate(self.completion_payload(params))
+
+    def _stream(self, params: Dict[str, Any]) -> Iterator[Any]:
+        from openai.types.chat import ChatCompletionChunk
+
+        chunks = list(self.chunk_payloads(params))
+        # The latency is spread across the chunks so streams arrive gradually
+        delay = self.latency / len(chunks)
+        for chunk in chunks:
+            time.sleep(delay)
+            yield ChatCompletionChunk.model_validate(chunk)
+
+
+# Function to read the backend mode configured by the environment
+def backend_mode() -> str:
+    mode = os.getenv("GROK_BACKEND_MODE", LIVE_MODE).lower()
+    if mode not in BACKEND_MODES:
+        raise ValueError(f"Unknown GROK_BACKEND_MODE: {mode}")
+    return mode
+
+
+# Function to build the completion backend configured by the environment
+def get_backend(client_factory: Callable[[], Any], mode: Optional[str] = None) -> Any:
+    """
+    Return the backend for the configured mode.
+
+    ``client_factory`` is only called when the upstream API is needed, so
+    replay and mock modes work without an API key. When ``LLM_ENDPOINTS``
+    registers further OpenAI-compatible endpoints, live calls go through the
+    shared ``llm_router.LLMRouter`` instead of straight to Grok.
+    """
+    from llm_router import live_backend
+
+    mode = mode or backend_mode()
+    cassette = Cassette(os.getenv("GROK_CASSETTE_DIR", DEFAULT_CASSETTE_DIR))
+
+    if mode == REPLAY_MODE:
+        realtime = os.getenv("GROK_REPLAY_REALTIME", "false").lower() in ("1", "true", "yes")
+        return ReplayBackend(cassette, realtime=realtime)
+    if mode == MOCK_MODE:
+        return MockBackend(latency=float(os.getenv("GROK_MOCK_LATENCY_SECONDS", "0")))
+
+    live = live_backend(client_factory)
+    if mode == RECORD_MODE:
+        return RecordingBackend(live, cassette)
+    return live
@@ -0,0 +1,197 @@
+"""
+RFC 6902 JSON Patch: generating a patch between two documents and applying it.
+
+``make_patch`` recurses into objects and into array elements that changed in
+place, and aligns arrays with ``difflib.SequenceMatcher`` so elements inserted
+or removed in the middle become single ``add``/``remove`` operations instead of
+a cascade of replacements. Only ``add``, ``remove`` and ``replace`` are
+generated; ``apply_patch`` also understands ``move``, ``copy`` and ``test``.
+"""
+import copy
+import json
+from difflib import SequenceMatcher
+from typing import Any, Dict, List, Set
+
+Patch = List[Dict[str, Any]]
+
+
+class JsonPatchError(ValueError):
+    """Raised when a patch does not apply to a document."""
+
+
+# Function to escape one object key as a JSON Pointer reference token
+def escape_token(token: Any) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+# Function to split a JSON Pointer into unescaped reference tokens
+def parse_pointer(pointer: str) -> List[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise JsonPatchError(f"Invalid JSON Pointer: {pointer!r}")
+    return [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+
+
+def _fingerprint(value: Any) -> str:
+    # Array elements are compared by their canonical serialization, which is hashable
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _same(source: Any, target: Any) -> bool:
+    # Python treats True == 1 == 1.0, JSON does not
+    return source == target and _fingerprint(source) == _fingerprint(target)
+
+
+# Function to compute a patch that turns ``source`` into ``target``
+def make_patch(source: Any, target: Any) -> Patch:
+    patch: Patch = []
+    _diff(source, target, "", patch)
+    return patch
+
+
+def _diff(source: Any, target: Any, path: str, patch: Patch) -> None:
+    if isinstance(source, dict) and isinstance(target, dict):
+        for key in source:
+            if key not in target:
+                patch.append({"op": "remove", "path": f"{path}/{escape_token(key)}"})
+        for key, value in target.items():
+            child = f"{path}/{escape_token(key)}"
+            if key not in source:
+                patch.append({"op": "add", "path": child, "value": value})
+            elif not _same(source[key], value):
+                _diff(source[key], value, child, patch)
+        return
+
+    if isinstance(source, list) and isinstance(target, list):
+        _diff_list(source, target, path, patch)
+        return
+
+    if not _same(source, target):
+        patch.append({"op": "replace", "path": path, "value": target})
+
+
+def _diff_list(source: List[Any], target: List[Any], path: str, patch: Patch) -> None:
+    matcher = SequenceMatcher(None, [_fingerprint(v) for v in source], [_fingerprint(v) for v in target], autojunk=False)
+    # Opcodes are applied front to back, so when each one starts the array already matches target[:j1]
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        common = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+        for k in range(common):
+            _diff(source[i1 + k], target[j1 + k], f"{path}/{j1 + k}", patch)
+        for _ in range(i2 - i1 - common):
+            patch.append({"op": "remove", "path": f"{path}/{j1 + common}"})
+        for k in range(common, j2 - j1):
+            patch.append({"op": "add", "path": f"{path}/{j1 + k}", "value": target[j1 + k]})
+
+
+def _resolve(document: Any, tokens: List[str]) -> Any:
+    for token in tokens:
+        if isinstance(document, list):
+            document = document[_index(document, token, allow_end=False)]
+        elif isinstance(document, dict) and token in document:
+            document = document[token]
+        else:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+    return document
+
+
+def _index(array: List[Any], token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(array)
+    if not token.isdigit() or (len(token) > 1 and token[0] == "0"):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(array) or (index == len(array) and not allow_end):
+        raise JsonPatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _writable(box: List[Any], tokens: List[str], copied: Set[int]) -> Any:
+    # The container at ``tokens``, after shallow-copying it and every ancestor not yet copied by this patch
+    parent, key = box, 0
+    for depth in range(len(tokens) + 1):
+        node = parent[key]
+        if not isinstance(node, (dict, list)):
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens[:depth])}")
+        if id(node) not in copied:
+            node = parent[key] = node.copy()
+            copied.add(id(node))
+        if depth == len(tokens):
+            return node
+        token = tokens[depth]
+        if isinstance(node, list):
+            key = _index(node, token, allow_end=False)
+        elif token in node:
+            key = token
+        else:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens[:depth + 1])}")
+        parent = node
+
+
+def _add(box: List[Any], tokens: List[str], value: Any, copied: Set[int]) -> None:
+    if not tokens:
+        box[0] = value
+        return
+    parent = _writable(box, tokens[:-1], copied)
+    if isinstance(parent, list):
+        parent.insert(_index(parent, tokens[-1], allow_end=True), value)
+    else:
+        parent[tokens[-1]] = value
+
+
+def _remove(box: List[Any], tokens: List[str], copied: Set[int]) -> Any:
+    if not tokens:
+        raise JsonPatchError("Cannot remove the whole document")
+    parent = _writable(box, tokens[:-1], copied)
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, tokens[-1], allow_end=False))
+    if tokens[-1] in parent:
+        return parent.pop(tokens[-1])
+    raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+def _replace(box: List[Any], tokens: List[str], value: Any, copied: Set[int]) -> None:
+    if not tokens:
+        box[0] = value
+        return
+    parent = _writable(box, tokens[:-1], copied)
+    if isinstance(parent, list):
+        parent[_index(parent, tokens[-1], allow_end=False)] = value
+    elif tokens[-1] in parent:
+        parent[tokens[-1]] = value
+    else:
+        raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+# Function to apply a patch, returning the patched document and leaving ``document`` untouched
+def apply_patch(document: Any, patch: Patch) -> Any:
+    """
+    Containers along each patched path are copied before they change, and
+    everything else is shared with ``document`` and with the values in
+    ``patch``, so applying a small patch to a large document costs about as
+    much as the patch itself. Neither input is modified.
+    """
+    box = [document]
+    copied: Set[int] = set()
+    for operation in patch:
+        op = operation.get("op")
+        tokens = parse_pointer(operation.get("path", ""))
+        if op == "add":
+            _add(box, tokens, operation["value"], copied)
+        elif op == "remove":
+            _remove(box, tokens, copied)
+        elif op == "replace":
+            _replace(box, tokens, operation["value"], copied)
+        elif op in ("move", "copy"):
+            source = parse_pointer(operation["from"])
+            # A copy may be of a container this patch already owns, so it gets its own
+            value = _remove(box, source, copied) if op == "move" else copy.deepcopy(_resolve(box[0], source))
+            _add(box, tokens, value, copied)
+        elif op == "test":
+            if not _same(_resolve(box[0], tokens), operation["value"]):
+                raise JsonPatchError(f"Test failed at {operation['path']}")
+        else:
+            raise JsonPatchError(f"Unknown operation: {op!r}")
+    return box[0]
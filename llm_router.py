@@ -0,0 +1,248 @@
+"""
+Latency- and error-aware routing across OpenAI-compatible endpoints.
+
+The Grok API is always the first endpoint. ``LLM_ENDPOINTS`` registers more
+as a JSON list, in order of preference, for example a self-hosted llama.cpp
+or vLLM server and a mock:
+
+    LLM_ENDPOINTS='[
+        {"name": "local", "base_url": "http://localhost:8080/v1", "model": "llama-3.1-8b-instruct"},
+        {"name": "mock", "type": "mock", "latency": 0.05}
+    ]'
+
+Entry fields are ``name``, ``base_url``, ``api_key`` (or ``api_key_env``),
+``model`` (served for every request) or ``models`` (requested model ->
+served model), ``timeout`` in seconds, ``latency_budget`` (seconds per 1000
+completion tokens above which the endpoint counts as slow) and, for
+``"type": "mock"``, ``latency``.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from grok_backend import GROK_BASE_URL, LiveBackend, MockBackend
+
+# Seconds per 1000 completion tokens above which Grok counts as slow (about 25 tokens/s)
+GROK_LATENCY_BUDGET = float(os.getenv("GROK_LATENCY_BUDGET", "40"))
+# Error rate above which an endpoint is only used when nothing healthier is left
+MAX_ERROR_RATE = 0.5
+# Consecutive failures that take an endpoint out of rotation, and for how long
+FAILURE_THRESHOLD = 3
+COOLDOWN_SECONDS = 30.0
+
+# Status codes worth retrying on another endpoint; other 4xx errors are the caller's fault
+RETRYABLE_STATUSES = (408, 409, 429)
+
+
+class Endpoint:
+    """One OpenAI-compatible endpoint and its live health statistics."""
+
+    def __init__(self, name: str, backend_factory: Callable[[], Any], model: Optional[str] = None,
+                 models: Optional[Dict[str, str]] = None, latency_budget: float = float("inf")):
+        self.name = name
+        self.backend_factory = backend_factory
+        self.model = model
+        self.models = models or {}
+        self.latency_budget = latency_budget
+        self.latency: Optional[float] = None  # EWMA of seconds per 1000 completion tokens
+        self.error_rate = 0.0                 # EWMA of failed calls
+        self.consecutive_failures = 0
+        self.open_until = 0.0                 # out of rotation until this monotonic time
+        self.last_probe = 0.0
+        self.calls = 0
+        self._backend = None
+
+    @property
+    def backend(self) -> Any:
+        if self._backend is None:
+            self._backend = self.backend_factory()
+        return self._backend
+
+    def model_for(self, requested: str) -> str:
+        return self.models.get(requested) or self.model or requested
+
+    def warm(self) -> None:
+        # Backends without connections to open, such as mocks, need no warming
+        warm = getattr(self.backend, "warm", None)
+        if warm is not None:
+            warm()
+
+    def degraded(self) -> bool:
+        slow = self.latency is not None and self.latency > self.latency_budget
+        return slow or self.error_rate > MAX_ERROR_RATE
+
+
+# Function to tell transient upstream failures from errors a different endpoint would repeat
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        return True  # connection errors, timeouts, missing credentials
+    return status >= 500 or status in RETRYABLE_STATUSES
+
+
+class LLMRouter:
+    """
+    Sends each completion to the best available endpoint, failing over to
+    the next one on transient errors.
+
+    Endpoints are tried in preference order, skipping ones that are slow
+    (latency above budget), error-prone or taken out of rotation after
+    repeated failures; those follow, fastest first, as a last resort. Every
+    ``probe_interval`` one request goes to a preferred endpoint that is
+    degraded, so the router notices when it recovers. Implements the same
+    ``create(**params)`` interface as the other backends.
+    """
+
+    def __init__(self, endpoints: List[Endpoint], alpha: float = 0.3, probe_interval: float = 30.0):
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+        self.endpoints = endpoints
+        self.alpha = alpha
+        self.probe_interval = probe_interval
+        self._lock = threading.Lock()
+
+    def _candidates(self) -> List[Endpoint]:
+        now = time.monotonic()
+        with self._lock:
+            available = [e for e in self.endpoints if e.open_until <= now]
+            healthy = [e for e in available if not e.degraded()]
+            degraded = sorted((e for e in available if e.degraded()), key=lambda e: e.latency or 0.0)
+            resting = sorted((e for e in self.endpoints if e.open_until > now), key=lambda e: e.open_until)
+            order = healthy + degraded + resting
+
+            # Give a degraded endpoint preferred over the current choice one request per probe interval
+            for endpoint in self.endpoints:
+                if endpoint is order[0]:
+                    break
+                if endpoint in degraded and now - endpoint.last_probe >= self.probe_interval:
+                    endpoint.last_probe = now
+                    order.remove(endpoint)
+                    order.insert(0, endpoint)
+                    break
+        return order
+
+    def _observe(self, endpoint: Endpoint, elapsed: float, completion: Any, params: Dict[str, Any]) -> None:
+        usage = getattr(completion, "usage", None)
+        tokens = getattr(usage, "completion_tokens", None) or params.get("max_tokens") or 1000
+        per_1k = elapsed / max(tokens, 1) * 1000
+        with self._lock:
+            endpoint.calls += 1
+            endpoint.consecutive_failures = 0
+            endpoint.error_rate -= self.alpha * endpoint.error_rate
+            endpoint.last_probe = time.monotonic()
+            # A stream has only returned its headers here, which says nothing about generation speed
+            if not params.get("stream"):
+                previous = endpoint.latency
+                endpoint.latency = per_1k if previous is None else previous + self.alpha * (per_1k - previous)
+
+    def _fail(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.calls += 1
+            endpoint.consecutive_failures += 1
+            endpoint.error_rate += self.alpha * (1.0 - endpoint.error_rate)
+            endpoint.last_probe = time.monotonic()
+            if endpoint.consecutive_failures >= FAILURE_THRESHOLD:
+                endpoint.open_until = time.monotonic() + COOLDOWN_SECONDS
+
+    def create(self, **params: Any) -> Any:
+        last_error: Optional[Exception] = None
+        for endpoint in self._candidates():
+            start = time.perf_counter()
+            try:
+                completion = endpoint.backend.create(**{**params, "model": endpoint.model_for(params["model"])})
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                self._fail(endpoint)
+                last_error = e
+                continue
+            self._observe(endpoint, time.perf_counter() - start, completion, params)
+            return completion
+        raise last_error
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "name": e.name,
+                    "seconds_per_1k_tokens": None if e.latency is None else round(e.latency, 3),
+                    "latency_budget": None if e.latency_budget == float("inf") else e.latency_budget,
+                    "error_rate": round(e.error_rate, 3),
+                    "calls": e.calls,
+                    "available": e.open_until <= now,
+                    "degraded": e.degraded(),
+                }
+                for e in self.endpoints
+            ]
+
+
+# Function to build an endpoint from one LLM_ENDPOINTS entry
+def endpoint_from_config(config: Dict[str, Any]) -> Endpoint:
+    name = config["name"]
+    if config.get("type") == "mock":
+        factory = lambda: MockBackend(latency=float(config.get("latency", 0.0)))
+    else:
+        def factory() -> Any:
+            from openai import OpenAI
+
+            api_key = config.get("api_key") or os.getenv(config.get("api_key_env", ""), "") or "not-needed"
+            client = OpenAI(
+                api_key=api_key,
+                base_url=config["base_url"],
+                timeout=float(config.get("timeout", 120.0)),
+                max_retries=0,  # the router fails over instead of retrying the same endpoint
+            )
+            return LiveBackend(client)
+    return Endpoint(
+        name,
+        factory,
+        model=config.get("model"),
+        models=config.get("models"),
+        latency_budget=float(config.get("latency_budget", float("inf"))),
+    )
+
+
+# Function to read the extra endpoints registered through LLM_ENDPOINTS
+def configured_endpoints() -> List[Dict[str, Any]]:
+    raw = os.getenv("LLM_ENDPOINTS", "").strip()
+    if not raw:
+        return []
+    configs = json.loads(raw)
+    if not isinstance(configs, list) or not all(isinstance(c, dict) and "name" in c for c in configs):
+        raise ValueError("LLM_ENDPOINTS must be a JSON list of objects with a name")
+    return configs
+
+
+# Routers by endpoint configuration (Grok base URL plus LLM_ENDPOINTS), so callers that rebuild their
+# client factory, such as a Streamlit script on every rerun, share one router and its health statistics
+_routers: Dict[str, LLMRouter] = {}
+_routers_lock = threading.Lock()
+
+
+# Function to get the live backend: Grok alone, or a router shared by every call in this process
+def live_backend(client_factory: Callable[[], Any]) -> Any:
+    """
+    The router's Grok endpoint builds its client with the ``client_factory``
+    of the first call for a configuration; later factories for the same
+    configuration build the same client, so they are not used.
+    """
+    configs = configured_endpoints()
+    if not configs:
+        return LiveBackend(client_factory())
+
+    key = json.dumps([GROK_BASE_URL, configs], sort_keys=True)
+    with _routers_lock:
+        router = _routers.get(key)
+        if router is None:
+            grok = Endpoint("grok", lambda: LiveBackend(client_factory()), latency_budget=GROK_LATENCY_BUDGET)
+            router = _routers[key] = LLMRouter([grok] + [endpoint_from_config(c) for c in configs])
+        return router
+
+
+# Function to report per-endpoint statistics for every router in this process
+def router_stats() -> List[Dict[str, Any]]:
+    with _routers_lock:
+        return [stat for router in _routers.values() for stat in router.stats()]
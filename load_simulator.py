@@ -0,0 +1,251 @@
+"""
+Journey load simulator for capacity planning.
+
+    python load_simulator.py --users 2000 --arrival-rate 40
+    python load_simulator.py --users 5000 --arrival-rate 100 --mock-latency 2 --zipf 1.2 -o steps.jsonl
+    python load_simulator.py --users 500 --arrival-rate 5 --think-time 20 --url http://localhost:8000
+
+Every virtual user walks the journey of client_example.py as a state machine:
+research on two topics, related topics, then a continuation with a further
+topic and related topics again, two to five times, with an exponentially
+distributed think time between steps. Users arrive as a Poisson process at
+--arrival-rate per second, and topics are drawn from a catalogue of --topics
+topics where the topic of popularity rank r has weight 1 / r ** --zipf.
+
+By default the API runs in-process against mock Grok (GROK_BACKEND_MODE=mock,
+answering after --mock-latency seconds), so thousands of users need neither a
+server nor an API key. --url loads a running deployment instead; point it at
+mock Grok or mock_llm_server.py to keep the run free.
+
+The report gives latency percentiles and failures per step, cache hit rates
+per step and upstream calls per prompt template, read from GET /prompt-usage/
+before and after the run. A failed step ends its user's journey. -o appends
+one JSON line per step.
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+RESEARCH, RELATED, CONTINUE, DONE = "research", "related_topics", "continue", "done"
+STEPS = (RESEARCH, RELATED, CONTINUE)
+# Prompt template each step calls Grok with when the API cannot answer it from a cache (single strategy)
+STEP_PROMPTS = {RESEARCH: "research_pair", RELATED: "related_topics", CONTINUE: "research_chain"}
+STEP_PATHS = {RESEARCH: "/research/", RELATED: "/related-topics/", CONTINUE: "/continue-research/"}
+MAX_CONTINUATIONS = 8  # chains are limited to 10 topics
+
+
+class TopicCatalogue:
+    """Topics with Zipf popularity: the topic of rank r is drawn with weight 1 / r ** exponent."""
+
+    def __init__(self, size: int, exponent: float):
+        self.topics = [f"Topic {rank}" for rank in range(1, size + 1)]
+        self._cum_weights = list(itertools.accumulate(1.0 / rank ** exponent for rank in range(1, size + 1)))
+
+    def draw(self, rng: random.Random, exclude: List[str]) -> str:
+        while True:
+            topic = rng.choices(self.topics, cum_weights=self._cum_weights)[0]
+            if topic not in exclude:
+                return topic
+
+
+class Journey:
+    """
+    One virtual user's session: research, then related topics, then a
+    continuation and related topics again until its continuations are used
+    up. The last continuation ends the journey.
+    """
+
+    def __init__(self, rng: random.Random, catalogue: TopicCatalogue, continuations: int, follow_related: float):
+        self.rng = rng
+        self.catalogue = catalogue
+        self.follow_related = follow_related
+        self.remaining = continuations
+        self.state = RESEARCH
+        first = catalogue.draw(rng, [])
+        self.topics = [first, catalogue.draw(rng, [first])]
+        self.next_topic: Optional[str] = None
+
+    def request(self) -> Tuple[str, Dict[str, Any]]:
+        if self.state == RESEARCH:
+            return STEP_PATHS[RESEARCH], {"primary_topic": self.topics[0], "intent_topic": self.topics[1]}
+        if self.state == RELATED:
+            return STEP_PATHS[RELATED], {"topics": self.topics}
+        return STEP_PATHS[CONTINUE], {"topics": self.topics, "next_topic": self.next_topic}
+
+    def advance(self, response: httpx.Response) -> None:
+        if self.state == RESEARCH:
+            self.state = RELATED
+        elif self.state == RELATED:
+            # Some users pick one of the suggestions, the rest a topic of their own
+            suggestions = [item["topic"] for item in response.json()["related_topics"] if item["topic"] not in self.topics]
+            if suggestions and self.rng.random() < self.follow_related:
+                self.next_topic = self.rng.choice(suggestions)
+            else:
+                self.next_topic = self.catalogue.draw(self.rng, self.topics)
+            self.state = CONTINUE
+        else:
+            self.topics = self.topics + [self.next_topic]
+            self.remaining -= 1
+            self.state = RELATED if self.remaining > 0 else DONE
+
+
+class LoadSimulator:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.catalogue = TopicCatalogue(args.topics, args.zipf)
+        self.latencies: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.failures: Dict[str, Counter] = {step: Counter() for step in STEPS}
+        self.journeys = Counter()
+        self.output = None
+
+    async def run_user(self, client: httpx.AsyncClient, user_id: int, rng: random.Random) -> None:
+        journey = Journey(rng, self.catalogue, rng.randint(self.args.min_continuations, self.args.max_continuations),
+                          self.args.follow_related)
+        step = 0
+        while journey.state != DONE:
+            if step:
+                await asyncio.sleep(rng.expovariate(1.0 / self.args.think_time) if self.args.think_time > 0 else 0)
+            step += 1
+            kind = journey.state
+            path, body = journey.request()
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                response, status = None, type(e).__name__
+            elapsed = time.perf_counter() - start
+
+            if self.output is not None:
+                record = {"user": user_id, "step": step, "kind": kind, "topics": journey.topics,
+                          "status": status, "elapsed_ms": round(elapsed * 1000, 1)}
+                self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if status != 200:
+                self.failures[kind][status] += 1
+                self.journeys["abandoned"] += 1
+                return
+            self.latencies[kind].append(elapsed)
+            journey.advance(response)
+        self.journeys["completed"] += 1
+
+    async def run(self, client: httpx.AsyncClient) -> Dict[str, Any]:
+        before = (await client.get("/prompt-usage/")).json()
+        start = time.perf_counter()
+        users = []
+        for user_id in range(self.args.users):
+            users.append(asyncio.create_task(self.run_user(client, user_id, random.Random(self.rng.random()))))
+            await asyncio.sleep(self.rng.expovariate(self.args.arrival_rate))
+        await asyncio.gather(*users)
+        elapsed = time.perf_counter() - start
+        after = (await client.get("/prompt-usage/")).json()
+
+        calls = Counter()
+        for key, totals in after.items():
+            calls[key] = totals["requests"] - before.get(key, {}).get("requests", 0)
+        return {"elapsed": elapsed, "calls": {key: count for key, count in calls.items() if count}}
+
+    def report(self, result: Dict[str, Any]) -> None:
+        args = self.args
+        calls = result["calls"]
+        print("=== JOURNEY LOAD SIMULATION ===")
+        target = args.url or f"in-process API, mock Grok {args.mock_latency}s"
+        print(f"{args.users} users at {args.arrival_rate}/s against {target}; {args.topics} topics (zipf {args.zipf}), "
+              f"think time {args.think_time}s, {args.min_continuations}-{args.max_continuations} continuations")
+        print(f"\n{'step':<16}{'ok':>8}{'failed':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'cache hits':>12}")
+        for step in STEPS:
+            samples = sorted(self.latencies[step])
+            failed = sum(self.failures[step].values())
+            row = f"{step:<16}{len(samples):>8}{failed:>8}"
+            if samples:
+                row += "".join(f"{samples[min(len(samples) - 1, int(f * len(samples)))] * 1000:>9.0f}" for f in (0.5, 0.95, 0.99))
+                # Steps the API answered without calling Grok, from the calls made with the step's prompt
+                upstream = sum(count for key, count in calls.items() if key.split("@")[0] == STEP_PROMPTS[step])
+                row += f"{samples[-1] * 1000:>9.0f}{max(0, len(samples) - upstream) / len(samples):>12.1%}"
+            print(row)
+            if failed:
+                print(f"{'':<16}failures: {dict(self.failures[step])}")
+
+        steps = sum(len(samples) for samples in self.latencies.values())
+        total_calls = sum(calls.values())
+        print(f"\njourneys: {self.journeys['completed']} completed, {self.journeys['abandoned']} abandoned "
+              f"in {result['elapsed']:.1f}s ({steps / result['elapsed']:.1f} steps/s)")
+        print(f"upstream calls: {total_calls} ({total_calls / max(args.users, 1):.2f} per user)")
+        for key, count in sorted(calls.items()):
+            print(f"  {key:<28}{count:>8}")
+
+
+@contextlib.asynccontextmanager
+async def api_client(args: argparse.Namespace):
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    timeout = httpx.Timeout(args.timeout, connect=5.0)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+            yield client
+        return
+
+    # api reads its backend mode and caches at import time
+    os.environ.setdefault("GROK_BACKEND_MODE", "mock")
+    os.environ.setdefault("GROK_MOCK_LATENCY_SECONDS", str(args.mock_latency))
+    os.environ.setdefault("GROK_PREWARM", "false")
+    import api
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with api.app.router.lifespan_context(api.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://simulator", limits=limits, timeout=timeout) as client:
+            yield client
+
+
+async def simulate(args: argparse.Namespace) -> LoadSimulator:
+    simulator = LoadSimulator(args)
+    with contextlib.ExitStack() as stack:
+        if args.output:
+            simulator.output = stack.enter_context(open(args.output, "a", encoding="utf-8"))
+        async with api_client(args) as client:
+            result = await simulator.run(client)
+    simulator.report(result)
+    return simulator
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000, help="Virtual users to run")
+    parser.add_argument("--arrival-rate", type=float, default=20.0, help="Users starting a journey per second")
+    parser.add_argument("--think-time", type=float, default=3.0, help="Mean seconds between a user's steps")
+    parser.add_argument("--min-continuations", type=int, default=2)
+    parser.add_argument("--max-continuations", type=int, default=5)
+    parser.add_argument("--topics", type=int, default=500, help="Size of the topic catalogue")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of topic popularity")
+    parser.add_argument("--follow-related", type=float, default=0.0,
+                        help="Probability a user continues with a suggested related topic; mock Grok "
+                             "suggests the same topics every time, so leave this at 0 against it")
+    parser.add_argument("--url", help="API base URL; without it the API runs in-process against mock Grok")
+    parser.add_argument("--mock-latency", type=float, default=1.0, help="Seconds mock Grok takes per in-process call")
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=180.0, help="Seconds before a step counts as failed")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", help="JSONL file one line per step is appended to")
+    args = parser.parse_args(argv)
+    if not 0 < args.min_continuations <= args.max_continuations <= MAX_CONTINUATIONS:
+        parser.error(f"continuations must satisfy 0 < min <= max <= {MAX_CONTINUATIONS}")
+    if args.topics <= args.max_continuations + 2:
+        parser.error("the catalogue needs more topics than the longest journey")
+    if args.users <= 0 or args.arrival_rate <= 0:
+        parser.error("--users and --arrival-rate must be positive")
+
+    simulator = asyncio.run(simulate(args))
+    return 1 if simulator.journeys["abandoned"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
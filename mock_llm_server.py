@@ -0,0 +1,86 @@
+"""
+Stand-in OpenAI-compatible chat completion server.
+
+Answers ``/v1/chat/completions`` (streamed or not) with canned documents in
+the shape each registered prompt asks for, after a configurable latency and
+with a configurable error rate. Run one or more to exercise the multi-backend
+router, failover and load tests without calling Grok:
+
+    python mock_llm_server.py --port 8081 --latency 0.2
+    python mock_llm_server.py --port 8082 --latency 1.0 --error-rate 0.2
+    GROK_BASE_URL=http://localhost:8081/v1 XAI_API_KEY=mock \\
+        LLM_ENDPOINTS='[{"name": "local", "base_url": "http://localhost:8082/v1"}]' uvicorn api:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from grok_backend import MockBackend
+
+
+# Function to build the stand-in server app
+def create_app(latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, name: str = "mock") -> FastAPI:
+    app = FastAPI(title=f"Mock LLM ({name})")
+    backend = MockBackend(latency=latency, model=name)
+    app.state.requests = 0
+    started = time.monotonic()
+
+    def delay() -> float:
+        return max(0.0, latency + random.uniform(-jitter, jitter))
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": name, "object": "model", "created": 0, "owned_by": "mock"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        params = await request.json()
+        app.state.requests += 1
+        if random.random() < error_rate:
+            await asyncio.sleep(delay() / 2)
+            return JSONResponse(status_code=503, content={"error": {"message": "Injected failure", "type": "server_error"}})
+
+        if not params.get("stream"):
+            await asyncio.sleep(delay())
+            return backend.completion_payload(params)
+
+        chunks = list(backend.chunk_payloads(params))
+        interval = delay() / len(chunks)
+
+        async def events():
+            for chunk in chunks:
+                await asyncio.sleep(interval)
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return {"name": name, "requests": app.state.requests, "uptime": time.monotonic() - started}
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a stand-in OpenAI-compatible server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--name", default="mock", help="Model name reported by the server")
+    args = parser.parse_args()
+
+    app = create_app(args.latency, args.jitter, args.error_rate, args.name)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
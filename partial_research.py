@@ -0,0 +1,167 @@
+import re
+import threading
+from json.decoder import scanstring
+from typing import Any, List, Tuple
+
+from pydantic import ValidationError
+
+from fanout import join_topics
+from schemas import Connection, GeneratedResearch, RelatedTopic, ResearchOutput
+
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_LITERALS = {"true": True, "false": False, "null": None}
+_WHITESPACE = " \t\n\r"
+
+# Marks a value cut off by the end of the text
+_INCOMPLETE = object()
+
+
+class ResearchStream:
+    """Text of a research completion as it streams in, readable from other threads."""
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._lock = threading.Lock()
+
+    def append(self, text: str) -> None:
+        with self._lock:
+            self._parts.append(text)
+
+    def text(self) -> str:
+        with self._lock:
+            return "".join(self._parts)
+
+
+def _skip(text: str, i: int) -> int:
+    while i < len(text) and text[i] in _WHITESPACE:
+        i += 1
+    return i
+
+
+def _value(text: str, i: int) -> Tuple[Any, int, bool]:
+    # Returns the value starting at ``i``, where it ends, and whether it was complete
+    if i >= len(text):
+        return _INCOMPLETE, i, False
+    char = text[i]
+    if char == "{":
+        return _object(text, i + 1)
+    if char == "[":
+        return _array(text, i + 1)
+    if char == '"':
+        try:
+            value, end = scanstring(text, i + 1)
+        except ValueError:
+            return _INCOMPLETE, len(text), False
+        return value, end, True
+    match = _NUMBER.match(text, i)
+    if match and match.end() < len(text):
+        number = match.group()
+        return (float(number) if any(c in number for c in ".eE") else int(number)), match.end(), True
+    for literal, value in _LITERALS.items():
+        if text.startswith(literal, i):
+            return value, i + len(literal), True
+    # A number or literal running into the end of the text, or text that is not JSON
+    return _INCOMPLETE, len(text), False
+
+
+def _object(text: str, i: int) -> Tuple[Any, int, bool]:
+    result = {}
+    while True:
+        i = _skip(text, i)
+        if i < len(text) and text[i] == "}":
+            return result, i + 1, True
+        if i >= len(text) or text[i] != '"':
+            return result, len(text), False
+        key, i, complete = _value(text, i)
+        i = _skip(text, i)
+        if not complete or i >= len(text) or text[i] != ":":
+            return result, len(text), False
+        value, i, complete = _value(text, _skip(text, i + 1))
+        if not complete:
+            # Objects and arrays cut off mid-way keep what they completed; cut-off strings and numbers are dropped
+            if isinstance(value, (dict, list)):
+                result[key] = value
+            return result, len(text), False
+        result[key] = value
+        i = _skip(text, i)
+        if i < len(text) and text[i] == ",":
+            i += 1
+
+
+def _array(text: str, i: int) -> Tuple[Any, int, bool]:
+    result = []
+    while True:
+        i = _skip(text, i)
+        if i < len(text) and text[i] == "]":
+            return result, i + 1, True
+        value, i, complete = _value(text, i)
+        if not complete:
+            # Only whole elements are kept, so every array entry is valid on its own
+            return result, len(text), False
+        result.append(value)
+        i = _skip(text, i)
+        if i < len(text) and text[i] == ",":
+            i += 1
+
+
+# Function to parse what has arrived of a streamed JSON document
+def parse_partial_json(text: str) -> Any:
+    """
+    Parse a prefix of a JSON document, as far as it goes.
+
+    Objects cut off by the end of the text keep their completed members and
+    their partly received object and array members; arrays keep only their
+    completed elements, and strings, numbers and literals that were cut off
+    are dropped. Returns None if not even the outermost value has started.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    value, _, _ = _value(text, start)
+    return None if value is _INCOMPLETE else value
+
+
+# Function to read an array member of a partial document; a model may emit another type in its place
+def _items(container: dict, key: str) -> List[Any]:
+    value = container.get(key)
+    return value if isinstance(value, list) else []
+
+
+# Function to build research from the completed sections of a streamed research document
+def partial_research(text: str, topics: List[str]) -> GeneratedResearch:
+    """
+    Keep what the stream completed: the title and introduction once their
+    strings have closed, every finished connection, research question and
+    cross-cutting theme, and finished related topics. A title is made up if
+    none has arrived yet.
+    """
+    document = parse_partial_json(text)
+    document = document if isinstance(document, dict) else {}
+    output = document.get("research_output")
+    output = output if isinstance(output, dict) else {}
+
+    connections = []
+    for item in _items(output, "connections"):
+        try:
+            connections.append(Connection.model_validate(item))
+        except ValidationError:
+            continue
+    related_topics = []
+    for item in _items(document, "related_topics"):
+        try:
+            related_topics.append(RelatedTopic.model_validate(item))
+        except ValidationError:
+            continue
+
+    title = output.get("title")
+    introduction = output.get("introduction")
+    return GeneratedResearch(
+        research_output=ResearchOutput(
+            title=title if isinstance(title, str) else f"Connecting {join_topics(topics)}: A Multidisciplinary Exploration",
+            introduction=introduction if isinstance(introduction, str) else "",
+            connections=connections,
+            research_questions=[q for q in _items(output, "research_questions") if isinstance(q, str)],
+            cross_cutting_themes=[t for t in _items(output, "cross_cutting_themes") if isinstance(t, str)],
+        ),
+        related_topics=related_topics,
+    )
@@ -0,0 +1,484 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+# Central registry of the prompts sent to Grok.
+#
+# System prompts are byte-stable module constants and always come first in the
+# message list, so every request for a template shares an identical prefix that
+# the upstream API can serve from its prompt cache. Only the user message varies.
+# Bump a template's version whenever its text changes; the version is part of
+# the research cache key, so cached outputs from older prompts are not reused.
+
+RESEARCH_SYSTEM_PROMPT = """\
+You are a multidisciplinary research assistant specializing in connecting diverse academic topics.
+Your task is to create a comprehensive research output that connects the provided topics
+through various academic lenses such as sociology, economics, history, anthropology, environmental studies, cultural studies, and political science.
+
+IMPORTANT: Follow this exact structure for your analysis:
+1. Start with connecting the primary topic and intent topic
+2. Then connect those to the third topic (if provided)
+3. Maintain all previous connections when adding new topics
+
+For example, if analyzing multiple topics:
+- First analyze the connections between the first two topics in detail
+- Then show how additional topics connect to the previous ones
+- Always maintain the previous connections while adding new topics
+- Create rich, nuanced connections between all topics with specific subtopics
+- Identify cross-cutting themes that span all topics
+
+Your analysis should include:
+- Specific subtopics under each disciplinary lens
+- Detailed explanations of how topics intersect
+- Historical contexts and contemporary relevance
+- Power dynamics and structural relationships
+- Practical implications and applications
+
+Format your response as a JSON object with the following structure:
+{
+    "research_output": {
+        "title": "Connecting [Topics]: A Multidisciplinary Exploration",
+        "introduction": "Brief introduction to the connection between the topics",
+        "connections": [
+            {
+                "discipline": "[Relevant Discipline]",
+                "explanation": "Detailed explanation of connections through this discipline",
+                "subtopics": [
+                    {
+                        "name": "[Specific Subtopic]",
+                        "details": "Detailed explanation of this subtopic"
+                    },
+                    {
+                        "name": "[Specific Subtopic]",
+                        "details": "Detailed explanation of this subtopic"
+                    }
+                ],
+                "themes": ["Theme 1", "Theme 2", "Theme 3"]
+            }
+        ],
+        "research_questions": [
+            "Research question 1",
+            "Research question 2",
+            "Research question 3"
+        ],
+        "cross_cutting_themes": [
+            "Theme connecting all topics 1",
+            "Theme connecting all topics 2",
+            "Theme connecting all topics 3"
+        ],
+        "mind_map": {
+            "central_themes": "[List of all connected topics]",
+            "key_connections": [
+                {
+                    "node": "[Connection Point]",
+                    "connects_to": "[Related Topic]",
+                    "research_angles": "[Specific research approaches]"
+                }
+            ]
+        }
+    },
+    "related_topics": [
+        {
+            "topic": "Related Topic 1",
+            "relevance": "Explanation of how this topic connects to the current research"
+        },
+        {
+            "topic": "Related Topic 2",
+            "relevance": "Explanation of how this topic connects to the current research"
+        },
+        {
+            "topic": "Related Topic 3",
+            "relevance": "Explanation of how this topic connects to the current research"
+        }
+    ]
+}
+
+The research output should be comprehensive, academic in tone, and highlight meaningful connections
+between the topics across multiple disciplines. The related topics should be relevant areas that would
+expand the research in interesting directions.
+"""
+
+RELATED_TOPICS_SYSTEM_PROMPT = """\
+You are a multidisciplinary research assistant specializing in connecting diverse academic topics.
+Your task is to suggest related topics that would expand the research on the provided topics.
+
+For each suggested topic, provide:
+1. The topic name
+2. A brief explanation of how it connects to the provided topics
+3. Why exploring this connection would be valuable
+
+Format your response as a JSON object with the following structure:
+{
+    "related_topics": [
+        {
+            "topic": "Related Topic 1",
+            "relevance": "Explanation of how this topic connects to the current research"
+        },
+        {
+            "topic": "Related Topic 2",
+            "relevance": "Explanation of how this topic connects to the current research"
+        },
+        {
+            "topic": "Related Topic 3",
+            "relevance": "Explanation of how this topic connects to the current research"
+        }
+    ]
+}
+"""
+
+MIND_MAP_SYSTEM_PROMPT = """\
+You are a multidisciplinary research assistant specialized in creating comprehensive mind maps.
+Your task is to analyze the provided topics and generate a detailed mind map showing connections
+across various academic disciplines including sociology, economics, history, anthropology, and political science.
+
+For each connection, provide:
+1. A brief explanation of how the topics relate
+2. The academic discipline(s) relevant to this connection
+3. Key themes or concepts that bridge these topics
+
+Format your response as a JSON object with the following structure:
+{
+    "nodes": [
+        {"id": "unique_id", "label": "Node Label", "group": "discipline", "description": "detailed description"}
+    ],
+    "edges": [
+        {"from": "source_node_id", "to": "target_node_id", "label": "relationship", "description": "explanation"}
+    ],
+    "related_topics": [
+        {"topic": "Related Topic 1", "relevance": "Brief explanation of relevance"},
+        {"topic": "Related Topic 2", "relevance": "Brief explanation of relevance"},
+        {"topic": "Related Topic 3", "relevance": "Brief explanation of relevance"}
+    ]
+}
+
+The 'related_topics' should contain 3 topics that are not already in the mind map but are highly relevant to the existing topics.
+These should be topics that would be interesting to explore next and would add valuable connections to the mind map.
+
+Be comprehensive but concise. Focus on academic connections and ensure all relationships are substantiated.
+"""
+
+# Fan-out research: a short outline first, then one section per discipline generated concurrently
+RESEARCH_OUTLINE_SYSTEM_PROMPT = """\
+You are a multidisciplinary research assistant specializing in connecting diverse academic topics.
+Your task is to plan a research output that connects the provided topics through various academic lenses
+such as sociology, economics, history, anthropology, environmental studies, cultural studies, and political science.
+Each discipline you choose will be written up separately by another assistant, so only plan here.
+
+Choose between four and six disciplines that offer the richest, most distinct connections between all topics.
+
+Format your response as a JSON object with the following structure:
+{
+    "title": "Connecting [Topics]: A Multidisciplinary Exploration",
+    "introduction": "Brief introduction to the connection between the topics",
+    "disciplines": ["Discipline 1", "Discipline 2", "Discipline 3", "Discipline 4"],
+    "cross_cutting_themes": [
+        "Theme connecting all topics 1",
+        "Theme connecting all topics 2",
+        "Theme connecting all topics 3"
+    ],
+    "related_topics": [
+        {
+            "topic": "Related Topic 1",
+            "relevance": "Explanation of how this topic connects to the current research"
+        },
+        {
+            "topic": "Related Topic 2",
+            "relevance": "Explanation of how this topic connects to the current research"
+        },
+        {
+            "topic": "Related Topic 3",
+            "relevance": "Explanation of how this topic connects to the current research"
+        }
+    ]
+}
+"""
+
+RESEARCH_SECTION_SYSTEM_PROMPT = """\
+You are a multidisciplinary research assistant specializing in connecting diverse academic topics.
+Your task is to write one section of a multidisciplinary research output: the connections between
+the provided topics through a single academic discipline. Other disciplines are covered in separate sections,
+so stay within your discipline and do not repeat their material.
+
+Your section should include:
+- Specific subtopics within the discipline
+- Detailed explanations of how all topics intersect
+- Historical contexts and contemporary relevance
+- Power dynamics and structural relationships
+- Practical implications and applications
+
+Format your response as a JSON object with the following structure:
+{
+    "connection": {
+        "discipline": "[The Discipline]",
+        "explanation": "Detailed explanation of connections through this discipline",
+        "subtopics": [
+            {
+                "name": "[Specific Subtopic]",
+                "details": "Detailed explanation of this subtopic"
+            },
+            {
+                "name": "[Specific Subtopic]",
+                "details": "Detailed explanation of this subtopic"
+            }
+        ],
+        "themes": ["Theme 1", "Theme 2", "Theme 3"]
+    },
+    "research_questions": [
+        "Research question 1",
+        "Research question 2"
+    ],
+    "key_connections": [
+        {
+            "node": "[Connection Point]",
+            "connects_to": "[Related Topic]",
+            "research_angles": "[Specific research approaches]"
+        }
+    ]
+}
+"""
+
+# Composed research: cached pairwise analyses, then one short synthesis across all topics
+TOPIC_PAIR_SYSTEM_PROMPT = """\
+You are a multidisciplinary research assistant specializing in connecting diverse academic topics.
+Your task is to analyze how exactly two topics connect through academic lenses such as sociology, economics,
+history, anthropology, environmental studies, cultural studies, and political science.
+Your analysis will be reused in research on longer chains of topics that include this pair, so only discuss
+these two topics and do not speculate about others.
+
+Choose the two or three disciplines that offer the richest connections between the topics.
+
+Format your response as a JSON object with the following structure:
+{
+    "connections": [
+        {
+            "discipline": "[Relevant Discipline]",
+            "explanation": "Detailed explanation of connections through this discipline",
+            "subtopics": [
+                {
+                    "name": "[Specific Subtopic]",
+                    "details": "Detailed explanation of this subtopic"
+                }
+            ],
+            "themes": ["Theme 1", "Theme 2"]
+        }
+    ],
+    "research_questions": [
+        "Research question 1",
+        "Research question 2"
+    ],
+    "key_connections": [
+        {
+            "node": "[Connection Point]",
+            "connects_to": "[Related Topic]",
+            "research_angles": "[Specific research approaches]"
+        }
+    ]
+}
+"""
+
+RESEARCH_SYNTHESIS_SYSTEM_PROMPT = """\
+You are a multidisciplinary research assistant specializing in connecting diverse academic topics.
+Your task is to frame a research output on a chain of topics whose pairwise connections have already been
+analyzed by other assistants. You are given the disciplines and themes found for each pair; identify what
+cuts across all of them rather than repeating the pairwise findings.
+
+Format your response as a JSON object with the following structure:
+{
+    "title": "Connecting [Topics]: A Multidisciplinary Exploration",
+    "introduction": "Brief introduction to the connection between all the topics",
+    "cross_cutting_themes": [
+        "Theme connecting all topics 1",
+        "Theme connecting all topics 2",
+        "Theme connecting all topics 3"
+    ],
+    "research_questions": [
+        "Research question spanning all topics 1",
+        "Research question spanning all topics 2"
+    ],
+    "related_topics": [
+        {
+            "topic": "Related Topic 1",
+            "relevance": "Explanation of how this topic connects to the current research"
+        },
+        {
+            "topic": "Related Topic 2",
+            "relevance": "Explanation of how this topic connects to the current research"
+        },
+        {
+            "topic": "Related Topic 3",
+            "relevance": "Explanation of how this topic connects to the current research"
+        }
+    ]
+}
+"""
+
+
+class PromptTemplate(NamedTuple):
+    """A versioned prompt: a static system message and a user message template."""
+    name: str
+    version: str
+    system: str
+    user: str  # str.format template holding everything that varies per request
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    def messages(self, **values: Any) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user.format(**values)},
+        ]
+
+
+# Version of the research prompts, included in research cache keys
+RESEARCH_PROMPT_VERSION = "2"
+
+PROMPTS: Dict[str, PromptTemplate] = {
+    template.name: template
+    for template in [
+        PromptTemplate(
+            name="research_pair",
+            version=RESEARCH_PROMPT_VERSION,
+            system=RESEARCH_SYSTEM_PROMPT,
+            user="Create a multidisciplinary research output connecting {primary_topic} and {intent_topic}. Focus on meaningful connections between these topics across different academic disciplines.",
+        ),
+        PromptTemplate(
+            name="research_chain",
+            version=RESEARCH_PROMPT_VERSION,
+            system=RESEARCH_SYSTEM_PROMPT,
+            user="Create a multidisciplinary research output connecting {primary_topic}, {intent_topic}, and the following previous topics: {previous_topics}. Pay special attention to the interconnections between all topics.",
+        ),
+        PromptTemplate(
+            name="research_triple",
+            version=RESEARCH_PROMPT_VERSION,
+            system=RESEARCH_SYSTEM_PROMPT,
+            user="Create a multidisciplinary research output connecting {primary_topic}, {intent_topic}, and {third_topic}. Pay special attention to the interconnections between all three topics.",
+        ),
+        PromptTemplate(
+            name="related_topics",
+            version="2",
+            system=RELATED_TOPICS_SYSTEM_PROMPT,
+            user="Suggest related topics that would expand research on {topics}. Focus on topics that create interesting interdisciplinary connections.",
+        ),
+        PromptTemplate(
+            name="mind_map",
+            version="2",
+            system=MIND_MAP_SYSTEM_PROMPT,
+            user="Create a multidisciplinary research mind map for the topic '{primary_topic}'. Include connections across sociology, economics, history, anthropology, and political science.",
+        ),
+        PromptTemplate(
+            name="mind_map_connected",
+            version="2",
+            system=MIND_MAP_SYSTEM_PROMPT,
+            user="Create a multidisciplinary research mind map for the primary topic '{primary_topic}' and how it connects with {secondary_topics}. Include connections across sociology, economics, history, anthropology, and political science.",
+        ),
+        PromptTemplate(
+            name="research_outline",
+            version="1",
+            system=RESEARCH_OUTLINE_SYSTEM_PROMPT,
+            user="Plan a multidisciplinary research output connecting {topics}.",
+        ),
+        PromptTemplate(
+            name="research_section",
+            version="1",
+            system=RESEARCH_SECTION_SYSTEM_PROMPT,
+            user="Write the {discipline} section of the research output \"{title}\" connecting {topics}. The other sections cover: {other_disciplines}.",
+        ),
+        PromptTemplate(
+            name="topic_pair",
+            version="1",
+            system=TOPIC_PAIR_SYSTEM_PROMPT,
+            user="Analyze the connections between {first_topic} and {second_topic}.",
+        ),
+        PromptTemplate(
+            name="research_synthesis",
+            version="1",
+            system=RESEARCH_SYNTHESIS_SYSTEM_PROMPT,
+            user="Frame a multidisciplinary research output connecting {topics}. Pairwise findings:\n{pair_findings}",
+        ),
+    ]
+}
+
+
+# Function to look up a prompt template by name
+def get_prompt(name: str) -> PromptTemplate:
+    return PROMPTS[name]
+
+
+# Function to read the number of prompt tokens served from the upstream prompt cache
+def cached_prompt_tokens(usage: Any) -> int:
+    details = getattr(usage, "prompt_tokens_details", None)
+    if details is None:
+        return 0
+    # Older openai SDKs keep unknown usage fields as plain dicts
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", 0) or 0
+
+
+# Per-caller token totals, set by collect_usage() and filled in by PromptUsageTracker.record()
+_usage_sink: ContextVar[Optional[Dict[str, int]]] = ContextVar("usage_sink", default=None)
+
+
+@contextmanager
+def collect_usage() -> Iterator[Dict[str, int]]:
+    """
+    Collect the token usage of every completion made in this context,
+    including worker threads started with a copy of it.
+    """
+    totals = {"requests": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0}
+    token = _usage_sink.set(totals)
+    try:
+        yield totals
+    finally:
+        _usage_sink.reset(token)
+
+
+class PromptUsageTracker:
+    """Accumulates cached vs uncached prompt tokens per prompt template and version."""
+
+    def __init__(self):
+        self._totals: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, template: PromptTemplate, completion: Any) -> None:
+        usage = getattr(completion, "usage", None)
+        if usage is None:
+            return
+        cached = cached_prompt_tokens(usage)
+        with self._lock:
+            totals = self._totals.setdefault(template.key, {
+                "requests": 0,
+                "prompt_tokens": 0,
+                "cached_prompt_tokens": 0,
+                "uncached_prompt_tokens": 0,
+                "completion_tokens": 0,
+            })
+            totals["requests"] += 1
+            totals["prompt_tokens"] += usage.prompt_tokens or 0
+            totals["cached_prompt_tokens"] += cached
+            totals["uncached_prompt_tokens"] += (usage.prompt_tokens or 0) - cached
+            totals["completion_tokens"] += usage.completion_tokens or 0
+
+            sink = _usage_sink.get()
+            if sink is not None:
+                sink["requests"] += 1
+                sink["prompt_tokens"] += usage.prompt_tokens or 0
+                sink["cached_prompt_tokens"] += cached
+                sink["completion_tokens"] += usage.completion_tokens or 0
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            summary = {}
+            for key, totals in self._totals.items():
+                prompt_tokens = totals["prompt_tokens"]
+                summary[key] = dict(
+                    totals,
+                    cached_ratio=totals["cached_prompt_tokens"] / prompt_tokens if prompt_tokens else 0.0,
+                )
+            return summary
+
+
+prompt_usage = PromptUsageTracker()
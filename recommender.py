@@ -0,0 +1,303 @@
+import heapq
+import importlib.util
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from topic_trie import normalize_topic
+
+# Weight linking a document's features to each topic it suggested, and to the other topics of its chain
+SUGGESTED_WEIGHT = 1.0
+CHAIN_WEIGHT = 0.5
+# Share of a query made of the themes and disciplines seen with its topics, and how many of them are used
+PROFILE_WEIGHT = 0.5
+PROFILE_FEATURES = 32
+# Candidate scores are divided by their popularity to this power, so ubiquitous topics do not win every query
+POPULARITY_DAMPING = 0.5
+# While research keeps arriving, the sparse matrix is rebuilt at most this often
+REBUILD_INTERVAL_SECONDS = 5.0
+# Rows copied per acquisition of the lock when snapshotting the counts for a rebuild
+SNAPSHOT_CHUNK_ROWS = 64
+
+TOPIC, THEME, DISCIPLINE = "topic", "theme", "discipline"
+
+
+# Function to check for NumPy and SciPy without importing them; they are optional and slow to import
+def vectorization_available() -> bool:
+    return importlib.util.find_spec("numpy") is not None and importlib.util.find_spec("scipy") is not None
+
+
+# Function to compile co-occurrence rows into a CSR matrix whose candidates are damped by their popularity
+def build_matrix(rows: List[Dict[int, float]], popularity: List[float]) -> Any:
+    import numpy as np
+    from scipy import sparse
+
+    damping = [p ** -POPULARITY_DAMPING if p > 0 else 0.0 for p in popularity]
+    indptr, index_parts, data_parts = [0], [], []
+    # Converted to arrays a chunk of rows at a time: one conversion of every entry would hold the GIL for long
+    for start in range(0, len(rows), SNAPSHOT_CHUNK_ROWS):
+        indices, data = [], []
+        for row in rows[start:start + SNAPSHOT_CHUNK_ROWS]:
+            indices.extend(row)
+            data.extend(weight * damping[candidate] for candidate, weight in row.items())
+            indptr.append(indptr[-1] + len(row))
+        index_parts.append(np.asarray(indices, dtype=np.int64))
+        data_parts.append(np.asarray(data, dtype=np.float64))
+    return sparse.csr_matrix(
+        (np.concatenate(data_parts or [np.zeros(0)]), np.concatenate(index_parts or [np.zeros(0, dtype=np.int64)]),
+         np.asarray(indptr, dtype=np.int64)),
+        shape=(len(rows), len(popularity)),
+    )
+
+
+class Recommendation(NamedTuple):
+    """One related topic and why it was picked."""
+    topic: str
+    relevance: str
+    score: float
+
+
+class TopicRecommender:
+    """
+    Related topics ranked from past research instead of asked of Grok.
+
+    Each research document links its features (the topics of its chain and
+    the themes and disciplines of its connections) to its candidates (the
+    related topics it suggested and the other topics of its chain). A query
+    is the feature vector of its topics: each topic, plus the themes and
+    disciplines most often seen with it. Candidates are scored by the
+    IDF-weighted co-occurrence of those features with them, which is one
+    sparse vector-matrix product. With NumPy and SciPy installed the
+    counts are compiled into a CSR matrix, rebuilt at most every
+    ``REBUILD_INTERVAL_SECONDS`` while research arrives, and queries the
+    matrix does not cover yet are summed over the counts directly. Rebuilds
+    work on a copy of the counts outside the lock, so recording research
+    never waits for one.
+
+    Topics never seen in any research get no recommendations, so callers
+    can fall back to Grok for them.
+    """
+
+    def __init__(self, vectorized: Optional[bool] = None):
+        available = vectorization_available()
+        self.vectorized = available if vectorized is None else vectorized and available
+        self._features: Dict[Tuple[str, str], int] = {}
+        self._feature_labels: List[Tuple[str, str]] = []  # feature -> (kind, label)
+        self._rows: List[Dict[int, float]] = []  # feature -> candidate -> weight
+        self._document_frequency: List[int] = []
+        self._candidates: Dict[str, int] = {}  # normalized topic -> candidate
+        self._candidate_labels: List[str] = []
+        self._popularity: List[float] = []
+        self._profiles: Dict[str, Dict[int, int]] = {}  # normalized topic -> theme or discipline -> count
+        self._documents = 0
+        self._version = 0
+        self._matrix = None
+        self._matrix_version = -1
+        self._matrix_built = 0.0
+        self._rebuilding = False
+        self._snapshot: List[Dict[int, float]] = []  # copy of _rows the next matrix is built from
+        self._dirty: Set[int] = set()  # features whose rows changed since they were last copied
+        self.answered = 0
+        self.cold_starts = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._documents
+
+    def _feature(self, kind: str, label: str) -> Optional[int]:
+        key = normalize_topic(label)
+        if not key:
+            return None
+        index = self._features.get((kind, key))
+        if index is None:
+            index = self._features[(kind, key)] = len(self._rows)
+            self._feature_labels.append((kind, " ".join(label.split())))
+            self._rows.append({})
+            self._document_frequency.append(0)
+        return index
+
+    def _candidate(self, topic: str) -> int:
+        key = normalize_topic(topic)
+        index = self._candidates.get(key)
+        if index is None:
+            index = self._candidates[key] = len(self._candidate_labels)
+            self._candidate_labels.append(" ".join(topic.split()))
+            self._popularity.append(0.0)
+        return index
+
+    def record(self, topics: Iterable[str], related: Iterable[str],
+               themes: Iterable[str] = (), disciplines: Iterable[str] = ()) -> None:
+        """Learn from one research document: its topic chain, suggested topics, themes and disciplines."""
+        chain = [topic for topic in topics if normalize_topic(topic)]
+        with self._lock:
+            descriptors = {self._feature(THEME, theme) for theme in themes if isinstance(theme, str)}
+            descriptors |= {self._feature(DISCIPLINE, discipline) for discipline in disciplines if isinstance(discipline, str)}
+            descriptors.discard(None)
+            context = {self._feature(TOPIC, topic): self._candidate(topic) for topic in chain}
+
+            candidates: Dict[int, float] = {}
+            for topic in related:
+                if normalize_topic(topic):
+                    candidates[self._candidate(topic)] = SUGGESTED_WEIGHT
+            for candidate in context.values():
+                candidates[candidate] = max(candidates.get(candidate, 0.0), CHAIN_WEIGHT)
+            if not candidates:
+                return
+
+            for feature in descriptors | set(context):
+                self._dirty.add(feature)
+                self._document_frequency[feature] += 1
+                row = self._rows[feature]
+                own = context.get(feature)  # a topic is not its own recommendation
+                for candidate, weight in candidates.items():
+                    if candidate != own:
+                        row[candidate] = row.get(candidate, 0.0) + weight
+            for candidate, weight in candidates.items():
+                self._popularity[candidate] += weight
+            for topic in chain:
+                profile = self._profiles.setdefault(normalize_topic(topic), {})
+                for feature in descriptors:
+                    profile[feature] = profile.get(feature, 0) + 1
+            self._documents += 1
+            self._version += 1
+
+    def record_research(self, document: Dict[str, Any], topics: Optional[List[str]] = None) -> None:
+        """Learn from a research document; its chain is read from ``connection_path`` unless given."""
+        if topics is None:
+            topics = [topic for topic in (document.get("connection_path") or "").split(" → ") if topic.strip()]
+        output = document.get("research_output") or {}
+        themes: List[str] = list(output.get("cross_cutting_themes") or [])
+        disciplines: List[str] = []
+        for connection in output.get("connections") or []:
+            if isinstance(connection, dict):
+                disciplines.append(connection.get("discipline") or "")
+                themes.extend(connection.get("themes") or [])
+        related = [item["topic"] for item in document.get("related_topics") or [] if isinstance(item, dict) and item.get("topic")]
+        self.record(topics, related, themes, disciplines)
+
+    def _idf(self, feature: int) -> float:
+        return math.log1p(self._documents / max(self._document_frequency[feature], 1))
+
+    def _query(self, keys: List[str]) -> Dict[int, float]:
+        # Callers hold the lock
+        query: Dict[int, float] = {}
+        for key in keys:
+            feature = self._features.get((TOPIC, key))
+            if feature is not None:
+                query[feature] = query.get(feature, 0.0) + 1.0
+            profile = self._profiles.get(key)
+            if profile:
+                top = heapq.nlargest(PROFILE_FEATURES, profile.items(), key=lambda item: item[1] * self._idf(item[0]))
+                total = sum(count for _, count in top)
+                for feature, count in top:
+                    query[feature] = query.get(feature, 0.0) + PROFILE_WEIGHT * count / total
+        return {feature: weight * self._idf(feature) for feature, weight in query.items()}
+
+    def _refresh_matrix(self) -> None:
+        with self._lock:
+            due = self._matrix is None or time.monotonic() - self._matrix_built >= REBUILD_INTERVAL_SECONDS
+            if self._rebuilding or self._matrix_version == self._version or not due:
+                return
+            self._rebuilding = True
+            version = self._version
+            changed, self._dirty = self._dirty, set()
+            changed.update(range(len(self._snapshot), len(self._rows)))
+        try:
+            # Only rows changed since the last rebuild are copied, a few at a time, so recording research waits for
+            # one chunk at most; rows changed meanwhile are copied again next time. Only one thread rebuilds at a
+            # time, so the snapshot is not changed under it.
+            changed = sorted(changed)
+            for start in range(0, len(changed), SNAPSHOT_CHUNK_ROWS):
+                with self._lock:
+                    for feature in changed[start:start + SNAPSHOT_CHUNK_ROWS]:
+                        row = dict(self._rows[feature])
+                        if feature < len(self._snapshot):
+                            self._snapshot[feature] = row
+                        else:
+                            self._snapshot.append(row)
+            with self._lock:
+                # Taken last so that it covers every candidate in the copied rows
+                popularity = list(self._popularity)
+            matrix = build_matrix(self._snapshot, popularity)
+        finally:
+            with self._lock:
+                self._rebuilding = False
+        with self._lock:
+            self._matrix = matrix
+            self._matrix_version = version
+            self._matrix_built = time.monotonic()
+
+    def _scores(self, query: Dict[int, float], exclude: set, limit: int) -> List[Tuple[float, int]]:
+        # Callers hold the lock; queries arriving before the first matrix is built are summed over the counts
+        if self.vectorized and self._matrix is not None:
+            import numpy as np
+
+            if max(query) < self._matrix.shape[0]:
+                features = np.fromiter(query.keys(), dtype=np.int64, count=len(query))
+                weights = np.fromiter(query.values(), dtype=np.float64, count=len(query))
+                scores = weights @ self._matrix[features]
+                for candidate in exclude:
+                    if candidate < len(scores):
+                        scores[candidate] = 0.0
+                count = min(limit, len(scores))
+                if count == 0:
+                    return []
+                best = np.argpartition(-scores, count - 1)[:count]
+                ranked = [(float(scores[candidate]), int(candidate)) for candidate in best if scores[candidate] > 0]
+                return sorted(ranked, key=lambda item: (-item[0], item[1]))
+
+        scores: Dict[int, float] = {}
+        for feature, weight in query.items():
+            for candidate, count in self._rows[feature].items():
+                scores[candidate] = scores.get(candidate, 0.0) + weight * count
+        ranked = [
+            (score * self._popularity[candidate] ** -POPULARITY_DAMPING, candidate)
+            for candidate, score in scores.items() if candidate not in exclude
+        ]
+        return heapq.nsmallest(limit, ranked, key=lambda item: (-item[0], item[1]))
+
+    def _relevance(self, query: Dict[int, float], candidate: int, labels: List[str]) -> str:
+        # The query feature contributing most to the candidate's score explains it
+        feature = max(query, key=lambda f: query[f] * self._rows[f].get(candidate, 0.0))
+        kind, label = self._feature_labels[feature]
+        joined = ", ".join(labels[:-1]) + f" and {labels[-1]}" if len(labels) > 1 else labels[0]
+        if kind == TOPIC:
+            return f"Often explored together with {label} in earlier research"
+        if kind == THEME:
+            return f"Shares the theme \"{label}\" with {joined}"
+        return f"Connected to {joined} through {label}"
+
+    def recommend(self, topics: List[str], limit: int = 3) -> List[Recommendation]:
+        """Return up to ``limit`` related topics for a chain, best first; empty for topics never seen."""
+        keys = [normalize_topic(topic) for topic in topics]
+        if self.vectorized:
+            self._refresh_matrix()
+        with self._lock:
+            query = self._query(keys)
+            if not query or limit <= 0:
+                self.cold_starts += 1
+                return []
+            exclude = {self._candidates[key] for key in keys if key in self._candidates}
+            recommendations = [
+                Recommendation(self._candidate_labels[candidate], self._relevance(query, candidate, topics), score)
+                for score, candidate in self._scores(query, exclude, limit)
+            ]
+            if len(recommendations) < limit:
+                self.cold_starts += 1
+            else:
+                self.answered += 1
+            return recommendations
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queries = self.answered + self.cold_starts
+            return {
+                "documents": self._documents,
+                "topics": len(self._candidate_labels),
+                "features": len(self._rows),
+                "vectorized": self.vectorized,
+                "answered": self.answered,
+                "cold_starts": self.cold_starts,
+                "answered_ratio": self.answered / queries if queries else 0.0,
+            }
@@ -0,0 +1,291 @@
+"""
+Compact, read-only archive of serialized research documents.
+
+Research documents are large and highly repetitive across documents: the same
+keys, the same disciplines and the same phrasing recur in every one. An
+archive compresses each document on its own against a dictionary trained on a
+sample of the archive, so documents stay individually addressable while still
+sharing the redundancy. The file layout is:
+
+    header   MAGIC, codec, dictionary length, dictionary
+    records  one compressed document after another
+    index    fixed-width entries sorted by key: key (32 bytes), offset, length
+    footer   index offset, entry count, MAGIC
+
+Keys are the 64-character hex keys the API caches research under,
+``research_store.research_key``. Readers memory-map the file and binary
+search the index in place, so opening an archive of millions of documents
+does not load its index, and a lookup touches one index page and one record.
+
+    python research_archive.py build research.rarc research.jsonl
+    python research_archive.py get research.rarc Coffee Politics Gender
+    python research_archive.py get research.rarc --mode fast Coffee Politics Gender
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; zlib with a preset dictionary is always available
+    zstandard = None
+
+from prompts import RESEARCH_PROMPT_VERSION
+from research_store import research_key
+from routing import STANDARD_MODE
+
+MAGIC = b"RSRCARC1"
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+HEADER = struct.Struct("<8sBI")        # magic, codec, dictionary length
+INDEX_ENTRY = struct.Struct("<32sQI")  # key, record offset, record length
+FOOTER = struct.Struct("<QQ8s")        # index offset, entry count, magic
+
+DICTIONARY_SIZE = 112 * 1024
+ZLIB_DICTIONARY_SIZE = 32 * 1024       # deflate can only look back 32 KiB
+TRAINING_SAMPLES = 2000
+ZSTD_LEVEL = 12
+ZLIB_LEVEL = 9
+
+
+class ArchiveError(ValueError):
+    """Raised when a file is not a readable research archive."""
+
+
+# Function to pick the best available codec
+def default_codec() -> int:
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+# Function to train a compression dictionary from sample documents
+def train_dictionary(samples: List[bytes], codec: int = CODEC_ZSTD, size: int = DICTIONARY_SIZE) -> bytes:
+    if codec == CODEC_ZSTD:
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError:
+            # Too few samples to train on; zstd accepts raw content as a dictionary too
+            pass
+    # Deflate has no dictionary trainer; it finds matches in a preset history, and
+    # matches closer to the end of it are cheaper, so the samples are packed
+    # with the most typical (shortest) documents last
+    history = b"".join(sorted(samples, key=len, reverse=True))
+    return history[-(size if codec == CODEC_ZSTD else ZLIB_DICTIONARY_SIZE):]
+
+
+class _Codec:
+    """Compresses and decompresses single documents against a shared dictionary."""
+
+    def __init__(self, codec: int, dictionary: bytes):
+        self.codec = codec
+        self.dictionary = dictionary
+        if codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise ArchiveError("This archive is zstd-compressed; install zstandard to read it")
+            self._zstd_dict = zstandard.ZstdCompressionDict(dictionary)
+            self._zstd_dict.precompute_compress(level=ZSTD_LEVEL)
+            # zstd contexts must not be used by two threads at once
+            self._local = threading.local()
+        elif codec != CODEC_ZLIB:
+            raise ArchiveError(f"Unknown archive codec {codec}")
+
+    def _zstd(self) -> Any:
+        contexts = getattr(self._local, "contexts", None)
+        if contexts is None:
+            contexts = self._local.contexts = (
+                zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=self._zstd_dict),
+                zstandard.ZstdDecompressor(dict_data=self._zstd_dict),
+            )
+        return contexts
+
+    def compress(self, data: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            return self._zstd()[0].compress(data)
+        compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=self.dictionary)
+        return compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            return self._zstd()[1].decompress(data)
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=self.dictionary)
+        return decompressor.decompress(data) + decompressor.flush()
+
+
+class ArchiveWriter:
+    """
+    Writes an archive in one pass. Documents are compressed and appended as
+    they are added; the sorted index and footer are written on ``close()``.
+    """
+
+    def __init__(self, path: str, dictionary: bytes, codec: Optional[int] = None):
+        self.path = path
+        self._codec = _Codec(default_codec() if codec is None else codec, dictionary)
+        self._index: Dict[bytes, Tuple[int, int]] = {}
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(HEADER.pack(MAGIC, self._codec.codec, len(dictionary)))
+        self._file.write(dictionary)
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc_info: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._tmp_path)
+
+    def add(self, key: str, document: bytes) -> None:
+        """Add a serialized document; adding the same key again replaces it."""
+        record = self._codec.compress(document)
+        self._index[bytes.fromhex(key)] = (self._file.tell(), len(record))
+        self._file.write(record)
+
+    def close(self) -> None:
+        index_offset = self._file.tell()
+        for key in sorted(self._index):
+            self._file.write(INDEX_ENTRY.pack(key, *self._index[key]))
+        self._file.write(FOOTER.pack(index_offset, len(self._index), MAGIC))
+        self._file.close()
+        # Readers never see a half-written archive
+        os.replace(self._tmp_path, self.path)
+
+
+class ResearchArchive:
+    """
+    Memory-mapped reader for an archive written by ``ArchiveWriter``.
+
+    Lookups binary search the index in the mapped file and decompress one
+    record. The mapping is read-only, so a reader can be shared across threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < HEADER.size + FOOTER.size:
+            raise ArchiveError(f"{path} is too small to be a research archive")
+        magic, codec, dictionary_length = HEADER.unpack_from(self._map, 0)
+        self._index_offset, self._count, end_magic = FOOTER.unpack_from(self._map, len(self._map) - FOOTER.size)
+        if magic != MAGIC or end_magic != MAGIC:
+            raise ArchiveError(f"{path} is not a research archive")
+        dictionary = self._map[HEADER.size:HEADER.size + dictionary_length]
+        self._codec = _Codec(codec, dictionary)
+
+    def __enter__(self) -> "ResearchArchive":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(bytes.fromhex(key)) is not None
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _find(self, key: bytes) -> Optional[Tuple[int, int]]:
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            position = self._index_offset + middle * INDEX_ENTRY.size
+            entry_key = self._map[position:position + 32]
+            if entry_key < key:
+                low = middle + 1
+            elif entry_key > key:
+                high = middle
+            else:
+                _, offset, length = INDEX_ENTRY.unpack_from(self._map, position)
+                return offset, length
+        return None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the serialized document stored under ``key``, or None."""
+        location = self._find(bytes.fromhex(key))
+        if location is None:
+            return None
+        offset, length = location
+        return self._codec.decompress(self._map[offset:offset + length])
+
+    def get_topics(self, topics: List[str], mode: str = STANDARD_MODE,
+                   prompt_version: str = RESEARCH_PROMPT_VERSION) -> Optional[bytes]:
+        return self.get(research_key(topics, mode, prompt_version))
+
+    def keys(self) -> Iterable[str]:
+        for i in range(self._count):
+            position = self._index_offset + i * INDEX_ENTRY.size
+            yield self._map[position:position + 32].hex()
+
+
+# Function to build an archive from (key, document) pairs, training the dictionary on the first of them
+def build_archive(path: str, documents: Iterable[Tuple[str, bytes]], codec: Optional[int] = None,
+                  training_samples: int = TRAINING_SAMPLES) -> int:
+    codec = default_codec() if codec is None else codec
+    documents = iter(documents)
+    head = []
+    for item in documents:
+        head.append(item)
+        if len(head) >= training_samples:
+            break
+
+    dictionary = train_dictionary([document for _, document in head], codec) if head else b""
+    count = 0
+    with ArchiveWriter(path, dictionary, codec) as writer:
+        for key, document in head:
+            writer.add(key, document)
+            count += 1
+        for key, document in documents:
+            writer.add(key, document)
+            count += 1
+    return count
+
+
+# Function to read (key, document) pairs from bulk_research.py output, keyed as the API caches them
+def read_bulk_output(path: str) -> Iterable[Tuple[str, bytes]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("response") is None:
+                continue
+            document = json.dumps(record["response"], ensure_ascii=False, separators=(",", ":"))
+            # Output written before records carried their mode and prompt version was standard mode at the current version
+            key = research_key(record["topics"], record.get("mode", STANDARD_MODE),
+                               record.get("prompt_version", RESEARCH_PROMPT_VERSION))
+            yield key, document.encode("utf-8")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 3 and argv[0] == "build":
+        count = build_archive(argv[1], read_bulk_output(argv[2]))
+        source_size = os.path.getsize(argv[2])
+        archive_size = os.path.getsize(argv[1])
+        print(f"Archived {count} documents: {source_size} -> {archive_size} bytes")
+        return 0
+    if len(argv) >= 3 and argv[0] == "get":
+        topics, mode = argv[2:], STANDARD_MODE
+        if len(topics) >= 3 and topics[0] == "--mode":
+            topics, mode = topics[2:], topics[1]
+        with ResearchArchive(argv[1]) as archive:
+            document = archive.get_topics(topics, mode)
+        if document is None:
+            print("Not found", file=sys.stderr)
+            return 1
+        sys.stdout.write(document.decode("utf-8") + "\n")
+        return 0
+    print(__doc__, file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from json_patch import apply_patch
+
+DEFAULT_BASE_URL = os.getenv("RESEARCH_API_URL", "http://localhost:8000")
+
+# Research can take a minute or more upstream; connecting should not
+DEFAULT_TIMEOUT = httpx.Timeout(180.0, connect=5.0)
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60.0)
+
+# Research requests are cached and deduplicated server side, so retrying them is safe
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Documents kept per client so continuation steps can be fetched as JSON Patches against them
+DEFAULT_DELTA_DOCUMENTS = 32
+
+
+class ResearchAPIError(Exception):
+    """Raised when the API returns an error after all retries."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"{status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+# Function to build the JSON body for a research request
+def research_payload(topics: List[str], **options: Any) -> Dict[str, Any]:
+    if len(topics) < 2:
+        raise ValueError("At least two topics are required")
+    payload = {"primary_topic": topics[0], "intent_topic": topics[1], **options}
+    if len(topics) > 2:
+        payload["previous_topics"] = topics[2:]
+    return payload
+
+
+# Function to compute how long to wait before retrying, honouring Retry-After
+def retry_delay(attempt: int, response: Optional[httpx.Response], backoff: float) -> float:
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    # Full jitter keeps many clients from retrying in lockstep
+    return random.uniform(0, backoff * (2 ** attempt))
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    if response.status_code >= 400:
+        try:
+            detail = response.json().get("detail", response.text)
+        except ValueError:
+            detail = response.text
+        raise ResearchAPIError(response.status_code, str(detail))
+
+
+class DeltaDocuments:
+    """
+    The most recent research documents a client received, by research id and
+    by topic chain. Continuation requests name the document of the chain
+    they extend as their delta base, and ``226 IM Used`` responses are
+    patched onto it, so callers always get the full document back.
+    """
+
+    def __init__(self, max_documents: int = DEFAULT_DELTA_DOCUMENTS):
+        self.max_documents = max_documents
+        self._documents: "OrderedDict[Tuple[str, ...], Tuple[str, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def _chain(topics: List[str]) -> Tuple[str, ...]:
+        return tuple(" ".join(topic.split()).lower() for topic in topics)
+
+    def base(self, topics: List[str]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """Research id and document held for ``topics``, if any."""
+        return self._documents.get(self._chain(topics)) if self.max_documents > 0 else None
+
+    def headers(self, base: Optional[Tuple[str, Dict[str, Any]]]) -> Dict[str, str]:
+        return {"A-IM": "json-patch", "Delta-Base": f'"{base[0]}"'} if base else {}
+
+    def resolve(self, topics: List[str], response: httpx.Response,
+                base: Optional[Tuple[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Return the full document for a response, applying it to ``base`` when it is a patch."""
+        if response.status_code == 226:
+            document = apply_patch(base[1], response.json())
+        else:
+            document = response.json()
+        location = response.headers.get("content-location", "")
+        if self.max_documents > 0 and location.startswith("/research/"):
+            chain = self._chain(topics)
+            self._documents[chain] = (location.rsplit("/", 1)[-1], document)
+            self._documents.move_to_end(chain)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+        return document
+
+
+class ResearchClient:
+    """
+    Blocking client for the research API.
+
+    One pooled ``httpx.Client`` is reused for every call, with timeouts and
+    retries with jittered exponential backoff on transport errors and
+    retryable status codes. ``headers`` are sent with every request, for
+    example ``{"X-Priority": "batch", "X-Tenant": "etl"}`` for batch work.
+    Continuation steps are fetched as JSON Patches against the previous
+    step's document when the client still holds it (``delta_documents`` of
+    them; 0 disables this). Use as a context manager or call ``close()``.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, max_retries: int = 3, backoff: float = 0.5,
+                 timeout: httpx.Timeout = DEFAULT_TIMEOUT, limits: httpx.Limits = DEFAULT_LIMITS,
+                 headers: Optional[Dict[str, str]] = None, delta_documents: int = DEFAULT_DELTA_DOCUMENTS):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.deltas = DeltaDocuments(delta_documents)
+        self._http = httpx.Client(base_url=base_url, timeout=timeout, limits=limits, headers=headers)
+
+    def __enter__(self) -> "ResearchClient":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._http.close()
+
+    def _request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = self._http.request(method, path, **kwargs)
+                if response.status_code not in RETRY_STATUSES:
+                    break
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            if attempt < self.max_retries:
+                time.sleep(retry_delay(attempt, response, self.backoff))
+        _raise_for_status(response)
+        return response
+
+    def research(self, topics: List[str], **options: Any) -> Dict[str, Any]:
+        """Generate research connecting ``topics``; options are extra request fields such as ``mode``."""
+        response = self._request("POST", "/research/", json=research_payload(topics, **options))
+        return self.deltas.resolve(topics, response)
+
+    def continue_research(self, topics: List[str], next_topic: str, **options: Any) -> Dict[str, Any]:
+        body = {"topics": topics, "next_topic": next_topic, **options}
+        base = self.deltas.base(topics)
+        response = self._request("POST", "/continue-research/", json=body, headers=self.deltas.headers(base))
+        return self.deltas.resolve(topics + [next_topic], response, base)
+
+    def related_topics(self, topics: List[str], **options: Any) -> List[Dict[str, str]]:
+        body = {"topics": topics, **options}
+        return self._request("POST", "/related-topics/", json=body).json()["related_topics"]
+
+    def get_research(self, research_id: str) -> Dict[str, Any]:
+        return self._request("GET", f"/research/{research_id}").json()
+
+    def research_continuation(self, token: str) -> Dict[str, Any]:
+        """Fetch research returned partially under a deadline: the full document, or a newer partial while it is generated."""
+        return self._request("GET", f"/research/continuations/{token}").json()
+
+    def admission_stats(self) -> Dict[str, Any]:
+        """Upstream slots, queue and limits of the worker that answers, including ``batch_max_concurrent``."""
+        return self._request("GET", "/admission/").json()
+
+    def stream_research(self, topics: List[str], chunk_size: int = 16384, **options: Any) -> Iterator[bytes]:
+        """Yield the raw research response body in chunks instead of buffering it."""
+        with self._http.stream("POST", "/research/", json=research_payload(topics, **options)) as response:
+            if response.status_code >= 400:
+                response.read()
+                _raise_for_status(response)
+            yield from response.iter_bytes(chunk_size)
+
+
+class AsyncResearchClient:
+    """
+    ``asyncio`` client for the research API with the same pooling, timeout,
+    retry and delta behaviour as ``ResearchClient``.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, max_retries: int = 3, backoff: float = 0.5,
+                 timeout: httpx.Timeout = DEFAULT_TIMEOUT, limits: httpx.Limits = DEFAULT_LIMITS,
+                 headers: Optional[Dict[str, str]] = None, delta_documents: int = DEFAULT_DELTA_DOCUMENTS):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.deltas = DeltaDocuments(delta_documents)
+        self._http = httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits, headers=headers)
+
+    async def __aenter__(self) -> "AsyncResearchClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self._http.aclose()
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = await self._http.request(method, path, **kwargs)
+                if response.status_code not in RETRY_STATUSES:
+                    break
+            except httpx.TransportError:
+                if attempt == self.max_retries:
+                    raise
+            if attempt < self.max_retries:
+                await asyncio.sleep(retry_delay(attempt, response, self.backoff))
+        _raise_for_status(response)
+        return response
+
+    async def research(self, topics: List[str], **options: Any) -> Dict[str, Any]:
+        """Generate research connecting ``topics``; options are extra request fields such as ``mode``."""
+        response = await self._request("POST", "/research/", json=research_payload(topics, **options))
+        return self.deltas.resolve(topics, response)
+
+    async def continue_research(self, topics: List[str], next_topic: str, **options: Any) -> Dict[str, Any]:
+        body = {"topics": topics, "next_topic": next_topic, **options}
+        base = self.deltas.base(topics)
+        response = await self._request("POST", "/continue-research/", json=body, headers=self.deltas.headers(base))
+        return self.deltas.resolve(topics + [next_topic], response, base)
+
+    async def related_topics(self, topics: List[str], **options: Any) -> List[Dict[str, str]]:
+        body = {"topics": topics, **options}
+        return (await self._request("POST", "/related-topics/", json=body)).json()["related_topics"]
+
+    async def get_research(self, research_id: str) -> Dict[str, Any]:
+        return (await self._request("GET", f"/research/{research_id}")).json()
+
+    async def research_continuation(self, token: str) -> Dict[str, Any]:
+        """Fetch research returned partially under a deadline: the full document, or a newer partial while it is generated."""
+        return (await self._request("GET", f"/research/continuations/{token}")).json()
+
+    async def admission_stats(self) -> Dict[str, Any]:
+        """Upstream slots, queue and limits of the worker that answers, including ``batch_max_concurrent``."""
+        return (await self._request("GET", "/admission/")).json()
+
+    async def stream_research(self, topics: List[str], chunk_size: int = 16384, **options: Any) -> AsyncIterator[bytes]:
+        """Yield the raw research response body in chunks instead of buffering it."""
+        async with self._http.stream("POST", "/research/", json=research_payload(topics, **options)) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                _raise_for_status(response)
+            async for chunk in response.aiter_bytes(chunk_size):
+                yield chunk
+
+
+class JourneyRunner:
+    """
+    Runs many topic journeys concurrently and appends one JSON line per step
+    to ``output_path``.
+
+    A journey is a list of topics: the first two start the research and every
+    further topic is added with ``/continue-research/``. Each record carries the
+    journey id, step, topics, status and elapsed time, so a crashed run leaves a
+    valid, appendable file behind.
+    """
+
+    def __init__(self, client: AsyncResearchClient, output_path: str, concurrency: int = 8,
+                 include_related: bool = False, **options: Any):
+        self.client = client
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.include_related = include_related
+        self.options = options
+
+    async def run(self, journeys: List[List[str]]) -> Dict[str, int]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        totals = {"journeys": len(journeys), "succeeded": 0, "failed": 0}
+
+        with open(self.output_path, "a", encoding="utf-8") as output:
+            async def run_one(topics: List[str]) -> None:
+                async with semaphore:
+                    ok = await self._run_journey(topics, output)
+                totals["succeeded" if ok else "failed"] += 1
+
+            await asyncio.gather(*(run_one(topics) for topics in journeys))
+        return totals
+
+    async def _run_journey(self, topics: List[str], output: Any) -> bool:
+        journey_id = uuid.uuid4().hex
+        steps = [("research", topics[:2])] + [("continue", topics[:i + 1]) for i in range(2, len(topics))]
+
+        for step, (kind, step_topics) in enumerate(steps, 1):
+            start = time.perf_counter()
+            record = {"journey_id": journey_id, "step": step, "kind": kind, "topics": step_topics}
+            try:
+                if kind == "research":
+                    record["response"] = await self.client.research(step_topics, **self.options)
+                else:
+                    record["response"] = await self.client.continue_research(
+                        step_topics[:-1], step_topics[-1], **self.options
+                    )
+                if self.include_related:
+                    record["related_topics"] = await self.client.related_topics(step_topics)
+                record["status"] = "ok"
+            except (ResearchAPIError, httpx.HTTPError) as e:
+                record["status"] = "error"
+                record["error"] = str(e)
+            record["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+            # Lines are written whole from the event loop thread, so concurrent journeys never interleave
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            if record["status"] != "ok":
+                return False
+        return True
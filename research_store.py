@@ -0,0 +1,165 @@
+import gzip
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from prompts import RESEARCH_PROMPT_VERSION
+from routing import STANDARD_MODE
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+RESEARCH_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class StoredResearch(NamedTuple):
+    """A serialized research response and its precompressed variants."""
+    research_id: str
+    body: bytes
+    encoded: Dict[str, bytes]  # content-coding -> compressed body
+
+    def variant(self, encoding: Optional[str]) -> bytes:
+        return self.encoded[encoding] if encoding else self.body
+
+
+# Function to derive the content address of a serialized response
+def content_id(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+# Function to derive the cache key for a chain of topics generated with a given prompt version
+def research_cache_key(topics: List[str], prompt_version: str = "") -> str:
+    normalized = [" ".join(topic.split()).lower() for topic in topics]
+    return hashlib.sha256("\x1f".join([prompt_version] + normalized).encode("utf-8")).hexdigest()
+
+
+# Function to derive the key the API caches a topic chain's research under
+def research_key(all_topics: List[str], mode: str = STANDARD_MODE, prompt_version: str = RESEARCH_PROMPT_VERSION) -> str:
+    # Each mode produces different output, so it is part of the cache key
+    return research_cache_key(all_topics, prompt_version=f"{prompt_version}:{mode}")
+
+
+# Function to precompress a response body for every supported content-coding
+def compress_variants(body: bytes) -> Dict[str, bytes]:
+    variants = {"gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return variants
+
+
+class ResearchStore:
+    """
+    Content-addressed, size-bounded store of serialized research responses.
+
+    Entries are immutable: the same bytes always map to the same id, so stored
+    responses can be cached indefinitely by clients and CDNs. The store also
+    maps topic-chain cache keys to entries, tracks in-flight generations so
+    concurrent identical requests are only sent upstream once.
+
+    This implementation lives in process memory; see ``shared_store`` for the
+    variant shared by several worker processes.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, StoredResearch]" = OrderedDict()
+        self._cache: Dict[str, Any] = {}     # cache key -> (research id, expiry)
+        self._inflight: Dict[str, float] = {}  # cache key -> claim expiry
+        self._lock = threading.Lock()
+
+    def put(self, body: bytes) -> StoredResearch:
+        research_id = content_id(body)
+        with self._lock:
+            entry = self._entries.get(research_id)
+            if entry is not None:
+                self._entries.move_to_end(research_id)
+                return entry
+
+        # Compress outside the lock; a concurrent put of the same body produces identical bytes
+        entry = StoredResearch(research_id, body, compress_variants(body))
+        with self._lock:
+            self._entries[research_id] = entry
+            self._entries.move_to_end(research_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get(self, research_id: str) -> Optional[StoredResearch]:
+        if not RESEARCH_ID_PATTERN.match(research_id):
+            return None
+        with self._lock:
+            entry = self._entries.get(research_id)
+            if entry is not None:
+                self._entries.move_to_end(research_id)
+            return entry
+
+    def contains(self, research_id: str) -> bool:
+        """Whether the research is still stored, without counting as a use of it."""
+        with self._lock:
+            return research_id in self._entries
+
+    def lookup(self, key: str) -> Optional[StoredResearch]:
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                return None
+            research_id, expires = cached
+            if expires <= time.time():
+                del self._cache[key]
+                return None
+        return self.get(research_id)
+
+    def remember(self, key: str, research_id: str, ttl: float) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+            self._cache[key] = (research_id, time.time() + ttl)
+            # Dicts keep insertion order, so the first key is the oldest mapping
+            while len(self._cache) > self.max_entries:
+                del self._cache[next(iter(self._cache))]
+
+    def claim(self, key: str, ttl: float) -> bool:
+        """Mark a generation as in flight; False if another request already owns it."""
+        now = time.time()
+        with self._lock:
+            if self._inflight.get(key, 0.0) > now:
+                return False
+            self._inflight[key] = now + ttl
+            return True
+
+    def release(self, key: str) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def is_claimed(self, key: str) -> bool:
+        with self._lock:
+            return self._inflight.get(key, 0.0) > time.time()
+
+
+# Function to open the research store configured by the environment
+def open_research_store(namespace: Optional[str] = None) -> Any:
+    """
+    Return a SQLite-backed store shared by all workers when RESEARCH_STORE_PATH
+    is set, otherwise a store private to this process.
+
+    A ``namespace`` opens a separate store for other cached documents (in a
+    database beside the research one when it is shared), so they are never
+    served as research.
+    """
+    max_entries = int(os.getenv("RESEARCH_STORE_MAX_ENTRIES", "1000"))
+    path = os.getenv("RESEARCH_STORE_PATH")
+    if path:
+        if namespace:
+            root, extension = os.path.splitext(path)
+            path = f"{root}.{namespace}{extension}"
+        from shared_store import SQLiteResearchStore
+        return SQLiteResearchStore(path, max_entries=max_entries)
+    return ResearchStore(max_entries=max_entries)
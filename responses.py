@@ -0,0 +1,194 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import BaseModel
+
+from json_patch import make_patch
+from research_store import StoredResearch, compress_variants
+
+try:
+    import orjson  # noqa: F401
+    DefaultJSONResponse = ORJSONResponse
+except ImportError:  # orjson is optional; fall back to the stdlib encoder
+    DefaultJSONResponse = JSONResponse
+
+# Stored research is content-addressed and never changes, so CDNs and browsers may keep it forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Preferred content-coding when the client accepts several with equal weight
+ENCODING_PREFERENCE = ("br", "gzip")
+
+# Delta encoding (RFC 3229): a client holding an earlier document sends "A-IM: json-patch" and
+# "Delta-Base: <its ETag>", and gets "226 IM Used" with an RFC 6902 patch against it
+JSON_PATCH_IM = "json-patch"
+JSON_PATCH_MEDIA_TYPE = "application/json-patch+json"
+# Patches between recently paired documents, so journeys taking the same step share one diff
+PATCH_CACHE_ENTRIES = 256
+
+
+class RawJSONResponse(Response):
+    """
+    Response for JSON that is already serialized, such as validated bytes
+    served from a cache, so it is sent without a decode/re-encode pass.
+    """
+    media_type = "application/json"
+
+
+# Function to serialize a validated model in a single pass with pydantic-core
+def model_response(model: BaseModel, **kwargs) -> RawJSONResponse:
+    return RawJSONResponse(model.model_dump_json(), **kwargs)
+
+
+# Function to pick the best content-coding from an Accept-Encoding header
+def negotiate_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> Optional[str]:
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding] = quality
+
+    best, best_quality = None, 0.0
+    for coding in ENCODING_PREFERENCE:
+        if coding not in available:
+            continue
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+# Function to build the strong ETag for one encoded variant of stored research
+def research_etag(research_id: str, encoding: Optional[str] = None) -> str:
+    return f'"{research_id}-{encoding}"' if encoding else f'"{research_id}"'
+
+
+# Function to read the research id from any of its ETags, weak or strong, for any encoding
+def etag_research_id(tag: str) -> str:
+    tag = tag.strip()
+    tag = tag[2:] if tag.startswith("W/") else tag
+    return tag.strip('"').split("-", 1)[0]
+
+
+# Function to check an If-None-Match header against stored research
+def matches_if_none_match(if_none_match: Optional[str], research_id: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        if tag.strip() == "*":
+            return True
+        # If-None-Match uses weak comparison, and every encoding of an id decodes to the same bytes
+        if etag_research_id(tag) == research_id:
+            return True
+    return False
+
+
+# Function to read which stored research a client wants a JSON Patch against, if any
+def requested_delta_base(request: Request) -> Optional[str]:
+    accepted = [im.split(";")[0].strip().lower() for im in request.headers.get("a-im", "").split(",")]
+    base = request.headers.get("delta-base")
+    if JSON_PATCH_IM not in accepted or not base:
+        return None
+    return etag_research_id(base)
+
+
+class PatchCache:
+    """
+    Serialized JSON Patches between pairs of stored research, with their
+    compressed variants. Documents are immutable, so a patch between two ids
+    never changes and is computed once.
+    """
+
+    def __init__(self, max_entries: int = PATCH_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._patches: "OrderedDict[Tuple[str, str], StoredResearch]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, base: StoredResearch, entry: StoredResearch) -> StoredResearch:
+        key = (base.research_id, entry.research_id)
+        with self._lock:
+            patch = self._patches.get(key)
+            if patch is not None:
+                self._patches.move_to_end(key)
+                return patch
+
+        operations = make_patch(json.loads(base.body), json.loads(entry.body))
+        body = json.dumps(operations, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        patch = StoredResearch(entry.research_id, body, compress_variants(body))
+        with self._lock:
+            self._patches[key] = patch
+            while len(self._patches) > self.max_entries:
+                self._patches.popitem(last=False)
+        return patch
+
+
+patch_cache = PatchCache()
+
+
+# Function to serve stored research with validators, conditional GET and negotiated compression
+def stored_research_response(
+    request: Request,
+    entry: StoredResearch,
+    cache_control: Optional[str] = IMMUTABLE_CACHE_CONTROL,
+) -> Response:
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), entry.encoded)
+    headers = {
+        "ETag": research_etag(entry.research_id, encoding),
+        "Vary": "Accept-Encoding",
+        "Content-Location": f"/research/{entry.research_id}",
+    }
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+
+    conditional = request.method in ("GET", "HEAD")
+    if conditional and matches_if_none_match(request.headers.get("if-none-match"), entry.research_id):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return RawJSONResponse(entry.variant(encoding), headers=headers)
+
+
+# Function to serve stored research as a JSON Patch against the client's copy of ``base`` when that is smaller
+def stored_research_delta_response(
+    request: Request,
+    entry: StoredResearch,
+    base: Optional[StoredResearch],
+    cache_control: Optional[str] = None,
+) -> Response:
+    if base is None or base.research_id == entry.research_id:
+        response = stored_research_response(request, entry, cache_control=cache_control)
+    else:
+        patch = patch_cache.get(base, entry)
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"), patch.encoded)
+        if len(patch.variant(encoding)) >= len(entry.variant(encoding)):
+            # The documents share too little; the full document is smaller than the patch
+            response = stored_research_response(request, entry, cache_control=cache_control)
+        else:
+            headers = {
+                # The ETag names the patched result, which is the full document
+                "ETag": research_etag(entry.research_id),
+                "IM": JSON_PATCH_IM,
+                "Delta-Base": research_etag(base.research_id),
+                "Content-Location": f"/research/{entry.research_id}",
+            }
+            if cache_control:
+                headers["Cache-Control"] = cache_control
+            if encoding:
+                headers["Content-Encoding"] = encoding
+            response = Response(patch.variant(encoding), status_code=226, headers=headers, media_type=JSON_PATCH_MEDIA_TYPE)
+    response.headers["Vary"] = "Accept-Encoding, A-IM, Delta-Base"
+    return response
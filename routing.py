@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from typing import Dict, NamedTuple, Tuple
+
+# Request-level generation modes
+FAST_MODE = "fast"
+STANDARD_MODE = "standard"
+DEEP_MODE = "deep"
+MODES = (FAST_MODE, STANDARD_MODE, DEEP_MODE)
+
+STANDARD_MODEL = os.getenv("GROK_MODEL", "grok-3")
+FAST_MODEL = os.getenv("GROK_FAST_MODEL", "grok-3-mini")
+
+
+class RouteSpec(NamedTuple):
+    """How one task is generated in one mode."""
+    model: str
+    max_tokens: int
+    temperature: float
+    tokens_per_extra_topic: int = 0  # added for every topic beyond the first two
+    max_tokens_cap: int = 8000
+    latency_budget: float = 60.0     # seconds; above this the router falls back to FAST_MODEL
+
+
+class Route(NamedTuple):
+    """The model and limits chosen for a single upstream call."""
+    task: str
+    model: str
+    max_tokens: int
+    temperature: float
+    fallback: bool = False
+
+
+# Related topics are three short suggestions, so even the deep mode stays small.
+# Research output grows with the number of connected topics, continuation more so
+# because it has to carry every earlier connection forward.
+ROUTES: Dict[Tuple[str, str], RouteSpec] = {
+    ("related_topics", FAST_MODE): RouteSpec(FAST_MODEL, 400, 0.8, latency_budget=5.0),
+    ("related_topics", STANDARD_MODE): RouteSpec(FAST_MODEL, 600, 0.8, latency_budget=8.0),
+    ("related_topics", DEEP_MODE): RouteSpec(STANDARD_MODEL, 1000, 0.8, latency_budget=15.0),
+    ("research", FAST_MODE): RouteSpec(FAST_MODEL, 2000, 0.7, 250, latency_budget=30.0),
+    ("research", STANDARD_MODE): RouteSpec(STANDARD_MODEL, 4000, 0.7, 500, latency_budget=60.0),
+    ("research", DEEP_MODE): RouteSpec(STANDARD_MODEL, 6000, 0.7, 1000, max_tokens_cap=12000, latency_budget=120.0),
+    ("continuation", FAST_MODE): RouteSpec(FAST_MODEL, 2500, 0.7, 300, latency_budget=30.0),
+    ("continuation", STANDARD_MODE): RouteSpec(STANDARD_MODEL, 4000, 0.7, 600, latency_budget=75.0),
+    ("continuation", DEEP_MODE): RouteSpec(STANDARD_MODEL, 6000, 0.7, 1200, max_tokens_cap=12000, latency_budget=150.0),
+    # Fan-out research: a short outline, then one bounded section per discipline
+    ("research_outline", FAST_MODE): RouteSpec(FAST_MODEL, 600, 0.7, latency_budget=10.0),
+    ("research_outline", STANDARD_MODE): RouteSpec(STANDARD_MODEL, 800, 0.7, latency_budget=15.0),
+    ("research_outline", DEEP_MODE): RouteSpec(STANDARD_MODEL, 1000, 0.7, latency_budget=20.0),
+    ("research_section", FAST_MODE): RouteSpec(FAST_MODEL, 800, 0.7, 100, latency_budget=15.0),
+    ("research_section", STANDARD_MODE): RouteSpec(STANDARD_MODEL, 1200, 0.7, 150, latency_budget=25.0),
+    ("research_section", DEEP_MODE): RouteSpec(STANDARD_MODEL, 2000, 0.7, 250, latency_budget=40.0),
+    # Composed research: one small analysis per topic pair, then a short synthesis across all topics
+    ("topic_pair", FAST_MODE): RouteSpec(FAST_MODEL, 800, 0.7, latency_budget=15.0),
+    ("topic_pair", STANDARD_MODE): RouteSpec(STANDARD_MODEL, 1200, 0.7, latency_budget=25.0),
+    ("topic_pair", DEEP_MODE): RouteSpec(STANDARD_MODEL, 2000, 0.7, latency_budget=40.0),
+    ("research_synthesis", FAST_MODE): RouteSpec(FAST_MODEL, 600, 0.7, 50, latency_budget=10.0),
+    ("research_synthesis", STANDARD_MODE): RouteSpec(STANDARD_MODEL, 800, 0.7, 75, latency_budget=15.0),
+    ("research_synthesis", DEEP_MODE): RouteSpec(STANDARD_MODEL, 1200, 0.7, 100, latency_budget=20.0),
+    ("mind_map", STANDARD_MODE): RouteSpec(STANDARD_MODEL, 3000, 0.7, latency_budget=60.0),
+}
+
+
+class ModelRouter:
+    """
+    Picks the model and ``max_tokens`` for each upstream call.
+
+    Latency is tracked per task and model as an exponentially weighted moving
+    average. When the configured model's average exceeds its route's latency
+    budget, calls fall back to ``FAST_MODEL``; one call per ``probe_interval``
+    still goes to the slow model so the router notices when it recovers.
+    """
+
+    def __init__(self, routes: Dict[Tuple[str, str], RouteSpec] = ROUTES, alpha: float = 0.3, probe_interval: float = 30.0):
+        self.routes = routes
+        self.alpha = alpha
+        self.probe_interval = probe_interval
+        self._latency: Dict[Tuple[str, str], float] = {}
+        self._last_probe: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def route(self, task: str, mode: str = STANDARD_MODE, topic_count: int = 2) -> Route:
+        spec = self.routes.get((task, mode)) or self.routes[(task, STANDARD_MODE)]
+        extra_topics = max(topic_count - 2, 0)
+        max_tokens = min(spec.max_tokens + spec.tokens_per_extra_topic * extra_topics, spec.max_tokens_cap)
+
+        if spec.model != FAST_MODEL and self._degraded(task, spec):
+            return Route(task, FAST_MODEL, max_tokens, spec.temperature, fallback=True)
+        return Route(task, spec.model, max_tokens, spec.temperature)
+
+    def observe(self, route: Route, latency: float) -> None:
+        key = (route.task, route.model)
+        with self._lock:
+            # Every completed call is a fresh measurement, so it also counts as a probe
+            self._last_probe[key] = time.monotonic()
+            previous = self._latency.get(key)
+            self._latency[key] = latency if previous is None else previous + self.alpha * (latency - previous)
+
+    def latency(self, task: str, model: str) -> float:
+        return self._latency.get((task, model), 0.0)
+
+    def _degraded(self, task: str, spec: RouteSpec) -> bool:
+        key = (task, spec.model)
+        now = time.monotonic()
+        with self._lock:
+            if self._latency.get(key, 0.0) <= spec.latency_budget:
+                return False
+            if now - self._last_probe.get(key, now) >= self.probe_interval:
+                self._last_probe[key] = now
+                return False
+            return True
+
+
+model_router = ModelRouter()
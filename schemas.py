@@ -0,0 +1,141 @@
+from typing import Annotated, List, Literal, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints
+
+
+# Typed research schema matching the JSON structure requested in the system prompt.
+# Grok occasionally adds fields of its own, so every model keeps unknown keys.
+class SchemaModel(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+class Subtopic(SchemaModel):
+    name: str
+    details: str = ""
+
+
+class Connection(SchemaModel):
+    discipline: str
+    explanation: str = ""
+    subtopics: List[Subtopic] = []
+    themes: List[str] = []
+
+
+class KeyConnection(SchemaModel):
+    node: str
+    connects_to: Union[str, List[str]] = ""
+    research_angles: Union[str, List[str]] = ""
+
+
+class MindMap(SchemaModel):
+    central_themes: Union[str, List[str]] = ""
+    key_connections: List[KeyConnection] = []
+
+
+class ResearchOutput(SchemaModel):
+    title: str
+    introduction: str = ""
+    connections: List[Connection] = []
+    research_questions: List[str] = []
+    cross_cutting_themes: List[str] = []
+    mind_map: Optional[MindMap] = None
+
+
+class RelatedTopic(SchemaModel):
+    topic: str
+    relevance: str = ""
+
+
+# Document returned by Grok for a research prompt
+class GeneratedResearch(SchemaModel):
+    research_output: ResearchOutput
+    related_topics: List[RelatedTopic] = []
+
+
+# Connection analysis between two topics, cached and reused by composed research
+class PairAnalysis(SchemaModel):
+    connections: List[Connection] = []
+    research_questions: List[str] = []
+    key_connections: List[KeyConnection] = []
+
+
+# Generation mode: fast uses a cheaper, faster model; deep allows longer output
+Mode = Literal["fast", "standard", "deep"]
+
+# Generation strategy: one long completion, an outline plus concurrent per-discipline sections,
+# or cached pairwise analyses composed by one short synthesis call
+Strategy = Literal["single", "fanout", "compose"]
+
+
+# Every topic is repeated in the prompt, so topic length and chain length bound prompt size
+MAX_TOPIC_LENGTH = 100
+MAX_CHAIN_LENGTH = 10
+
+Topic = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=MAX_TOPIC_LENGTH)]
+
+# Bounds of a request deadline; research not finished by then is returned partially
+MIN_DEADLINE_MS = 100
+MAX_DEADLINE_MS = 600_000
+DeadlineMs = Optional[Annotated[int, Field(ge=MIN_DEADLINE_MS, le=MAX_DEADLINE_MS)]]
+
+
+# Pydantic models for request and response
+class ResearchRequest(BaseModel):
+    primary_topic: Topic
+    intent_topic: Topic
+    previous_topics: Optional[List[Topic]] = Field(None, max_length=MAX_CHAIN_LENGTH - 2)
+    mode: Mode = "standard"
+    strategy: Strategy = "single"
+    deadline_ms: DeadlineMs = None
+
+
+class ContinueResearchRequest(BaseModel):
+    topics: List[Topic] = Field(max_length=MAX_CHAIN_LENGTH - 1)  # All existing topics
+    next_topic: Topic  # New topic to connect
+    mode: Mode = "standard"
+    strategy: Strategy = "single"
+    deadline_ms: DeadlineMs = None
+
+
+class RelatedTopicsRequest(BaseModel):
+    topics: List[Topic] = Field(min_length=1, max_length=MAX_CHAIN_LENGTH)
+    mode: Mode = "standard"
+
+
+class ResearchResponse(BaseModel):
+    research_output: ResearchOutput
+    related_topics: List[RelatedTopic]
+    connection_path: str
+
+
+# Research cut short by a request deadline: the sections completed so far, and a token for the rest
+class PartialResearchResponse(ResearchResponse):
+    partial: bool = True
+    continuation_token: str
+
+
+class RelatedTopicsResponse(BaseModel):
+    related_topics: List[RelatedTopic]
+
+
+class JourneyBranch(BaseModel):
+    topic: str
+    research_id: Optional[str] = None  # None when the branch continues but was never generated itself
+
+
+class JourneyResponse(BaseModel):
+    topics: List[str]
+    research_id: Optional[str] = None
+    longest_prefix: int                # number of leading topics with generated research
+    branches: List[JourneyBranch]
+
+
+class TopicSuggestion(BaseModel):
+    topic: str
+    popularity: float
+    fuzzy: bool = False                # matched only after correcting one typo in the query
+
+
+class AutocompleteResponse(BaseModel):
+    query: str
+    suggestions: List[TopicSuggestion]
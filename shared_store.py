@@ -0,0 +1,184 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+from research_store import RESEARCH_ID_PATTERN, StoredResearch, compress_variants, content_id
+
+# Prune the store every this many writes rather than on every put
+PRUNE_INTERVAL = 100
+# A read records its document's last use only when the recorded one is older than this, so hot reads rarely write
+TOUCH_INTERVAL_SECONDS = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS research (
+    research_id TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    gzip BLOB,
+    br BLOB,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    research_id TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS inflight (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+class SQLiteResearchStore:
+    """
+    Research store shared by every worker process on a host, backed by a
+    SQLite database in WAL mode.
+
+    Exposes the same interface as ``research_store.ResearchStore``. Each thread
+    keeps its own connection; with WAL, readers never wait on each other or on
+    the single writer, so cache lookups take no locks on the hot path. Like
+    the in-memory store it evicts the least recently used research, with
+    recency kept to within ``TOUCH_INTERVAL_SECONDS``.
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000):
+        self.path = path
+        self.max_entries = max_entries
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._writes = 0
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        self._migrate(connection)
+
+    @staticmethod
+    def _migrate(connection: sqlite3.Connection) -> None:
+        # Stores created before research recorded its last use start from each document's creation time
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(research)")}
+            if "last_used" not in columns:
+                connection.execute("ALTER TABLE research ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+                connection.execute("UPDATE research SET last_used = created")
+            connection.execute("CREATE INDEX IF NOT EXISTS research_last_used ON research (last_used)")
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork, so they are keyed by process as well as thread
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def put(self, body: bytes) -> StoredResearch:
+        research_id = content_id(body)
+        entry = self.get(research_id)
+        if entry is not None:
+            return entry
+
+        entry = StoredResearch(research_id, body, compress_variants(body))
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR IGNORE INTO research (research_id, body, gzip, br, created, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+            (research_id, body, entry.encoded.get("gzip"), entry.encoded.get("br"), now, now),
+        )
+        self._after_write()
+        return entry
+
+    def get(self, research_id: str) -> Optional[StoredResearch]:
+        if not RESEARCH_ID_PATTERN.match(research_id):
+            return None
+        row = self._connection().execute(
+            "SELECT research_id, body, gzip, br, last_used FROM research WHERE research_id = ?",
+            (research_id,),
+        ).fetchone()
+        return self._entry(row)
+
+    def contains(self, research_id: str) -> bool:
+        row = self._connection().execute("SELECT 1 FROM research WHERE research_id = ?", (research_id,)).fetchone()
+        return row is not None
+
+    def lookup(self, key: str) -> Optional[StoredResearch]:
+        row = self._connection().execute(
+            "SELECT r.research_id, r.body, r.gzip, r.br, r.last_used FROM cache c"
+            " JOIN research r ON r.research_id = c.research_id"
+            " WHERE c.key = ? AND c.expires > ?",
+            (key, time.time()),
+        ).fetchone()
+        return self._entry(row)
+
+    def remember(self, key: str, research_id: str, ttl: float) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, research_id, expires) VALUES (?, ?, ?)",
+            (key, research_id, time.time() + ttl),
+        )
+        self._after_write()
+
+    def claim(self, key: str, ttl: float) -> bool:
+        """Mark a generation as in flight; False if another worker already owns it."""
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO inflight (key, owner, expires) VALUES (?, ?, ?)"
+            " ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires"
+            " WHERE inflight.expires <= ?",
+            (key, self.owner, now + ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, key: str) -> None:
+        self._connection().execute("DELETE FROM inflight WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def is_claimed(self, key: str) -> bool:
+        row = self._connection().execute(
+            "SELECT 1 FROM inflight WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return row is not None
+
+    def prune(self) -> None:
+        """Drop expired rows and the least recently used research beyond ``max_entries``."""
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+            connection.execute("DELETE FROM inflight WHERE expires <= ?", (now,))
+            connection.execute(
+                "DELETE FROM research WHERE research_id IN ("
+                " SELECT research_id FROM research ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _after_write(self) -> None:
+        self._writes += 1
+        if self._writes % PRUNE_INTERVAL == 0:
+            self.prune()
+
+    def _entry(self, row) -> Optional[StoredResearch]:
+        if row is None:
+            return None
+        research_id, body, gzip_body, br_body, last_used = row
+        # Reading research counts as a use of it for eviction
+        now = time.time()
+        if now - last_used >= TOUCH_INTERVAL_SECONDS:
+            self._connection().execute("UPDATE research SET last_used = ? WHERE research_id = ?", (now, research_id))
+        encoded = {"gzip": gzip_body}
+        if br_body is not None:
+            encoded["br"] = br_body
+        return StoredResearch(research_id, body, encoded)
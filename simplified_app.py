@@ -1,13 +1,22 @@
 import os
+import time
 import streamlit as st
 import json
 from openai import OpenAI
 import httpx
+from grok_backend import GROK_BASE_URL, get_backend
+from prompts import RESEARCH_PROMPT_VERSION, get_prompt
+from research_store import open_research_store, research_cache_key
+from routing import model_router
+from topic_index import SUGGESTION_WEIGHT, TopicIndex, seed_topic_index
+from topic_trie import TopicTrie
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+RESEARCH_CACHE_TTL_SECONDS = float(os.getenv("RESEARCH_CACHE_TTL_SECONDS", "86400"))
+
 # Set page configuration
 st.set_page_config(
     page_title="Multidisciplinary Research Explorer",
@@ -56,120 +65,35 @@ def get_grok_client():
     
     return OpenAI(
         api_key=api_key,
-        base_url="https://api.x.ai/v1",
+        base_url=GROK_BASE_URL,
         http_client=http_client
     )
 
 # Function to generate multidisciplinary research
 def generate_research(primary_topic, intent_topic, third_topic=None):
-    client = get_grok_client()
-    
-    # Construct the prompt based on the examples
-    system_prompt = """
-    You are a multidisciplinary research assistant specializing in connecting diverse academic topics.
-    Your task is to create a comprehensive research output that connects the provided topics
-    through various academic lenses such as sociology, economics, history, anthropology, environmental studies, cultural studies, and political science.
-    
-    IMPORTANT: Follow this exact structure for your analysis:
-    1. Start with connecting the primary topic and intent topic
-    2. Then connect those to the third topic (if provided)
-    3. Maintain all previous connections when adding new topics
-    
-    For example, if analyzing multiple topics:
-    - First analyze the connections between the first two topics in detail
-    - Then show how additional topics connect to the previous ones
-    - Always maintain the previous connections while adding new topics
-    - Create rich, nuanced connections between all topics with specific subtopics
-    - Identify cross-cutting themes that span all topics
-    
-    Your analysis should include:
-    - Specific subtopics under each disciplinary lens
-    - Detailed explanations of how topics intersect
-    - Historical contexts and contemporary relevance
-    - Power dynamics and structural relationships
-    - Practical implications and applications
+    backend = get_backend(get_grok_client)
     
-    Format your response as a JSON object with the following structure:
-    {
-        "research_output": {
-            "title": "Connecting [Topics]: A Multidisciplinary Exploration",
-            "introduction": "Brief introduction to the connection between the topics",
-            "connections": [
-                {
-                    "discipline": "[Relevant Discipline]",
-                    "explanation": "Detailed explanation of connections through this discipline",
-                    "subtopics": [
-                        {
-                            "name": "[Specific Subtopic]",
-                            "details": "Detailed explanation of this subtopic"
-                        },
-                        {
-                            "name": "[Specific Subtopic]",
-                            "details": "Detailed explanation of this subtopic"
-                        }
-                    ],
-                    "themes": ["Theme 1", "Theme 2", "Theme 3"]
-                }
-            ],
-            "research_questions": [
-                "Research question 1",
-                "Research question 2",
-                "Research question 3"
-            ],
-            "cross_cutting_themes": [
-                "Theme connecting all topics 1",
-                "Theme connecting all topics 2",
-                "Theme connecting all topics 3"
-            ],
-            "mind_map": {
-                "central_themes": "[List of all connected topics]",
-                "key_connections": [
-                    {
-                        "node": "[Connection Point]",
-                        "connects_to": "[Related Topic]",
-                        "research_angles": "[Specific research approaches]"
-                    }
-                ]
-            }
-        },
-        "related_topics": [
-            {
-                "topic": "Related Topic 1",
-                "relevance": "Explanation of how this topic connects to the current research"
-            },
-            {
-                "topic": "Related Topic 2",
-                "relevance": "Explanation of how this topic connects to the current research"
-            },
-            {
-                "topic": "Related Topic 3",
-                "relevance": "Explanation of how this topic connects to the current research"
-            }
-        ]
-    }
-    
-    The research output should be comprehensive, academic in tone, and highlight meaningful connections
-    between the topics across multiple disciplines. The related topics should be relevant areas that would
-    expand the research in interesting directions.
-    """
-    
-    # Construct the user prompt based on provided topics
+    # Use the shared research prompt so the Streamlit app and the API send the same cached prefix
     if third_topic:
-        user_prompt = f"Create a multidisciplinary research output connecting {primary_topic}, {intent_topic}, and {third_topic}. Pay special attention to the interconnections between all three topics."
+        messages = get_prompt("research_triple").messages(
+            primary_topic=primary_topic, intent_topic=intent_topic, third_topic=third_topic
+        )
     else:
-        user_prompt = f"Create a multidisciplinary research output connecting {primary_topic} and {intent_topic}. Focus on meaningful connections between these topics across different academic disciplines."
+        messages = get_prompt("research_pair").messages(primary_topic=primary_topic, intent_topic=intent_topic)
     
     try:
         # Call Grok API
-        completion = client.chat.completions.create(
-            model="grok-3",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.7,
-            max_tokens=4000,  # Increased token limit for more detailed outputs
-        )
+        route = model_router.route("research", topic_count=3 if third_topic else 2)
+        start = time.perf_counter()
+        try:
+            completion = backend.create(
+                model=route.model,
+                messages=messages,
+                temperature=route.temperature,
+                max_tokens=route.max_tokens,
+            )
+        finally:
+            model_router.observe(route, time.perf_counter() - start)
         
         # Extract the response
         response_text = completion.choices[0].message.content
@@ -195,6 +119,72 @@ def generate_research(primary_topic, intent_topic, third_topic=None):
         st.error(f"Error calling Grok API: {str(e)}")
         return None
 
+# Topics researched or suggested in any session of this server, for topic suggestions
+@st.cache_resource
+def get_topic_index():
+    index = TopicIndex()
+    seed_paths = [path.strip() for path in os.getenv("TOPIC_INDEX_SEED", "").split(",") if path.strip()]
+    if seed_paths:
+        seed_topic_index(index, seed_paths)
+    return index
+
+topic_index = get_topic_index()
+
+# Research documents shared by every session of this server, evicted least recently used first
+# beyond RESEARCH_STORE_MAX_ENTRIES; sessions only keep the ids of their documents
+@st.cache_resource
+def get_research_store():
+    return open_research_store()
+
+research_store = get_research_store()
+
+# Function to get the id of the research for a topic chain, reusing any branch already explored
+def research_for_chain(topics):
+    journeys = st.session_state.journeys
+    research_id = journeys.get(topics)
+    if research_id is not None and research_store.get(research_id) is not None:
+        return research_id
+    
+    # Another session may have researched the same chain; app documents are keyed apart from API responses
+    key = research_cache_key(topics, prompt_version=f"app:{RESEARCH_PROMPT_VERSION}")
+    entry = research_store.lookup(key)
+    if entry is None:
+        if len(topics) == 2:
+            research_data = generate_research(topics[0], topics[1])
+        elif len(topics) == 3:
+            research_data = generate_research(topics[0], topics[1], topics[2])
+        else:
+            # For topics beyond the third, pass the last two topics as the third parameter
+            # This ensures we maintain all previous connections
+            combined_prompt = f"{topics[-2]} and {topics[-1]}"
+            research_data = generate_research(topics[0], topics[1], combined_prompt)
+        if research_data is None:
+            return None
+        
+        entry = research_store.put(json.dumps(research_data).encode("utf-8"))
+        if RESEARCH_CACHE_TTL_SECONDS > 0:
+            research_store.remember(key, entry.research_id, ttl=RESEARCH_CACHE_TTL_SECONDS)
+        topic_index.record_many(topics)
+        topic_index.record_many(
+            (item["topic"] for item in research_data.get("related_topics", []) if item.get("topic")),
+            SUGGESTION_WEIGHT,
+        )
+    
+    journeys.insert(topics, entry.research_id)
+    return entry.research_id
+
+# Function to load the research shown in this session, generating it again if it was evicted
+def current_research():
+    research_id = st.session_state.research_id
+    if research_id is None:
+        return None
+    entry = research_store.get(research_id)
+    if entry is None and len(st.session_state.topics) >= 2:
+        with st.spinner("Reloading research..."):
+            research_id = st.session_state.research_id = research_for_chain(st.session_state.topics)
+        entry = research_store.get(research_id) if research_id else None
+    return json.loads(entry.body) if entry else None
+
 # Main application
 st.title("🔍 Multidisciplinary Research Explorer")
 st.markdown("""
@@ -208,6 +198,11 @@ if "connection_stage" not in st.session_state:
     st.session_state.topics = []
     st.session_state.next_topic_index = 0
 
+# Every chain researched this session, stored by topic prefix so branches share their common steps;
+# the trie holds research ids, and the documents live in the shared research store
+if "journeys" not in st.session_state:
+    st.session_state.journeys = TopicTrie()
+
 # Different UI based on connection stage
 if st.session_state.connection_stage == "initial":
     st.markdown("### Step 1: Start with connecting two topics")
@@ -247,24 +242,16 @@ elif st.session_state.connection_stage == "continue":
         submit_button = st.form_submit_button("Connect Topic", type="primary")
 
 # Initialize session state
-if "research_data" not in st.session_state:
-    st.session_state.research_data = None
-    st.session_state.topic_history = []
+if "research_id" not in st.session_state:
+    st.session_state.research_id = None
     st.session_state.current_primary = None
     st.session_state.current_intent = None
 
 # Handle form submissions based on connection stage
 if st.session_state.connection_stage == "initial" and submit_button:
     with st.spinner(f"Generating research connecting {primary_topic} and {intent_topic}..."):
-        st.session_state.research_data = generate_research(primary_topic, intent_topic)
         st.session_state.topics = [primary_topic, intent_topic]
-        
-        # Add to topic history
-        history_entry = f"{primary_topic} → {intent_topic}"
-        if "topic_history" not in st.session_state:
-            st.session_state.topic_history = []
-        if history_entry not in st.session_state.topic_history:
-            st.session_state.topic_history.append(history_entry)
+        st.session_state.research_id = research_for_chain(st.session_state.topics)
         
         # Move to continue stage
         st.session_state.connection_stage = "continue"
@@ -283,24 +270,12 @@ elif st.session_state.connection_stage == "continue" and submit_button:
         spinner_message = f"Generating research connecting {topics_str}, and {next_topic}..."
     
     with st.spinner(spinner_message):
-        # For topics beyond the third, we'll use a special approach to maintain all connections
-        if topic_count == 2:
-            # Simple case for third topic
-            st.session_state.research_data = generate_research(current_topics[0], current_topics[1], next_topic)
-        else:
-            # For additional topics, we'll pass the last topic and the new topic as the third parameter
-            # This ensures we maintain all previous connections
-            combined_prompt = f"{current_topics[-1]} and {next_topic}"
-            st.session_state.research_data = generate_research(current_topics[0], current_topics[1], combined_prompt)
+        # Branches already explored this session are reused instead of regenerated
+        st.session_state.research_id = research_for_chain(current_topics + [next_topic])
         
         # Add the new topic to the list
         st.session_state.topics.append(next_topic)
         
-        # Add to topic history
-        history_entry = " → ".join(st.session_state.topics)
-        if history_entry not in st.session_state.topic_history:
-            st.session_state.topic_history.append(history_entry)
-        
         # Increment the next topic index to avoid duplicate widget keys
         st.session_state.next_topic_index += 1
         
@@ -311,10 +286,17 @@ elif st.session_state.connection_stage == "continue" and submit_button:
 with st.sidebar:
     st.title("Your Research Journey")
     
-    # Display topic history
-    if "topic_history" in st.session_state and st.session_state.topic_history:
-        for entry in st.session_state.topic_history:
-            st.markdown(f"- {entry}")
+    # Show every explored chain as a tree; clicking one jumps straight back to its research
+    for path, research_id in st.session_state.journeys.chains():
+        depth = len(path) - 2
+        label = " → ".join(path) if depth == 0 else "\u2003" * depth + f"↳ {path[-1]}"
+        is_current = path == st.session_state.topics
+        if st.button(label, key=f"journey_{'|'.join(path)}", disabled=is_current):
+            st.session_state.topics = list(path)
+            st.session_state.research_id = research_id
+            st.session_state.connection_stage = "continue"
+            st.session_state.next_topic_index += 1
+            st.experimental_rerun()
     
     # Always show the Start New Research button
     if st.button("Start New Research", key="new_research_sidebar"):
@@ -324,8 +306,9 @@ with st.sidebar:
         st.experimental_rerun()
 
 # Display research output if available
-if st.session_state.research_data:
-    research_output = st.session_state.research_data.get("research_output", {})
+research_data = current_research()
+if research_data:
+    research_output = research_data.get("research_output", {})
     
     # Display title and introduction
     if len(st.session_state.topics) > 2:
@@ -381,7 +364,7 @@ if st.session_state.research_data:
     # Display related topics section for continuing research
     if st.session_state.connection_stage == "continue":
         st.header("Related Topics to Explore")
-        related_topics = st.session_state.research_data.get("related_topics", [])
+        related_topics = research_data.get("related_topics", [])
         
         st.markdown("**Connect to one of these topics or enter your own:**")
         
@@ -407,23 +390,12 @@ if st.session_state.research_data:
                         spinner_message = f"Generating research connecting {topics_str}, and {topic}..."
                     
                     with st.spinner(spinner_message):
-                        # For topics beyond the third, we'll use a special approach to maintain all connections
-                        if topic_count == 2:
-                            # Simple case for third topic
-                            st.session_state.research_data = generate_research(current_topics[0], current_topics[1], topic)
-                        else:
-                            # For additional topics, we'll pass the last topic and the new topic as the third parameter
-                            combined_prompt = f"{current_topics[-1]} and {topic}"
-                            st.session_state.research_data = generate_research(current_topics[0], current_topics[1], combined_prompt)
+                        # Branches already explored this session are reused instead of regenerated
+                        st.session_state.research_id = research_for_chain(current_topics + [topic])
                         
                         # Add the new topic to the list
                         st.session_state.topics.append(topic)
                         
-                        # Add to topic history
-                        history_entry = " → ".join(st.session_state.topics)
-                        if history_entry not in st.session_state.topic_history:
-                            st.session_state.topic_history.append(history_entry)
-                        
                         # Increment the next topic index to avoid duplicate widget keys
                         st.session_state.next_topic_index += 1
                         
@@ -445,9 +417,24 @@ if st.session_state.research_data:
                 prompt = f"Enter a topic to connect with {topics_str}"
                 
             custom_topic = st.text_input(prompt, key=f"custom_topic_{st.session_state.next_topic_index}")
+            
+            # Offer known spellings of unfamiliar topics, whose research is more likely to be cached
+            suggested_topic = None
+            if custom_topic and custom_topic not in topic_index:
+                suggestions = topic_index.suggest(custom_topic, 3)
+                if suggestions:
+                    st.caption("Known topics:")
+                    suggestion_cols = st.columns(len(suggestions))
+                    for j, suggestion in enumerate(suggestions):
+                        with suggestion_cols[j]:
+                            if st.button(suggestion.topic, key=f"suggest_{j}_{st.session_state.next_topic_index}"):
+                                suggested_topic = suggestion.topic
         
         with custom_col2:
-            if st.button("Connect", type="primary", key=f"connect_custom_{st.session_state.next_topic_index}") and custom_topic:
+            connect_clicked = st.button("Connect", type="primary", key=f"connect_custom_{st.session_state.next_topic_index}")
+            if suggested_topic:
+                custom_topic = suggested_topic
+            if (connect_clicked and custom_topic) or suggested_topic:
                 # Get the current topics
                 current_topics = st.session_state.topics.copy()
                 topic_count = len(current_topics)
@@ -460,23 +447,12 @@ if st.session_state.research_data:
                     spinner_message = f"Generating research connecting {topics_str}, and {custom_topic}..."
                 
                 with st.spinner(spinner_message):
-                    # For topics beyond the third, we'll use a special approach to maintain all connections
-                    if topic_count == 2:
-                        # Simple case for third topic
-                        st.session_state.research_data = generate_research(current_topics[0], current_topics[1], custom_topic)
-                    else:
-                        # For additional topics, we'll pass the last topic and the new topic as the third parameter
-                        combined_prompt = f"{current_topics[-1]} and {custom_topic}"
-                        st.session_state.research_data = generate_research(current_topics[0], current_topics[1], combined_prompt)
+                    # Branches already explored this session are reused instead of regenerated
+                    st.session_state.research_id = research_for_chain(current_topics + [custom_topic])
                     
                     # Add the new topic to the list
                     st.session_state.topics.append(custom_topic)
                     
-                    # Add to topic history
-                    history_entry = " → ".join(st.session_state.topics)
-                    if history_entry not in st.session_state.topic_history:
-                        st.session_state.topic_history.append(history_entry)
-                    
                     # Increment the next topic index to avoid duplicate widget keys
                     st.session_state.next_topic_index += 1
                     
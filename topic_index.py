@@ -0,0 +1,222 @@
+import heapq
+import json
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from topic_trie import normalize_topic
+
+# Popularity added when a topic is requested, and when it is only suggested as a related topic
+REQUEST_WEIGHT = 1.0
+SUGGESTION_WEIGHT = 0.25
+
+# Prefix ranges up to this size are ranked by scanning them; larger ones keep a top-k list
+SCAN_LIMIT = 64
+TOP_K = 20
+# New topics are buffered and merged into the sorted array in batches
+MERGE_THRESHOLD = 16384
+# Queries this long that match nothing are retried with one typo corrected after their first
+# FUZZY_PREFIX_LENGTH characters; trusting the first character spares trying every initial letter
+FUZZY_MIN_LENGTH = 3
+FUZZY_PREFIX_LENGTH = 1
+
+
+class Suggestion(NamedTuple):
+    """One autocomplete candidate."""
+    topic: str
+    popularity: float
+    fuzzy: bool = False  # matched only after correcting one typo in the query
+
+
+class TopicIndex:
+    """
+    Prefix and typo-tolerant topic lookup ranked by popularity.
+
+    Normalized topics are kept in a sorted array, so the topics starting with
+    a prefix are one contiguous range found with two binary searches. Small
+    ranges are ranked by scanning them; ranges larger than ``SCAN_LIMIT``
+    keep their ``TOP_K`` most popular topics, computed on first use and
+    updated as popularity changes, so short prefixes stay fast over millions
+    of topics. New topics go to a small sorted buffer that is merged into the
+    array in batches. When nothing starts with the query, its
+    single-character edits (insertion, deletion, substitution, transposition)
+    after the first character are tried instead; an edit can only help where the query's prefix up to
+    it is indexed, and only with characters that follow that prefix in the
+    array, which keeps the candidates to a few dozen.
+
+    Each topic is shown as the first capitalized spelling seen for it.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        self._pending: List[str] = []
+        self._scores: Dict[str, float] = {}
+        self._labels: Dict[str, str] = {}  # only for topics whose label differs from their key
+        self._top: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, topic: str) -> bool:
+        return normalize_topic(topic) in self._scores
+
+    def label(self, key: str) -> str:
+        return self._labels.get(key, key)
+
+    def record(self, topic: str, weight: float = REQUEST_WEIGHT) -> None:
+        key = normalize_topic(topic)
+        label = " ".join(topic.split())
+        if not key:
+            return
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self._scores[key] = weight
+                self._pending.insert(bisect_left(self._pending, key), key)
+                if len(self._pending) >= MERGE_THRESHOLD:
+                    self._merge()
+            else:
+                self._scores[key] = score + weight
+            current = self._labels.get(key, key)
+            if label != current and current.islower() and not label.islower():
+                self._labels[key] = label
+            self._update_top(key)
+
+    def record_many(self, topics: Iterable[str], weight: float = REQUEST_WEIGHT) -> None:
+        for topic in topics:
+            self.record(topic, weight)
+
+    def _merge(self) -> None:
+        # Timsort merges the two sorted runs in linear time
+        self._keys = sorted(self._keys + self._pending)
+        self._pending = []
+
+    def _update_top(self, key: str) -> None:
+        for end in range(1, len(key) + 1):
+            top = self._top.get(key[:end])
+            if top is None:
+                continue
+            if key not in top:
+                if len(top) >= TOP_K and self._scores[top[-1]] >= self._scores[key]:
+                    continue
+                top.append(key)
+            top.sort(key=self._rank)
+            del top[TOP_K:]
+
+    def _rank(self, key: str) -> Tuple[float, int, str]:
+        return (-self._scores[key], len(key), key)
+
+    def _range(self, keys: List[str], prefix: str) -> Tuple[int, int]:
+        return bisect_left(keys, prefix), bisect_left(keys, prefix + "\U0010ffff")
+
+    def _corrections(self, query: str) -> Iterable[str]:
+        # Every indexed prefix one edit away from ``query``. Each step narrows the search to the
+        # range of topics sharing the query so far, so candidates are found by jumping through it
+        arrays = (self._keys, self._pending)
+        bounds = [(0, len(keys)) for keys in arrays]
+        for i in range(len(query)):
+            left = query[:i]
+            bounds = [(bisect_left(keys, left, lo, hi), bisect_left(keys, left + "\U0010ffff", lo, hi))
+                      for keys, (lo, hi) in zip(arrays, bounds)]
+            if all(lo == hi for lo, hi in bounds):
+                return  # no indexed topic shares the query up to here, so later edits cannot match
+            if i < FUZZY_PREFIX_LENGTH:
+                continue
+
+            variants = {left + query[i + 1:]}
+            if i + 1 < len(query):
+                variants.add(left + query[i + 1] + query[i] + query[i + 2:])
+            for keys, (lo, hi) in zip(arrays, bounds):
+                position = lo
+                while position < hi:
+                    if len(keys[position]) == i:
+                        position += 1
+                        continue
+                    char = keys[position][i]
+                    variants.add(left + char + query[i:])
+                    variants.add(left + char + query[i + 1:])
+                    position = bisect_left(keys, left + chr(ord(char) + 1), position, hi)
+            for variant in variants:
+                for keys, (lo, hi) in zip(arrays, bounds):
+                    position = bisect_left(keys, variant, lo, hi)
+                    if position < hi and keys[position].startswith(variant):
+                        yield variant
+                        break
+
+    def _best(self, prefix: str, limit: int) -> List[str]:
+        # Callers hold the lock
+        top = self._top.get(prefix)
+        if top is not None and limit <= TOP_K:
+            return top[:limit]
+
+        main_start, main_end = self._range(self._keys, prefix)
+        pending_start, pending_end = self._range(self._pending, prefix)
+        size = main_end - main_start + pending_end - pending_start
+        if size == 0:
+            return []
+        candidates = self._keys[main_start:main_end] + self._pending[pending_start:pending_end]
+        if size <= SCAN_LIMIT or limit > TOP_K:
+            return heapq.nsmallest(limit, candidates, key=self._rank)
+        top = self._top[prefix] = heapq.nsmallest(TOP_K, candidates, key=self._rank)
+        return top[:limit]
+
+    def suggest(self, query: str, limit: int = 10) -> List[Suggestion]:
+        """Return up to ``limit`` topics starting with ``query``, most popular first."""
+        prefix = normalize_topic(query)
+        if not prefix or limit <= 0:
+            return []
+        with self._lock:
+            keys = self._best(prefix, limit)
+            suggestions = [Suggestion(self.label(key), self._scores[key]) for key in keys]
+            if suggestions or len(prefix) < FUZZY_MIN_LENGTH:
+                return suggestions
+
+            fuzzy: Dict[str, None] = {}
+            for variant in self._corrections(prefix):
+                for key in self._best(variant, limit):
+                    fuzzy[key] = None
+            ranked = heapq.nsmallest(limit, fuzzy, key=self._rank)
+            return [Suggestion(self.label(key), self._scores[key], fuzzy=True) for key in ranked]
+
+    def canonical(self, topic: str) -> Optional[str]:
+        """Return the indexed spelling of ``topic`` if it is known."""
+        key = normalize_topic(topic)
+        with self._lock:
+            return self.label(key) if key in self._scores else None
+
+    def record_research(self, document: Dict[str, Any], weight: float = REQUEST_WEIGHT) -> None:
+        """Add the topic chain and suggested related topics of one research document."""
+        path = document.get("connection_path") or ""
+        self.record_many((topic for topic in path.split(" → ") if topic.strip()), weight)
+        related = document.get("related_topics") or []
+        self.record_many(
+            (item["topic"] for item in related if isinstance(item, dict) and item.get("topic")),
+            weight * SUGGESTION_WEIGHT,
+        )
+
+
+# Function to read the documents of research archives and bulk_research.py output files
+def stored_research(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    for path in paths:
+        if path.endswith(".jsonl"):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if record.get("response") is not None:
+                        yield record["response"]
+        else:
+            from research_archive import ResearchArchive
+
+            with ResearchArchive(path) as archive:
+                for key in archive.keys():
+                    yield json.loads(archive.get(key))
+
+
+# Function to fill an index from stored research: archives and bulk_research.py output files
+def seed_topic_index(index: TopicIndex, paths: Iterable[str]) -> int:
+    count = 0
+    for document in stored_research(paths):
+        index.record_research(document)
+        count += 1
+    return count
@@ -0,0 +1,146 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Iterator, List, Optional, Tuple
+
+
+# Function to normalize a topic the same way research cache keys do
+def normalize_topic(topic: str) -> str:
+    return sys.intern(" ".join(topic.split()).lower())
+
+
+class TrieNode:
+    """One topic in a journey. Leaves carry no children dict at all."""
+    __slots__ = ("label", "value", "children")
+
+    def __init__(self, label: str):
+        self.label = label      # topic as the user first typed it
+        self.value = None       # whatever is stored for the chain ending here
+        self.children = None    # normalized topic -> TrieNode, created on first branch
+
+
+class TopicTrie:
+    """
+    Journeys stored by topic prefix.
+
+    Chains that share their first k topics share the first k nodes, so
+    branching from any step reuses everything stored for the steps before it,
+    and finding the longest stored prefix of a chain takes one dictionary
+    lookup per topic. Nodes use ``__slots__`` and interned topic strings, and
+    leaves allocate no children dict, which keeps millions of chains small.
+
+    With ``max_chains`` set, the chains inserted least recently are removed
+    once there are more than that, so the trie stays bounded.
+
+    Inserts are serialized by a lock; reads are plain dictionary lookups.
+    """
+
+    def __init__(self, max_chains: Optional[int] = None):
+        self.root = TrieNode("")
+        self.max_chains = max_chains
+        self._size = 0
+        self._recent: "OrderedDict[Tuple[str, ...], None]" = OrderedDict()  # normalized chains, oldest first
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, topics: List[str], value: Any) -> None:
+        """Store ``value`` for the chain ``topics``, creating missing prefix nodes."""
+        with self._lock:
+            node = self.root
+            keys = []
+            for topic in topics:
+                key = normalize_topic(topic)
+                keys.append(key)
+                if node.children is None:
+                    node.children = {}
+                child = node.children.get(key)
+                if child is None:
+                    child = node.children[key] = TrieNode(sys.intern(topic.strip()))
+                node = child
+            if node.value is None:
+                self._size += 1
+            node.value = value
+            if self.max_chains is not None:
+                self._recent[tuple(keys)] = None
+                self._recent.move_to_end(tuple(keys))
+                while len(self._recent) > self.max_chains:
+                    self._remove(self._recent.popitem(last=False)[0])
+
+    def _walk(self, topics: List[str]) -> Tuple[int, TrieNode]:
+        # Returns how many leading topics are in the trie and the node for the last of them
+        node, depth = self.root, 0
+        for topic in topics:
+            child = node.children.get(normalize_topic(topic)) if node.children else None
+            if child is None:
+                break
+            node, depth = child, depth + 1
+        return depth, node
+
+    def get(self, topics: List[str]) -> Any:
+        depth, node = self._walk(topics)
+        return node.value if depth == len(topics) else None
+
+    def remove(self, topics: List[str]) -> None:
+        """Forget the value stored for ``topics``; prefix nodes are kept only while they lead to other chains."""
+        with self._lock:
+            keys = tuple(normalize_topic(topic) for topic in topics)
+            self._recent.pop(keys, None)
+            self._remove(keys)
+
+    def _remove(self, keys: Tuple[str, ...]) -> None:
+        # Callers hold the lock
+        path = [self.root]
+        for key in keys:
+            child = path[-1].children.get(key) if path[-1].children else None
+            if child is None:
+                return
+            path.append(child)
+        if len(path) == 1 or path[-1].value is None:
+            return
+        path[-1].value = None
+        self._size -= 1
+        # Nodes left without a value or branches are dropped, so removed chains free their memory
+        for depth in range(len(keys), 0, -1):
+            node = path[depth]
+            if node.value is not None or node.children:
+                break
+            parent = path[depth - 1]
+            del parent.children[keys[depth - 1]]
+            if not parent.children:
+                parent.children = None
+
+    def longest_prefix(self, topics: List[str]) -> Tuple[int, Any]:
+        """Return the length of the longest stored prefix of ``topics`` and its value."""
+        node, depth, best_depth, best = self.root, 0, 0, None
+        for topic in topics:
+            node = node.children.get(normalize_topic(topic)) if node.children else None
+            if node is None:
+                break
+            depth += 1
+            if node.value is not None:
+                best_depth, best = depth, node.value
+        return best_depth, best
+
+    def branches(self, topics: List[str]) -> List[Tuple[str, Any]]:
+        """List the topics stored directly after ``topics`` with their values (None if only a prefix)."""
+        depth, node = self._walk(topics)
+        if depth != len(topics) or not node.children:
+            return []
+        return [(child.label, child.value) for child in node.children.values()]
+
+    def chains(self, topics: Optional[List[str]] = None) -> Iterator[Tuple[List[str], Any]]:
+        """Yield every stored chain under ``topics`` (default: all) depth first."""
+        prefix = list(topics or [])
+        depth, node = self._walk(prefix)
+        if depth != len(prefix):
+            return
+        stack = [(node, prefix)]
+        while stack:
+            node, path = stack.pop()
+            if node.value is not None and path:
+                yield path, node.value
+            if node.children:
+                for child in reversed(list(node.children.values())):
+                    stack.append((child, path + [child.label]))